@@ -307,6 +307,7 @@ class APIClient:
         include_sources: bool = True,
         include_notes: bool = True,
         include_insights: bool = True,
+        resume: bool = True,
     ) -> Union[Dict[Any, Any], List[Dict[Any, Any]]]:
         """Rebuild embeddings in bulk.
 
@@ -318,6 +319,7 @@ class APIClient:
             "include_sources": include_sources,
             "include_notes": include_notes,
             "include_insights": include_insights,
+            "resume": resume,
         }
         # Use double the configured timeout for bulk rebuild operations (or configured value if already high)
         rebuild_timeout = max(self.timeout, min(self.timeout * 2, 3600.0))
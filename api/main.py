@@ -3,6 +3,7 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
@@ -12,12 +13,14 @@ from loguru import logger
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from api.auth import PasswordAuthMiddleware
+from api.middleware import RecordLoaderMiddleware, UserContextMiddleware
 from api.routers import (
     auth,
     chat,
     config,
     context,
     credentials,
+    database,
     embedding,
     embedding_rebuild,
     episode_profiles,
@@ -35,6 +38,12 @@ from api.routers import (
 )
 from api.routers import commands as commands_router
 from open_notebook.database.async_migrate import AsyncMigrationManager
+from open_notebook.database.numpy_index import sync_numpy_index
+from open_notebook.database.repository import close_connection_pool
+from open_notebook.database.vector_index import (
+    get_vector_search_backend,
+    sync_vector_indexes,
+)
 from open_notebook.utils.encryption import get_secret_from_env
 
 # Import commands to register them in the API process
@@ -44,6 +53,24 @@ except Exception as e:
     logger.error(f"Failed to import commands in API process: {e}")
 
 
+async def sync_vector_indexes_on_startup() -> None:
+    try:
+        dimension = await sync_vector_indexes()
+        if dimension:
+            logger.info(f"Vector search uses HNSW indexes ({dimension} dimensions)")
+    except Exception as e:
+        logger.warning(f"Could not set up vector indexes, using exact search: {e}")
+
+    if get_vector_search_backend() != "numpy":
+        return
+    try:
+        rows = await sync_numpy_index()
+        if rows is not None:
+            logger.info(f"Vector search uses the NumPy index ({rows} embeddings)")
+    except Exception as e:
+        logger.warning(f"Could not build NumPy vector index, searching in DB: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -87,12 +114,18 @@ async def lifespan(app: FastAPI):
         # Fail fast - don't start the API with an outdated database schema
         raise RuntimeError(f"Failed to run database migrations: {str(e)}") from e
 
+    # Define vector indexes for the stored embeddings in the background:
+    # building them over a large corpus can take a while
+    index_task = asyncio.create_task(sync_vector_indexes_on_startup())
+
     logger.success("API initialization completed successfully")
 
     # Yield control to the application
     yield
 
-    # Shutdown: cleanup if needed
+    # Shutdown: release pooled database connections
+    index_task.cancel()
+    await close_connection_pool()
     logger.info("API shutdown complete")
 
 
@@ -102,7 +135,13 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
-# Add password authentication middleware first
+# Batch record lookups made concurrently within a request
+app.add_middleware(RecordLoaderMiddleware)
+
+# Put the signed-in user on request.state for get_current_user_id()
+app.add_middleware(UserContextMiddleware)
+
+# Add password authentication middleware
 # Exclude /api/auth/status and /api/config from authentication
 app.add_middleware(
     PasswordAuthMiddleware,
@@ -177,6 +216,7 @@ app.include_router(speaker_profiles.router, prefix="/api", tags=["speaker-profil
 app.include_router(chat.router, prefix="/api", tags=["chat"])
 app.include_router(source_chat.router, prefix="/api", tags=["source-chat"])
 app.include_router(credentials.router, prefix="/api", tags=["credentials"])
+app.include_router(database.router, prefix="/api", tags=["database"])
 
 
 @app.get("/")
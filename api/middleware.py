@@ -5,6 +5,7 @@ from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from loguru import logger
 
+from open_notebook.database.loader import record_loader
 from open_notebook.utils.auth_utils import decode_access_token
 
 
@@ -31,8 +32,13 @@ class UserContextMiddleware(BaseHTTPMiddleware):
         
         # Extract token from Authorization header
         auth_header = request.headers.get("Authorization")
-        
-        if auth_header and auth_header.startswith("Bearer "):
+
+        # Password auth sends the password as the token; only JWTs have 3 parts
+        if (
+            auth_header
+            and auth_header.startswith("Bearer ")
+            and auth_header.count(".") == 2
+        ):
             token = auth_header.split(" ")[1]
             
             # Decode token
@@ -54,6 +60,19 @@ class UserContextMiddleware(BaseHTTPMiddleware):
         return response
 
 
+class RecordLoaderMiddleware:
+    """Open a record loader per request so concurrent get() calls are batched."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        async with record_loader():
+            await self.app(scope, receive, send)
+
+
 def get_current_user_id(request: Request) -> str:
     """Get current user ID from request state."""
     user_id = getattr(request.state, "user_id", None)
@@ -31,13 +31,37 @@ class NotebookResponse(BaseModel):
 # Search models
 class SearchRequest(BaseModel):
     query: str = Field(..., description="Search query")
-    type: Literal["text", "vector"] = Field("text", description="Search type")
+    type: Literal["text", "vector", "hybrid"] = Field(
+        "text", description="Search type; hybrid fuses text and vector search"
+    )
     limit: int = Field(100, description="Maximum number of results", le=1000)
     search_sources: bool = Field(True, description="Include sources in search")
     search_notes: bool = Field(True, description="Include notes in search")
     minimum_score: float = Field(
         0.2, description="Minimum score for vector search", ge=0, le=1
     )
+    text_weight: float = Field(
+        1.0, description="Weight of text search in hybrid ranking", ge=0
+    )
+    vector_weight: float = Field(
+        1.0, description="Weight of vector search in hybrid ranking", ge=0
+    )
+    notebook_id: Optional[str] = Field(
+        None, description="Only search sources and notes of this notebook"
+    )
+    owned_only: bool = Field(
+        False, description="Only search sources and notes of the signed-in user"
+    )
+    max_chunks_per_parent: Optional[int] = Field(
+        None,
+        description="Chunks kept per source or note (0 keeps all; default from SEARCH_MAX_CHUNKS_PER_PARENT)",
+        ge=0,
+    )
+    snippet_chars: Optional[int] = Field(
+        None,
+        description="Characters per matched chunk snippet (0 returns whole chunks; default from SEARCH_SNIPPET_CHARS)",
+        ge=0,
+    )
 
 
 class SearchResponse(BaseModel):
@@ -46,11 +70,48 @@ class SearchResponse(BaseModel):
     search_type: str = Field(..., description="Type of search performed")
 
 
+class BatchSearchRequest(BaseModel):
+    queries: List[str] = Field(
+        ..., description="Search queries", min_length=1, max_length=20
+    )
+    limit: int = Field(10, description="Maximum results per query", le=1000)
+    search_sources: bool = Field(True, description="Include sources in search")
+    search_notes: bool = Field(True, description="Include notes in search")
+    minimum_score: float = Field(
+        0.2, description="Minimum score for vector search", ge=0, le=1
+    )
+    notebook_id: Optional[str] = Field(
+        None, description="Only search sources and notes of this notebook"
+    )
+    owned_only: bool = Field(
+        False, description="Only search sources and notes of the signed-in user"
+    )
+    max_chunks_per_parent: Optional[int] = Field(
+        None,
+        description="Chunks kept per source or note (0 keeps all; default from SEARCH_MAX_CHUNKS_PER_PARENT)",
+        ge=0,
+    )
+    snippet_chars: Optional[int] = Field(
+        None,
+        description="Characters per matched chunk snippet (0 returns whole chunks; default from SEARCH_SNIPPET_CHARS)",
+        ge=0,
+    )
+
+
+class BatchSearchResponse(BaseModel):
+    searches: List[SearchResponse] = Field(
+        ..., description="Results of each query, in request order"
+    )
+
+
 class AskRequest(BaseModel):
     question: str = Field(..., description="Question to ask the knowledge base")
     strategy_model: str = Field(..., description="Model ID for query strategy")
     answer_model: str = Field(..., description="Model ID for individual answers")
     final_answer_model: str = Field(..., description="Model ID for final answer")
+    search_type: Literal["vector", "hybrid"] = Field(
+        "vector", description="Search used to gather context for each query"
+    )
 
 
 class AskResponse(BaseModel):
@@ -236,6 +297,10 @@ class RebuildRequest(BaseModel):
     include_sources: bool = Field(True, description="Include sources in rebuild")
     include_notes: bool = Field(True, description="Include notes in rebuild")
     include_insights: bool = Field(True, description="Include insights in rebuild")
+    resume: bool = Field(
+        True,
+        description="Continue an interrupted rebuild of the same mode and item types",
+    )
 
 
 class RebuildResponse(BaseModel):
@@ -248,6 +313,12 @@ class RebuildProgress(BaseModel):
     processed: int = Field(..., description="Number of items processed")
     total: int = Field(..., description="Total items to process")
     percentage: float = Field(..., description="Progress percentage")
+    items_per_second: Optional[float] = Field(
+        None, description="Items processed per second by the current run"
+    )
+    eta_seconds: Optional[float] = Field(
+        None, description="Estimated seconds until the rebuild completes"
+    )
 
 
 class RebuildStats(BaseModel):
@@ -695,3 +766,66 @@ class NotebookDeleteResponse(BaseModel):
     unlinked_sources: int = Field(
         ..., description="Number of sources unlinked from notebook"
     )
+
+
+# Database diagnostics models
+class QueryTemplateStats(BaseModel):
+    template: str = Field(..., description="Normalized SurrealQL statement")
+    calls: int = Field(..., description="Number of round trips")
+    errors: int = Field(..., description="Number of failed round trips")
+    total_ms: float = Field(..., description="Total time spent in milliseconds")
+    mean_ms: float = Field(..., description="Mean latency in milliseconds")
+    min_ms: float = Field(..., description="Fastest round trip in milliseconds")
+    max_ms: float = Field(..., description="Slowest round trip in milliseconds")
+    p50_ms: float = Field(..., description="Median latency (histogram estimate)")
+    p95_ms: float = Field(..., description="95th percentile latency (histogram estimate)")
+    p99_ms: float = Field(..., description="99th percentile latency (histogram estimate)")
+    rows: int = Field(..., description="Total rows returned")
+    payload_bytes: int = Field(..., description="Estimated total result size in bytes")
+    histogram: Dict[str, int] = Field(
+        ..., description="Round trips per latency bucket (upper bound in ms)"
+    )
+
+
+class QueryStatsResponse(BaseModel):
+    enabled: bool = Field(..., description="Whether query statistics are collected")
+    slow_query_ms: float = Field(..., description="Slow-query log threshold in ms")
+    since: float = Field(..., description="Unix time when collection started")
+    templates: List[QueryTemplateStats] = Field(
+        default_factory=list, description="Per-template statistics, hottest first"
+    )
+    pool: Optional[Dict[str, Any]] = Field(
+        None, description="Connection pool usage for the API event loop"
+    )
+    record_cache: Optional[Dict[str, Any]] = Field(
+        None, description="Record cache size and hit/miss counters"
+    )
+    query_embedding_cache: Optional[Dict[str, Any]] = Field(
+        None, description="Search query embedding cache size and hit/miss counters"
+    )
+
+
+class RateLimitBucketStats(BaseModel):
+    key: str = Field(..., description="Provider and API key fingerprint")
+    rpm: Optional[float] = Field(None, description="Requests per minute budget")
+    tpm: Optional[float] = Field(None, description="Tokens per minute budget")
+    queue_depth: Dict[str, int] = Field(
+        ..., description="Calls waiting for their budget, per priority"
+    )
+    max_queue_depth: int = Field(..., description="Most calls ever waiting at once")
+    available_requests: Optional[float] = Field(
+        None, description="Requests that can start now"
+    )
+    available_tokens: Optional[float] = Field(
+        None, description="Estimated tokens that can be sent now"
+    )
+    granted: int = Field(..., description="Calls let through")
+    delayed: int = Field(..., description="Calls that had to wait")
+    timed_out: int = Field(..., description="Calls that failed at their deadline")
+    wait_seconds: float = Field(..., description="Total time calls spent waiting")
+
+
+class RateLimitsResponse(BaseModel):
+    buckets: List[RateLimitBucketStats] = Field(
+        default_factory=list, description="Rate budgets in use by this API process"
+    )
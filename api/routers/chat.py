@@ -105,13 +105,16 @@ async def get_sessions(notebook_id: str = Query(..., description="Notebook ID"))
         # Get sessions for this notebook
         sessions_list = await notebook.get_chat_sessions()
 
-        results = []
-        for session in sessions_list:
-            session_id = str(session.id)
-
-            # Get message count from LangGraph state
-            msg_count = await get_session_message_count(chat_graph, session_id)
+        # Get message counts from LangGraph state concurrently
+        msg_counts = await asyncio.gather(
+            *(
+                get_session_message_count(chat_graph, str(session.id))
+                for session in sessions_list
+            )
+        )
 
+        results = []
+        for session, msg_count in zip(sessions_list, msg_counts):
             results.append(
                 ChatSessionResponse(
                     id=session.id or "",
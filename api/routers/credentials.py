@@ -102,10 +102,12 @@ async def list_credentials(
         else:
             credentials = await Credential.get_all(order_by="provider, created")
 
+        model_counts = await Credential.get_linked_model_counts(
+            [cred.id for cred in credentials if cred.id]
+        )
         result = []
         for cred in credentials:
-            models = await cred.get_linked_models()
-            result.append(credential_to_response(cred, len(models)))
+            result.append(credential_to_response(cred, model_counts.get(cred.id or "", 0)))
 
         return result
 
@@ -119,10 +121,12 @@ async def list_credentials_by_provider(provider: str):
     """List all credentials for a specific provider."""
     try:
         credentials = await Credential.get_by_provider(provider.lower())
+        model_counts = await Credential.get_linked_model_counts(
+            [cred.id for cred in credentials if cred.id]
+        )
         result = []
         for cred in credentials:
-            models = await cred.get_linked_models()
-            result.append(credential_to_response(cred, len(models)))
+            result.append(credential_to_response(cred, model_counts.get(cred.id or "", 0)))
         return result
     except Exception as e:
         logger.error(f"Error listing credentials for {provider}: {e}")
@@ -0,0 +1,46 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Query
+
+from api.models import QueryStatsResponse
+from open_notebook.database.query_stats import get_query_stats
+from open_notebook.database.record_cache import get_record_cache
+from open_notebook.database.repository import get_connection_pool
+from open_notebook.utils.embedding_cache import get_query_embedding_cache
+
+router = APIRouter()
+
+QueryStatsSortField = Literal[
+    "total_ms", "calls", "mean_ms", "max_ms", "p95_ms", "rows", "payload_bytes"
+]
+
+
+@router.get("/database/query-stats", response_model=QueryStatsResponse)
+async def get_database_query_stats(
+    sort_by: QueryStatsSortField = Query(
+        "total_ms", description="Field used to rank templates (descending)"
+    ),
+    limit: Optional[int] = Query(
+        None, ge=1, description="Maximum number of templates to return"
+    ),
+):
+    """
+    Get per-template SurrealDB latency statistics for this API process.
+
+    Statements are grouped by normalized template, so the hottest templates
+    (e.g. `fn::vector_search` or the listing subqueries) surface at the top.
+    """
+    snapshot = get_query_stats().snapshot(sort_by=sort_by, limit=limit)
+    return QueryStatsResponse(
+        **snapshot,
+        pool=get_connection_pool().stats(),
+        record_cache=get_record_cache().stats(),
+        query_embedding_cache=get_query_embedding_cache().stats(),
+    )
+
+
+@router.delete("/database/query-stats")
+async def reset_database_query_stats():
+    """Reset the collected query statistics."""
+    get_query_stats().reset()
+    return {"message": "Query statistics reset"}
@@ -11,6 +11,7 @@ from api.models import (
     RebuildStatusResponse,
 )
 from open_notebook.database.repository import repo_query
+from open_notebook.utils.rebuild_checkpoint import load_checkpoint
 
 router = APIRouter()
 
@@ -24,6 +25,8 @@ async def start_rebuild(request: RebuildRequest):
     - **include_sources**: Include sources in rebuild (default: true)
     - **include_notes**: Include notes in rebuild (default: true)
     - **include_insights**: Include insights in rebuild (default: true)
+    - **resume**: Continue an interrupted rebuild of the same mode and item
+      types where it stopped (default: true)
 
     Returns command ID to track progress and estimated item count.
     """
@@ -101,6 +104,7 @@ async def start_rebuild(request: RebuildRequest):
                 "include_sources": request.include_sources,
                 "include_notes": request.include_notes,
                 "include_insights": request.include_insights,
+                "resume": request.resume,
             },
         )
 
@@ -127,7 +131,8 @@ async def get_rebuild_status(command_id: str):
 
     Returns:
     - **status**: queued, running, completed, failed
-    - **progress**: processed count, total count, percentage
+    - **progress**: processed count, total count, percentage, items per
+      second and estimated seconds remaining
     - **stats**: breakdown by type (sources, notes, insights, failed)
     - **timestamps**: started_at, completed_at
     """
@@ -144,26 +149,43 @@ async def get_rebuild_status(command_id: str):
             status=status.status,
         )
 
-        # Extract metadata from command result
-        if status.result and isinstance(status.result, dict):
+        # The checkpoint saved after each window has the live progress
+        checkpoint = await load_checkpoint(command_id)
+        if checkpoint:
+            items_per_second, eta_seconds = checkpoint.throughput()
+            total = checkpoint.total
+            processed = checkpoint.processed
+            response.progress = RebuildProgress(
+                processed=processed,
+                total=total,
+                percentage=round((processed / total * 100) if total > 0 else 0, 2),
+                items_per_second=(
+                    round(items_per_second, 2) if items_per_second else None
+                ),
+                eta_seconds=round(eta_seconds) if eta_seconds is not None else None,
+            )
+            response.stats = RebuildStats(
+                sources=checkpoint.sources,
+                notes=checkpoint.notes,
+                insights=checkpoint.insights,
+                failed=checkpoint.failed,
+            )
+        elif status.result and isinstance(status.result, dict):
+            # Rebuilds that never reached their first checkpoint
             result = status.result
-
-            # Build progress info
-            if "total_items" in result and "jobs_submitted" in result:
+            if "total_items" in result:
                 total = result["total_items"]
-                submitted = result["jobs_submitted"]
+                processed = result.get("processed_items", 0)
                 response.progress = RebuildProgress(
-                    processed=submitted,
+                    processed=processed,
                     total=total,
-                    percentage=round((submitted / total * 100) if total > 0 else 0, 2),
+                    percentage=round((processed / total * 100) if total > 0 else 0, 2),
                 )
-
-            # Build stats
             response.stats = RebuildStats(
-                sources=result.get("sources_submitted", 0),
-                notes=result.get("notes_submitted", 0),
-                insights=result.get("insights_submitted", 0),
-                failed=result.get("failed_submissions", 0),
+                sources=result.get("sources_processed", 0),
+                notes=result.get("notes_processed", 0),
+                insights=result.get("insights_processed", 0),
+                failed=result.get("failed_items", 0),
             )
 
         # Add timestamps
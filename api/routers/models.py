@@ -12,6 +12,7 @@ from api.models import (
     ModelCreate,
     ModelResponse,
     ProviderAvailabilityResponse,
+    RateLimitsResponse,
 )
 from open_notebook.domain.credential import Credential
 from open_notebook.ai.connection_tester import test_individual_model
@@ -23,6 +24,7 @@ from open_notebook.ai.model_discovery import (
     sync_provider_models,
 )
 from open_notebook.ai.models import DefaultModels, Model
+from open_notebook.ai.rate_scheduler import rate_limit_stats
 from open_notebook.exceptions import InvalidInputError
 
 router = APIRouter()
@@ -358,6 +360,15 @@ async def update_default_models(defaults_data: DefaultModelsResponse):
         )
 
 
+@router.get("/models/rate-limits", response_model=RateLimitsResponse)
+async def get_model_rate_limits():
+    """
+    Get the queue depth and usage of each provider rate budget in this API
+    process (see MODEL_RATE_LIMITS). Budgets appear after their first call.
+    """
+    return RateLimitsResponse(buckets=rate_limit_stats())
+
+
 @router.get("/models/providers", response_model=ProviderAvailabilityResponse)
 async def get_provider_availability():
     """Get provider availability based on database config and environment variables."""
@@ -365,10 +365,17 @@ async def generate_mindmap(notebook_id: str):
         sources = await notebook.get_sources()
         logger.info(f"MINDMAP: Found {len(sources)} sources")
         
-        # Fetch full_text for each source
+        # Fetch full_text for all sources in one round trip
+        try:
+            full_sources = {
+                s.id: s for s in await Source.get_many([s.id for s in sources if s.id])
+            }
+        except Exception as e:
+            logger.error(f"MINDMAP: Error fetching full_text for sources: {e}")
+            full_sources = {}
         for source in sources:
             try:
-                full_source = await Source.get(source.id)
+                full_source = full_sources.get(source.id)
                 if full_source and full_source.full_text:
                     source.full_text = full_source.full_text
                     logger.info(f"MINDMAP: Source '{source.title}' has {len(full_source.full_text)} chars")
@@ -538,11 +545,18 @@ async def generate_notebook_summary(notebook_id: str, request: NotebookSummaryRe
                 source_count=0
             )
         
-        # Collect all source content
+        # Collect all source content, loading every source in one round trip
+        try:
+            full_sources = {
+                s.id: s for s in await Source.get_many([s.id for s in sources if s.id])
+            }
+        except Exception as e:
+            logger.error(f"SUMMARY: Error fetching sources: {e}")
+            full_sources = {}
         all_content = []
         for source in sources:
             try:
-                full_source = await Source.get(source.id)
+                full_source = full_sources.get(source.id)
                 if full_source and full_source.full_text:
                     all_content.append(f"## {source.title}\n\n{full_source.full_text}")
                     logger.info(f"SUMMARY: Added source '{source.title}' ({len(full_source.full_text)} chars)")
@@ -1,24 +1,43 @@
 import json
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from loguru import logger
 
-from api.models import AskRequest, AskResponse, SearchRequest, SearchResponse
+from api.middleware import get_current_user_id
+from api.models import (
+    AskRequest,
+    AskResponse,
+    BatchSearchRequest,
+    BatchSearchResponse,
+    SearchRequest,
+    SearchResponse,
+)
 from open_notebook.ai.models import Model, model_manager
-from open_notebook.domain.notebook import text_search, vector_search
+from open_notebook.domain.notebook import (
+    batch_vector_search,
+    hybrid_search,
+    text_search,
+    vector_search,
+)
 from open_notebook.exceptions import DatabaseOperationError, InvalidInputError
 from open_notebook.graphs.ask import graph as ask_graph
 
 router = APIRouter()
 
 
+def search_user_id(request: Request, owned_only: bool) -> Optional[str]:
+    """The signed-in user to scope a search to; never taken from the body."""
+    return get_current_user_id(request) if owned_only else None
+
+
 @router.post("/search", response_model=SearchResponse)
-async def search_knowledge_base(search_request: SearchRequest):
-    """Search the knowledge base using text or vector search."""
+async def search_knowledge_base(search_request: SearchRequest, request: Request):
+    """Search the knowledge base using text, vector or hybrid search."""
+    user_id = search_user_id(request, search_request.owned_only)
     try:
-        if search_request.type == "vector":
+        if search_request.type in ("vector", "hybrid"):
             # Check if embedding model is available for vector search
             if not await model_manager.get_embedding_model():
                 raise HTTPException(
@@ -26,12 +45,31 @@ async def search_knowledge_base(search_request: SearchRequest):
                     detail="Vector search requires an embedding model. Please configure one in the Models section.",
                 )
 
+        if search_request.type == "hybrid":
+            results = await hybrid_search(
+                keyword=search_request.query,
+                results=search_request.limit,
+                source=search_request.search_sources,
+                note=search_request.search_notes,
+                minimum_score=search_request.minimum_score,
+                text_weight=search_request.text_weight,
+                vector_weight=search_request.vector_weight,
+                notebook_id=search_request.notebook_id,
+                user_id=user_id,
+                max_chunks_per_parent=search_request.max_chunks_per_parent,
+                snippet_chars=search_request.snippet_chars,
+            )
+        elif search_request.type == "vector":
             results = await vector_search(
                 keyword=search_request.query,
                 results=search_request.limit,
                 source=search_request.search_sources,
                 note=search_request.search_notes,
                 minimum_score=search_request.minimum_score,
+                notebook_id=search_request.notebook_id,
+                user_id=user_id,
+                max_chunks_per_parent=search_request.max_chunks_per_parent,
+                snippet_chars=search_request.snippet_chars,
             )
         else:
             # Text search
@@ -40,6 +78,8 @@ async def search_knowledge_base(search_request: SearchRequest):
                 results=search_request.limit,
                 source=search_request.search_sources,
                 note=search_request.search_notes,
+                notebook_id=search_request.notebook_id,
+                user_id=user_id,
             )
 
         return SearchResponse(
@@ -58,8 +98,60 @@ async def search_knowledge_base(search_request: SearchRequest):
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
 
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def batch_search_knowledge_base(
+    search_request: BatchSearchRequest, request: Request
+):
+    """Vector search for several queries, embedded and searched in one batch."""
+    user_id = search_user_id(request, search_request.owned_only)
+    try:
+        if not await model_manager.get_embedding_model():
+            raise HTTPException(
+                status_code=400,
+                detail="Vector search requires an embedding model. Please configure one in the Models section.",
+            )
+
+        searches = await batch_vector_search(
+            keywords=search_request.queries,
+            results=search_request.limit,
+            source=search_request.search_sources,
+            note=search_request.search_notes,
+            minimum_score=search_request.minimum_score,
+            notebook_id=search_request.notebook_id,
+            user_id=user_id,
+            max_chunks_per_parent=search_request.max_chunks_per_parent,
+            snippet_chars=search_request.snippet_chars,
+        )
+
+        return BatchSearchResponse(
+            searches=[
+                SearchResponse(
+                    results=results or [],
+                    total_count=len(results) if results else 0,
+                    search_type="vector",
+                )
+                for results in searches
+            ]
+        )
+
+    except HTTPException:
+        raise
+    except InvalidInputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except DatabaseOperationError as e:
+        logger.error(f"Database error during batch search: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+    except Exception as e:
+        logger.error(f"Unexpected error during batch search: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+
 async def stream_ask_response(
-    question: str, strategy_model: Model, answer_model: Model, final_answer_model: Model
+    question: str,
+    strategy_model: Model,
+    answer_model: Model,
+    final_answer_model: Model,
+    search_type: str = "vector",
 ) -> AsyncGenerator[str, None]:
     """Stream the ask response as Server-Sent Events."""
     try:
@@ -72,6 +164,7 @@ async def stream_ask_response(
                     strategy_model=strategy_model.id,
                     answer_model=answer_model.id,
                     final_answer_model=final_answer_model.id,
+                    search_type=search_type,
                 )
             ),
             stream_mode="updates",
@@ -142,7 +235,11 @@ async def ask_knowledge_base(ask_request: AskRequest):
         # For streaming response
         return StreamingResponse(
             stream_ask_response(
-                ask_request.question, strategy_model, answer_model, final_answer_model
+                ask_request.question,
+                strategy_model,
+                answer_model,
+                final_answer_model,
+                ask_request.search_type,
             ),
             media_type="text/plain",
         )
@@ -195,6 +292,7 @@ async def ask_knowledge_base_simple(ask_request: AskRequest):
                     strategy_model=strategy_model.id,
                     answer_model=answer_model.id,
                     final_answer_model=final_answer_model.id,
+                    search_type=ask_request.search_type,
                 )
             ),
             stream_mode="updates",
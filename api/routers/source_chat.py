@@ -149,32 +149,32 @@ async def get_source_chat_sessions(source_id: str = Path(..., description="Sourc
             {"source_id": ensure_record_id(full_source_id)},
         )
 
-        sessions = []
-        for relation in relations:
-            session_id_raw = relation.get("in")
-            if session_id_raw:
-                session_id = str(session_id_raw)
-
-                session_result = await repo_query(f"SELECT * FROM {session_id_raw}")
-                if session_result and len(session_result) > 0:
-                    session_data = session_result[0]
-
-                    # Get message count from LangGraph state
-                    msg_count = await get_session_message_count(
-                        source_chat_graph, session_id
-                    )
+        # Load all sessions in one query and read their message counts
+        # from LangGraph state concurrently
+        session_ids = [
+            str(relation["in"]) for relation in relations if relation.get("in")
+        ]
+        chat_sessions = await ChatSession.get_many(session_ids)
+        msg_counts = await asyncio.gather(
+            *(
+                get_session_message_count(source_chat_graph, str(session.id))
+                for session in chat_sessions
+            )
+        )
 
-                    sessions.append(
-                        SourceChatSessionResponse(
-                            id=session_data.get("id") or "",
-                            title=session_data.get("title") or "Untitled Session",
-                            source_id=source_id,
-                            model_override=session_data.get("model_override"),
-                            created=str(session_data.get("created")),
-                            updated=str(session_data.get("updated")),
-                            message_count=msg_count,
-                        )
-                    )
+        sessions = []
+        for session, msg_count in zip(chat_sessions, msg_counts):
+            sessions.append(
+                SourceChatSessionResponse(
+                    id=session.id or "",
+                    title=session.title or "Untitled Session",
+                    source_id=source_id,
+                    model_override=session.model_override,
+                    created=str(session.created),
+                    updated=str(session.updated),
+                    message_count=msg_count,
+                )
+            )
 
         # Sort sessions by created date (newest first)
         sessions.sort(key=lambda x: x.created, reverse=True)
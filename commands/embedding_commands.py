@@ -1,15 +1,79 @@
+import asyncio
+import hashlib
 import time
-from typing import Dict, List, Literal, Optional
+from contextlib import AsyncExitStack
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 from loguru import logger
 from pydantic import BaseModel
 from surreal_commands import CommandInput, CommandOutput, command, submit_command
+from surrealdb import RecordID
 
 from open_notebook.ai.models import model_manager
-from open_notebook.database.repository import ensure_record_id, repo_insert, repo_query
+from open_notebook.config import get_env_number
+from open_notebook.database.numpy_index import (
+    remove_rows_from_numpy_index,
+    update_numpy_index,
+)
+from open_notebook.database.repository import (
+    BatchStatement,
+    ensure_record_id,
+    repo_batch,
+    repo_query,
+    repo_stream,
+)
+from open_notebook.database.vector_index import (
+    ensure_vector_indexes,
+    get_vector_search_backend,
+)
+from open_notebook.database.write_coordinator import get_write_coordinator
 from open_notebook.domain.notebook import Note, Source, SourceInsight
-from open_notebook.utils.chunking import ContentType, chunk_text, detect_content_type
-from open_notebook.utils.embedding import generate_embedding, generate_embeddings
+from open_notebook.utils.chunking import (
+    CHUNK_OVERLAP,
+    CHUNK_SIZE,
+    ContentType,
+    chunk_text,
+    detect_content_type,
+    find_segment_boundary,
+)
+from open_notebook.utils.embedding import generate_embeddings, mean_pool_embeddings
+from open_notebook.utils.embedding_microbatch import generate_embedding_batched
+from open_notebook.utils.embedding_store import embedding_model_key
+from open_notebook.utils.rebuild_checkpoint import (
+    RebuildCheckpoint,
+    find_resumable_checkpoint,
+    load_checkpoint,
+    rebuild_scope,
+)
+
+
+# Characters of a streamed source read from the database at a time
+STREAM_SEGMENT_CHARS = 500_000
+
+
+def get_rebuild_window_size() -> int:
+    """Records embedded and written together by rebuild_embeddings."""
+    return int(get_env_number("EMBEDDING_REBUILD_WINDOW_SIZE", 50, 1))
+
+
+def get_stream_min_chars() -> int:
+    """Sources with more text are embedded by the streaming pipeline; 0: never."""
+    return int(get_env_number("EMBEDDING_STREAM_MIN_CHARS", 2_000_000, 0))
+
+
+def get_stream_window_chunks() -> int:
+    """Chunks embedded and inserted together by the streaming pipeline."""
+    return int(get_env_number("EMBEDDING_STREAM_WINDOW_CHUNKS", 256, 1))
 
 
 def full_model_dump(model):
@@ -23,6 +87,19 @@ def full_model_dump(model):
         return model
 
 
+async def prepare_vector_indexes(dimension: int) -> None:
+    """
+    Make sure the HNSW indexes accept vectors of `dimension` before writing.
+
+    Index problems must never fail an embedding job: search falls back to
+    exact scoring while the indexes are missing.
+    """
+    try:
+        await ensure_vector_indexes(dimension)
+    except Exception as e:
+        logger.warning(f"Could not update vector indexes: {e}")
+
+
 def get_command_id(input_data: CommandInput) -> str:
     """Extract command_id from input_data's execution context, or return 'unknown'."""
     if input_data.execution_context:
@@ -35,16 +112,20 @@ class RebuildEmbeddingsInput(CommandInput):
     include_sources: bool = True
     include_notes: bool = True
     include_insights: bool = True
+    # Continue the latest unfinished rebuild of the same mode and tables
+    resume: bool = True
 
 
 class RebuildEmbeddingsOutput(CommandOutput):
     success: bool
     total_items: int
-    jobs_submitted: int  # Count of embedding commands submitted
-    failed_submissions: int  # Count of items that failed to submit
-    sources_submitted: int = 0
-    notes_submitted: int = 0
-    insights_submitted: int = 0
+    processed_items: int = 0  # Failed items included
+    failed_items: int = 0  # Items without text to embed
+    sources_processed: int = 0
+    notes_processed: int = 0
+    insights_processed: int = 0
+    items_per_second: Optional[float] = None
+    resumed: bool = False  # Continued an interrupted rebuild
     processing_time: float
     error_message: Optional[str] = None
 
@@ -105,6 +186,8 @@ class EmbedSourceInput(CommandInput):
     """Input for embedding a source (creates multiple chunk embeddings)."""
 
     source_id: str
+    # Keep stored chunks whose text did not change instead of replacing all
+    incremental: bool = False
 
 
 class EmbedSourceOutput(CommandOutput):
@@ -113,10 +196,397 @@ class EmbedSourceOutput(CommandOutput):
     success: bool
     source_id: str
     chunks_created: int
+    # Chunks not embedded again: unchanged (incremental run) or staged by an
+    # earlier attempt (streamed run)
+    chunks_reused: int = 0
+    streamed: bool = False  # Embedded window by window (huge sources)
     processing_time: float
     error_message: Optional[str] = None
 
 
+def align_chunks(
+    existing: List[Dict[str, Any]], chunks: List[str], model_key: str
+) -> Tuple[Dict[int, Dict[str, Any]], List[str]]:
+    """
+    Match new chunks to stored source_embedding rows with the same content.
+
+    Rows embedded by another model never match. A chunk keeps the row at its
+    own position when the content is unchanged there, and otherwise takes the
+    first unmatched row with that content (text that moved). Returns the
+    matched row by chunk index, and the ids of the rows nothing matched.
+    """
+    by_content: Dict[str, List[Dict[str, Any]]] = {}
+    for row in sorted(existing, key=lambda row: row["order"]):
+        if row.get("model") == model_key:
+            by_content.setdefault(row["content"], []).append(row)
+
+    kept: Dict[int, Dict[str, Any]] = {}
+    used = set()
+    for moved in (False, True):
+        for idx, chunk in enumerate(chunks):
+            if idx in kept:
+                continue
+            for row in by_content.get(chunk, []):
+                if row["id"] not in used and (moved or row["order"] == idx):
+                    kept[idx] = row
+                    used.add(row["id"])
+                    break
+    stale = [row["id"] for row in existing if row["id"] not in used]
+    return kept, stale
+
+
+async def stream_source_text(
+    source_id: RecordID, length: int
+) -> AsyncIterator[str]:
+    """
+    The text of a source in consecutive segments, read from the database.
+
+    Segments of STREAM_SEGMENT_CHARS are cut at a paragraph break (see
+    find_segment_boundary()) and the rest carried over to the next one, so
+    the whole text is never loaded at once.
+    """
+    start, carry = 0, ""
+    while start < length:
+        rows = await repo_query(
+            "SELECT VALUE string::slice(full_text, $start, $size) FROM $source_id",
+            {"source_id": source_id, "start": start, "size": STREAM_SEGMENT_CHARS},
+        )
+        text = carry + (rows[0] if rows and rows[0] else "")
+        start += STREAM_SEGMENT_CHARS
+        carry = ""
+        if start < length:
+            cut = find_segment_boundary(text)
+            text, carry = text[:cut], text[cut:]
+        if text:
+            yield text
+
+
+async def stream_chunk_windows(
+    segments: AsyncIterator[str],
+    file_path: Optional[str],
+    window_size: int,
+    skip: int = 0,
+) -> AsyncIterator[Tuple[List[str], int]]:
+    """
+    Chunk streamed text lazily and group the chunks in windows.
+
+    Yields each window with the number of characters of text read so far.
+    The first `skip` chunks (already embedded by an earlier attempt) are
+    chunked again, since chunking is deterministic, but not yielded.
+    """
+    content_type: Optional[ContentType] = None
+    window: List[str] = []
+    position = 0
+    chunk_index = 0
+    async for segment in segments:
+        if content_type is None:
+            content_type = detect_content_type(segment, file_path)
+            logger.debug(f"Detected content type: {content_type.value}")
+        position += len(segment)
+        # Splitting is CPU bound; keep the event loop free for other commands
+        chunks = await asyncio.to_thread(
+            chunk_text, segment, content_type=content_type
+        )
+        for chunk in chunks:
+            chunk_index += 1
+            if chunk_index <= skip:
+                continue
+            window.append(chunk)
+            if len(window) == window_size:
+                yield window, position
+                window = []
+    if window:
+        yield window, position
+
+
+def staging_generation(source_id: str, text_hash: str, model_key: str) -> str:
+    """Identify the chunks of one text of a source, by one model and chunking."""
+    key = f"{source_id}\n{model_key}\n{CHUNK_SIZE}\n{CHUNK_OVERLAP}\n{text_hash}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+async def source_text_info(source_id: str) -> Optional[Dict[str, Any]]:
+    """Length, hash and file path of a source's text, without loading it."""
+    rows = await repo_query(
+        "SELECT string::len(full_text ?? '') AS length, "
+        "crypto::sha256(full_text ?? '') AS text_hash, "
+        "asset.file_path AS file_path FROM $source_id",
+        {"source_id": ensure_record_id(source_id)},
+    )
+    return rows[0] if rows else None
+
+
+async def start_staging(
+    source_record_id: RecordID, generation: str, orders: Optional[List[int]] = None
+) -> Sequence[int]:
+    """
+    Drop outdated staged windows of a source; return what is embedded already.
+
+    Without `orders`, windows are staged from the first chunk on and only
+    their count matters: the result is a range over the chunks staged or
+    already published for the generation. With `orders`, the result is
+    those of them that are staged.
+    """
+    staged_vars: Dict[str, Any] = {
+        "source_id": source_record_id,
+        "generation": generation,
+    }
+    if orders is None:
+        lookups: List[BatchStatement] = [
+            (
+                "SELECT count() AS count FROM source_embedding_staging "
+                "WHERE generation = $generation GROUP ALL",
+                staged_vars,
+            ),
+            (
+                "SELECT count() AS count FROM source_embedding "
+                "WHERE source = $source_id AND generation = $generation GROUP ALL",
+                staged_vars,
+            ),
+        ]
+    else:
+        staged_vars["orders"] = orders
+        lookups = [
+            (
+                "SELECT VALUE order FROM source_embedding_staging "
+                "WHERE generation = $generation AND order IN $orders",
+                staged_vars,
+            )
+        ]
+    _, *found = await repo_batch(
+        [
+            # Windows of an outdated text or model are of no use any more
+            (
+                "DELETE source_embedding_staging WHERE source = $source_id "
+                "AND generation != $generation",
+                staged_vars,
+            ),
+            *lookups,
+        ]
+    )
+    if orders is None:
+        return range(sum(rows[0]["count"] for rows in found if rows))
+    return sorted(found[0])
+
+
+async def stage_chunks(
+    source_record_id: RecordID,
+    generation: str,
+    model_key: str,
+    orders: List[int],
+    chunks: List[str],
+    embeddings: List[List[float]],
+) -> None:
+    """Store one embedded window of a source in source_embedding_staging."""
+    records = [
+        {
+            # Idempotent: a window stored twice keeps one copy
+            "id": RecordID("source_embedding_staging", [generation, order]),
+            "source": source_record_id,
+            "generation": generation,
+            "order": order,
+            "content": chunk,
+            "embedding": embedding,
+            "model": model_key,
+        }
+        for order, chunk, embedding in zip(orders, chunks, embeddings)
+    ]
+    await repo_query(
+        "INSERT IGNORE INTO source_embedding_staging $records RETURN NONE",
+        {"records": records},
+    )
+
+
+async def staged_dimension(generation: str) -> Optional[int]:
+    dimensions = await repo_query(
+        "SELECT VALUE array::len(embedding) FROM source_embedding_staging "
+        "WHERE generation = $generation LIMIT 1",
+        {"generation": generation},
+    )
+    return dimensions[0] if dimensions else None
+
+
+async def publish_staged_chunks(
+    source_id: str,
+    generation: str,
+    orders: Sequence[int],
+    kept: Optional[List[str]] = None,
+    moves: Optional[List[Dict[str, Any]]] = None,
+) -> None:
+    """
+    Replace a source's chunks with its staged ones, in bounded batches.
+
+    `orders` are the staged chunks to publish. Without `kept`, they replace
+    all of the source's chunks of other generations; otherwise the stored
+    chunks in `kept` stay, reordered by `moves`. Every step writes at most
+    EMBEDDING_STREAM_WINDOW_CHUNKS rows, so no transaction grows with the
+    size of the source:
+
+    1. Each batch of staged chunks moves to source_embedding in one
+       transaction (with the NumPy backend, their vectors are then appended
+       to the index)
+    2. The source's other chunks are deleted
+
+    A retry after a failure part way finds the moved chunks published under
+    the generation and the rest still staged. While this runs, searches can
+    see old and new chunks of the source side by side; results are grouped
+    by source, so they show no duplicates.
+    """
+    source_record_id = ensure_record_id(source_id)
+    batch_size = get_stream_window_chunks()
+    numpy_backend = get_vector_search_backend() == "numpy"
+
+    moves = moves or []
+    for start in range(0, len(moves), batch_size):
+        await repo_query(
+            "FOR $move IN $moves { UPDATE $move.id SET order = $move.order }",
+            {"moves": moves[start : start + batch_size]},
+        )
+
+    published: List[RecordID] = []
+    returned = "id, embedding" if numpy_backend else "id"
+    for start in range(0, len(orders), batch_size):
+        staged = {
+            "staged": [
+                RecordID("source_embedding_staging", [generation, order])
+                for order in orders[start : start + batch_size]
+            ]
+        }
+        rows, _ = await repo_batch(
+            [
+                (
+                    "INSERT INTO source_embedding (SELECT source, generation, "
+                    "order, content, embedding, model FROM $staged) "
+                    f"RETURN {returned}",
+                    staged,
+                ),
+                ("DELETE $staged", staged),
+            ],
+            transaction=True,
+        )
+        if kept is not None:
+            published.extend(ensure_record_id(row["id"]) for row in rows)
+        if numpy_backend and rows:
+            await update_numpy_index(
+                source_id,
+                [str(row["id"]) for row in rows],
+                [row["embedding"] for row in rows],
+                append=True,
+            )
+
+    old_vars: Dict[str, Any] = {
+        "source_id": source_record_id,
+        "generation": generation,
+        "limit": batch_size,
+    }
+    if kept is None:
+        old_chunks = "source = $source_id AND generation != $generation"
+    else:
+        # Also drops rows added since the alignment
+        old_chunks = "source = $source_id AND id NOT IN $keep"
+        old_vars["keep"] = [ensure_record_id(rid) for rid in kept] + published
+    while True:
+        deleted = await repo_query(
+            f"DELETE (SELECT id FROM source_embedding WHERE {old_chunks} "
+            "LIMIT $limit).id RETURN VALUE $before.id",
+            old_vars,
+        )
+        await remove_rows_from_numpy_index(source_id, [str(rid) for rid in deleted])
+        if len(deleted) < batch_size:
+            break
+    if kept is not None:
+        # Chunks staged by an earlier attempt that are now kept instead
+        await repo_query(
+            "DELETE source_embedding_staging WHERE generation = $generation",
+            old_vars,
+        )
+
+
+async def embed_source_streaming(
+    source_id: str,
+    length: int,
+    text_hash: str,
+    file_path: Optional[str],
+    command_id: str,
+) -> Tuple[int, int]:
+    """
+    Chunk, embed and store a huge source window by window.
+
+    Three stages run concurrently: chunking the text as it is read, embedding
+    a window of chunks, and staging the previous window. The queue between
+    embedding and staging holds a single window, so a slow stage holds back
+    the others and memory stays bounded by a few windows and one segment of
+    text, whatever the size of the source.
+
+    Windows are staged under a generation marker (see staging_generation())
+    and published at the end by publish_staged_chunks(). A retry after a
+    failure continues after the last staged window of the same generation
+    instead of embedding everything again. Returns the number of chunks,
+    and how many of them were staged by an earlier attempt.
+    """
+    source_record_id = ensure_record_id(source_id)
+    model_key = embedding_model_key(await model_manager.get_embedding_model())
+    generation = staging_generation(source_id, text_hash, model_key)
+    resumed = len(await start_staging(source_record_id, generation))
+    if resumed:
+        logger.info(
+            f"Source {source_id}: continuing after {resumed} chunks "
+            "embedded by an earlier attempt"
+        )
+
+    windows = stream_chunk_windows(
+        stream_source_text(source_record_id, length),
+        file_path,
+        get_stream_window_chunks(),
+        skip=resumed,
+    )
+    queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=1)
+
+    async def embed_windows() -> None:
+        try:
+            async for window, position in windows:
+                embeddings = await generate_embeddings(window, command_id=command_id)
+                if len(embeddings) != len(window):
+                    raise ValueError(
+                        f"Embedding count mismatch: got {len(embeddings)} "
+                        f"embeddings for {len(window)} chunks"
+                    )
+                await queue.put((window, embeddings, position))
+            await queue.put(None)
+        except Exception as e:
+            await queue.put(e)
+
+    total_chunks = resumed
+    producer = asyncio.create_task(embed_windows())
+    try:
+        while (item := await queue.get()) is not None:
+            if isinstance(item, Exception):
+                raise item
+            window, embeddings, position = item
+            orders = list(range(total_chunks, total_chunks + len(window)))
+            await stage_chunks(
+                source_record_id, generation, model_key, orders, window, embeddings
+            )
+            total_chunks += len(window)
+            logger.info(
+                f"Source {source_id}: {total_chunks} chunks embedded "
+                f"({position * 100 // length}% of the text)"
+            )
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+    if total_chunks == 0:
+        raise ValueError("No chunks created after splitting text")
+
+    dimension = await staged_dimension(generation)
+    if dimension:
+        await prepare_vector_indexes(dimension)
+    async with get_write_coordinator().serialize(source_id):
+        await publish_staged_chunks(source_id, generation, range(total_chunks))
+    return total_chunks, resumed
+
+
 @command(
     "embed_note",
     app="open_notebook",
@@ -138,7 +608,8 @@ async def embed_note_command(input_data: EmbedNoteInput) -> EmbedNoteOutput:
 
     Flow:
     1. Load Note by ID
-    2. Generate embedding via generate_embedding() (auto-chunks + mean pools if needed)
+    2. Generate embedding via generate_embedding_batched() (auto-chunks + mean
+       pools if needed; short notes share a provider call with concurrent jobs)
     3. UPSERT note embedding in database
 
     Retry Strategy:
@@ -152,7 +623,7 @@ async def embed_note_command(input_data: EmbedNoteInput) -> EmbedNoteOutput:
         logger.info(f"Starting embedding for note: {input_data.note_id}")
 
         # 1. Load note
-        note = await Note.get(input_data.note_id)
+        note = await Note.get(input_data.note_id, cached=False)
         if not note:
             raise ValueError(f"Note '{input_data.note_id}' not found")
 
@@ -162,11 +633,12 @@ async def embed_note_command(input_data: EmbedNoteInput) -> EmbedNoteOutput:
         # 2. Generate embedding (auto-chunks + mean pools if needed)
         # Notes are typically markdown content
         cmd_id = get_command_id(input_data)
-        embedding = await generate_embedding(
+        embedding = await generate_embedding_batched(
             note.content, content_type=ContentType.MARKDOWN, command_id=cmd_id
         )
 
         # 3. UPSERT embedding into note record
+        await prepare_vector_indexes(len(embedding))
         await repo_query(
             "UPDATE $note_id SET embedding = $embedding",
             {
@@ -174,6 +646,7 @@ async def embed_note_command(input_data: EmbedNoteInput) -> EmbedNoteOutput:
                 "embedding": embedding,
             },
         )
+        await update_numpy_index(input_data.note_id, [input_data.note_id], [embedding])
 
         processing_time = time.time() - start_time
         logger.info(
@@ -230,7 +703,8 @@ async def embed_insight_command(input_data: EmbedInsightInput) -> EmbedInsightOu
 
     Flow:
     1. Load SourceInsight by ID
-    2. Generate embedding via generate_embedding() (auto-chunks + mean pools if needed)
+    2. Generate embedding via generate_embedding_batched() (auto-chunks + mean
+       pools if needed; short insights share a provider call with concurrent jobs)
     3. UPSERT insight embedding in database
 
     Retry Strategy:
@@ -244,7 +718,7 @@ async def embed_insight_command(input_data: EmbedInsightInput) -> EmbedInsightOu
         logger.info(f"Starting embedding for insight: {input_data.insight_id}")
 
         # 1. Load insight
-        insight = await SourceInsight.get(input_data.insight_id)
+        insight = await SourceInsight.get(input_data.insight_id, cached=False)
         if not insight:
             raise ValueError(f"Insight '{input_data.insight_id}' not found")
 
@@ -256,11 +730,12 @@ async def embed_insight_command(input_data: EmbedInsightInput) -> EmbedInsightOu
         # 2. Generate embedding (auto-chunks + mean pools if needed)
         # Insights are typically markdown content (generated by LLM)
         cmd_id = get_command_id(input_data)
-        embedding = await generate_embedding(
+        embedding = await generate_embedding_batched(
             insight.content, content_type=ContentType.MARKDOWN, command_id=cmd_id
         )
 
         # 3. UPSERT embedding into insight record
+        await prepare_vector_indexes(len(embedding))
         await repo_query(
             "UPDATE $insight_id SET embedding = $embedding",
             {
@@ -268,6 +743,9 @@ async def embed_insight_command(input_data: EmbedInsightInput) -> EmbedInsightOu
                 "embedding": embedding,
             },
         )
+        await update_numpy_index(
+            input_data.insight_id, [input_data.insight_id], [embedding]
+        )
 
         processing_time = time.time() - start_time
         logger.info(
@@ -324,11 +802,22 @@ async def embed_source_command(input_data: EmbedSourceInput) -> EmbedSourceOutpu
 
     Flow:
     1. Load Source by ID
-    2. DELETE existing source_embedding records for this source
-    3. Detect content type from file path or content
-    4. Chunk text using appropriate splitter
-    5. Generate embeddings for all chunks in a single API call
-    6. Bulk INSERT source_embedding records
+    2. Detect content type from file path or content
+    3. Chunk text using appropriate splitter
+    4. Generate embeddings EMBEDDING_STREAM_WINDOW_CHUNKS chunks at a time
+       (chunks embedded before by the same model come from the embedding
+       cache), staging each window under the run's generation marker
+    5. Publish the staged chunks in place of the old ones in bounded
+       batches (see publish_staged_chunks()); searches use the old chunks
+       until the new ones are in
+
+    A retry continues after the last staged window. Incremental mode aligns
+    the new chunks with the stored ones by content and position (see
+    align_chunks()). Unchanged chunks keep their rows (and only get a new
+    order if they moved); only changed chunks are embedded and replaced.
+
+    Sources longer than EMBEDDING_STREAM_MIN_CHARS are never loaded whole:
+    embed_source_streaming() reads, chunks and embeds them window by window.
 
     Retry Strategy:
     - Retries up to 5 times for transient failures (network, timeout, etc.)
@@ -340,27 +829,52 @@ async def embed_source_command(input_data: EmbedSourceInput) -> EmbedSourceOutpu
     try:
         logger.info(f"Starting embedding for source: {input_data.source_id}")
 
+        # Huge sources are streamed rather than loaded whole
+        min_chars = get_stream_min_chars()
+        if min_chars:
+            info = await source_text_info(input_data.source_id)
+            if info and info["length"] > min_chars:
+                if input_data.incremental:
+                    logger.debug(
+                        f"Source {input_data.source_id} is streamed: "
+                        "replacing all chunks instead of only the changed ones"
+                    )
+                total_chunks, resumed = await embed_source_streaming(
+                    input_data.source_id,
+                    info["length"],
+                    info["text_hash"],
+                    info.get("file_path"),
+                    get_command_id(input_data),
+                )
+                processing_time = time.time() - start_time
+                logger.info(
+                    f"Successfully embedded source {input_data.source_id}: "
+                    f"{total_chunks} chunks streamed ({resumed} resumed) "
+                    f"in {processing_time:.2f}s"
+                )
+                return EmbedSourceOutput(
+                    success=True,
+                    source_id=input_data.source_id,
+                    chunks_created=total_chunks,
+                    chunks_reused=resumed,
+                    streamed=True,
+                    processing_time=processing_time,
+                )
+
         # 1. Load source
-        source = await Source.get(input_data.source_id)
+        source = await Source.get(input_data.source_id, cached=False)
         if not source:
             raise ValueError(f"Source '{input_data.source_id}' not found")
 
         if not source.full_text or not source.full_text.strip():
             raise ValueError(f"Source '{input_data.source_id}' has no text to embed")
 
-        # 2. DELETE existing embeddings (idempotency)
-        logger.debug(f"Deleting existing embeddings for source {input_data.source_id}")
-        await repo_query(
-            "DELETE source_embedding WHERE source = $source_id",
-            {"source_id": ensure_record_id(input_data.source_id)},
-        )
-
-        # 3. Detect content type from file path if available
+        # 2. Detect content type from file path if available
         file_path = source.asset.file_path if source.asset else None
         content_type = detect_content_type(source.full_text, file_path)
         logger.debug(f"Detected content type: {content_type.value}")
 
-        # 4. Chunk text using appropriate splitter
+        # 3. Chunk text using appropriate splitter
         chunks = chunk_text(source.full_text, content_type=content_type)
         total_chunks = len(chunks)
 
@@ -376,42 +890,86 @@ async def embed_source_command(input_data: EmbedSourceInput) -> EmbedSourceOutpu
         if total_chunks == 0:
             raise ValueError("No chunks created after splitting text")
 
-        # 5. Generate embeddings for all chunks in single API call
         cmd_id = get_command_id(input_data)
-        logger.debug(f"Generating embeddings for {total_chunks} chunks")
-        embeddings = await generate_embeddings(chunks, command_id=cmd_id)
-
-        # Verify we got embeddings for all chunks
-        if len(embeddings) != len(chunks):
-            raise ValueError(
-                f"Embedding count mismatch: got {len(embeddings)} embeddings "
-                f"for {len(chunks)} chunks"
+        source_record_id = ensure_record_id(input_data.source_id)
+        model_key = embedding_model_key(await model_manager.get_embedding_model())
+        text_hash = hashlib.sha256(source.full_text.encode("utf-8")).hexdigest()
+        generation = staging_generation(input_data.source_id, text_hash, model_key)
+
+        kept: Dict[int, Dict[str, Any]] = {}
+        stale: List[str] = []
+        if input_data.incremental:
+            existing = await repo_query(
+                "SELECT id, order, content, model "
+                "FROM source_embedding WHERE source = $source_id",
+                {"source_id": source_record_id},
+            )
+            kept, stale = align_chunks(existing, chunks, model_key)
+            logger.debug(
+                f"Source {input_data.source_id}: {len(kept)} of {total_chunks} "
+                f"chunks unchanged, {len(stale)} stored chunks outdated"
+            )
+        changed = [idx for idx in range(total_chunks) if idx not in kept]
+
+        # 4. Embed the changed chunks a window at a time, staging each window
+        # so that a retry continues after the last staged one
+        staged = set(await start_staging(source_record_id, generation, changed))
+        pending = [idx for idx in changed if idx not in staged]
+        if staged:
+            logger.info(
+                f"Source {input_data.source_id}: continuing after {len(staged)} "
+                "chunks embedded by an earlier attempt"
+            )
+        logger.debug(f"Generating embeddings for {len(pending)} chunks")
+        window_size = get_stream_window_chunks()
+        for start in range(0, len(pending), window_size):
+            orders = pending[start : start + window_size]
+            window = [chunks[idx] for idx in orders]
+            embeddings = await generate_embeddings(window, command_id=cmd_id)
+            if len(embeddings) != len(window):
+                raise ValueError(
+                    f"Embedding count mismatch: got {len(embeddings)} embeddings "
+                    f"for {len(window)} chunks"
+                )
+            await stage_chunks(
+                source_record_id, generation, model_key, orders, window, embeddings
             )
 
-        # 6. Bulk INSERT source_embedding records
-        records = [
-            {
-                "source": ensure_record_id(input_data.source_id),
-                "order": idx,
-                "content": chunk,
-                "embedding": embedding,
-            }
-            for idx, (chunk, embedding) in enumerate(zip(chunks, embeddings))
+        # 5. Publish the staged chunks in bounded batches
+        moves = [
+            {"id": ensure_record_id(row["id"]), "order": idx}
+            for idx, row in kept.items()
+            if row["order"] != idx
         ]
-
-        logger.debug(f"Inserting {len(records)} source_embedding records")
-        await repo_insert("source_embedding", records)
+        logger.debug(
+            f"Replacing embeddings for source {input_data.source_id}: "
+            f"{len(changed)} inserted, {len(moves)} reordered, "
+            f"{len(stale)} deleted"
+        )
+        dimension = await staged_dimension(generation) if changed else None
+        if dimension:
+            await prepare_vector_indexes(dimension)
+        async with get_write_coordinator().serialize(input_data.source_id):
+            await publish_staged_chunks(
+                input_data.source_id,
+                generation,
+                changed,
+                kept=[str(row["id"]) for row in kept.values()],
+                moves=moves,
+            )
 
         processing_time = time.time() - start_time
         logger.info(
             f"Successfully embedded source {input_data.source_id}: "
-            f"{total_chunks} chunks in {processing_time:.2f}s"
+            f"{total_chunks} chunks ({len(kept)} unchanged) "
+            f"in {processing_time:.2f}s"
         )
 
         return EmbedSourceOutput(
             success=True,
             source_id=input_data.source_id,
             chunks_created=total_chunks,
+            chunks_reused=len(kept),
             processing_time=processing_time,
         )
 
@@ -479,21 +1037,23 @@ async def create_insight_command(
             f"type={input_data.insight_type}"
         )
 
-        # 1. Create insight record in database
-        result = await repo_query(
-            """
-            CREATE source_insight CONTENT {
-                "source": $source_id,
-                "insight_type": $insight_type,
-                "content": $content
-            };
-            """,
-            {
-                "source_id": ensure_record_id(input_data.source_id),
-                "insight_type": input_data.insight_type,
-                "content": input_data.content,
-            },
-        )
+        # 1. Create insight record in database (one write per source at a time,
+        # so parallel transformations do not conflict with each other)
+        async with get_write_coordinator().serialize(input_data.source_id):
+            result = await repo_query(
+                """
+                CREATE source_insight CONTENT {
+                    "source": $source_id,
+                    "insight_type": $insight_type,
+                    "content": $content
+                };
+                """,
+                {
+                    "source_id": ensure_record_id(input_data.source_id),
+                    "insight_type": input_data.insight_type,
+                    "content": input_data.content,
+                },
+            )
 
         if not result or len(result) == 0:
             raise ValueError("Failed to create insight - no result returned")
@@ -545,242 +1105,434 @@ async def create_insight_command(
         raise
 
 
-async def collect_items_for_rebuild(
-    mode: str,
-    include_sources: bool,
-    include_notes: bool,
-    include_insights: bool,
-) -> Dict[str, List[str]]:
+def rebuild_conditions(mode: str) -> Dict[str, str]:
+    """Condition selecting the records of each table a rebuild covers."""
+    if mode == "existing":
+        # Records that already have embeddings (sources: at least one chunk,
+        # found through the source_embedding.source index)
+        embedded = "embedding != none AND array::len(embedding) > 0"
+        return {
+            "source": f"""
+                (SELECT VALUE id FROM source_embedding
+                    WHERE source = $parent.id AND {embedded}
+                    LIMIT 1) != []
+            """,
+            "note": embedded,
+            "source_insight": embedded,
+        }
+    # mode == "all": every record with non-empty content
+    return {
+        "source": "full_text != none AND string::trim(full_text) != ''",
+        "note": "content != none AND string::trim(content) != ''",
+        "source_insight": "content != none AND string::trim(content) != ''",
+    }
+
+
+async def count_rebuild_items(
+    table: str, where: str, after: Optional[str] = None
+) -> int:
+    """Records of `table` matching `where`, after the record `after` if set."""
+    vars: Dict[str, Any] = {}
+    if after:
+        where = f"({where}) AND id > $after"
+        vars["after"] = ensure_record_id(after)
+    rows = await repo_query(
+        f"SELECT count() AS count FROM {table} WHERE {where} GROUP ALL", vars
+    )
+    return rows[0]["count"] if rows else 0
+
+
+async def _rebuild_windows(
+    table: str, where: str, fields: str, after: Optional[str]
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Records of `table` after `after`, in id order, a window at a time."""
+    size = get_rebuild_window_size()
+    window: List[Dict[str, Any]] = []
+    async for row in repo_stream(
+        table, where=where, fields=fields, page_size=size, after=after
+    ):
+        window.append(row)
+        if len(window) == size:
+            yield window
+            window = []
+    if window:
+        yield window
+
+
+def _source_chunks(row: Dict[str, Any]) -> List[str]:
+    text = row.get("full_text") or ""
+    if not text.strip():
+        raise ValueError("no text to embed")
+    file_path = row.get("file_path")
+    chunks = chunk_text(text, content_type=detect_content_type(text, file_path))
+    if not chunks:
+        raise ValueError("no chunks created after splitting text")
+    return chunks
+
+
+def _text_chunks(row: Dict[str, Any]) -> List[str]:
+    # Same as generate_embedding(): long texts are chunked and mean pooled
+    text = (row.get("content") or "").strip()
+    if not text:
+        raise ValueError("no content to embed")
+    if len(text) <= CHUNK_SIZE:
+        return [text]
+    chunks = chunk_text(text, content_type=ContentType.MARKDOWN)
+    if not chunks:
+        raise ValueError("text chunking produced no chunks")
+    return chunks
+
+
+async def rebuild_streamed_source(
+    source_id: str, checkpoint: RebuildCheckpoint, command_id: str
+) -> None:
+    """Re-embed a huge source of a rebuild window through the streaming path."""
+    info = await source_text_info(source_id)
+    try:
+        if not info or not info["length"]:
+            raise ValueError("no text to embed")
+        await embed_source_streaming(
+            source_id,
+            info["length"],
+            info["text_hash"],
+            info.get("file_path"),
+            command_id,
+        )
+    except ValueError as e:
+        logger.warning(f"Skipping {source_id} in embedding rebuild: {e}")
+        checkpoint.failed += 1
+        return
+    checkpoint.sources += 1
+
+
+async def rebuild_window(
+    table: str,
+    rows: List[Dict[str, Any]],
+    checkpoint: RebuildCheckpoint,
+    command_id: str,
+    model_key: str,
+) -> None:
     """
-    Collect items to rebuild based on mode and include flags.
+    Re-embed a window of records and save them with the advanced checkpoint.
 
-    Returns:
-        Dict with keys: 'sources', 'notes', 'insights' containing lists of item IDs
-    """
-    items: Dict[str, List[str]] = {"sources": [], "notes": [], "insights": []}
+    The chunks of every record in the window are embedded together, so
+    generate_embeddings() sends full-size requests however small each record
+    is. The new embeddings and the checkpoint are written in one transaction:
+    after a crash the window is either done and skipped, or redone.
 
-    if include_sources:
-        if mode == "existing":
-            # Query sources with embeddings (via source_embedding table)
-            result = await repo_query(
-                """
-                RETURN array::distinct(
-                    SELECT VALUE source.id
-                    FROM source_embedding
-                    WHERE embedding != none AND array::len(embedding) > 0
-                )
-                """
+    Source rows only carry the length of their text. Sources longer than
+    EMBEDDING_STREAM_MIN_CHARS go through embed_source_streaming() one at a
+    time, and only the text of the others is loaded.
+    """
+    if table == "source":
+        rows_to_load = []
+        min_chars = get_stream_min_chars()
+        for row in rows:
+            if min_chars and row["length"] > min_chars:
+                await rebuild_streamed_source(str(row["id"]), checkpoint, command_id)
+            else:
+                rows_to_load.append(row)
+        texts_by_row = (
+            await repo_query(
+                "SELECT id, full_text, asset.file_path AS file_path FROM $ids",
+                {"ids": [ensure_record_id(row["id"]) for row in rows_to_load]},
             )
-            # RETURN returns the array directly as the result (not nested)
-            if result:
-                items["sources"] = [str(item) for item in result]
+            if rows_to_load
+            else []
+        )
+    else:
+        texts_by_row = rows
+
+    chunks_by_id: Dict[str, List[str]] = {}
+    for row in texts_by_row:
+        record_id = str(row["id"])
+        try:
+            if table == "source":
+                chunks_by_id[record_id] = _source_chunks(row)
             else:
-                items["sources"] = []
-        else:  # mode == "all"
-            # Query all sources with non-empty content
-            result = await repo_query(
-                "SELECT id FROM source WHERE full_text != none AND string::trim(full_text) != ''"
+                chunks_by_id[record_id] = _text_chunks(row)
+        except Exception as e:
+            logger.warning(f"Skipping {record_id} in embedding rebuild: {e}")
+            checkpoint.failed += 1
+
+    texts = [chunk for chunks in chunks_by_id.values() for chunk in chunks]
+    embeddings = await generate_embeddings(texts, command_id=command_id)
+    if len(embeddings) != len(texts):
+        raise ValueError(
+            f"Embedding count mismatch: got {len(embeddings)} embeddings "
+            f"for {len(texts)} chunks"
+        )
+    vectors_by_id: Dict[str, List[List[float]]] = {}
+    offset = 0
+    for record_id, chunks in chunks_by_id.items():
+        vectors_by_id[record_id] = embeddings[offset : offset + len(chunks)]
+        offset += len(chunks)
+
+    statements: List[BatchStatement] = []
+    records: List[Dict[str, Any]] = []
+    if table == "source":
+        records = [
+            {
+                "source": ensure_record_id(record_id),
+                "order": idx,
+                "content": chunk,
+                "embedding": vector,
+                "model": model_key,
+            }
+            for record_id, chunks in chunks_by_id.items()
+            for idx, (chunk, vector) in enumerate(
+                zip(chunks, vectors_by_id[record_id])
             )
-            items["sources"] = [str(item["id"]) for item in result] if result else []
-
-        logger.info(f"Collected {len(items['sources'])} sources for rebuild")
-
-    if include_notes:
-        if mode == "existing":
-            # Query notes with embeddings
-            result = await repo_query(
-                "SELECT id FROM note WHERE embedding != none AND array::len(embedding) > 0"
+        ]
+        statements.append(
+            (
+                "DELETE source_embedding WHERE source IN $sources",
+                {"sources": [ensure_record_id(rid) for rid in chunks_by_id]},
             )
-        else:  # mode == "all"
-            # Query all notes with non-empty content
-            result = await repo_query(
-                "SELECT id FROM note WHERE content != none AND string::trim(content) != ''"
+        )
+        if records:
+            statements.append(
+                ("INSERT INTO source_embedding $records", {"records": records})
             )
-
-        items["notes"] = [str(item["id"]) for item in result] if result else []
-        logger.info(f"Collected {len(items['notes'])} notes for rebuild")
-
-    if include_insights:
-        if mode == "existing":
-            # Query insights with embeddings
-            result = await repo_query(
-                "SELECT id FROM source_insight WHERE embedding != none AND array::len(embedding) > 0"
+        checkpoint.sources += len(chunks_by_id)
+    else:
+        updates: Dict[str, List[float]] = {}
+        for record_id, vectors in vectors_by_id.items():
+            if len(vectors) == 1:
+                updates[record_id] = vectors[0]
+            else:
+                updates[record_id] = await mean_pool_embeddings(vectors)
+        vectors_by_id = {rid: [vector] for rid, vector in updates.items()}
+        if updates:
+            statements.append(
+                (
+                    "FOR $row IN $rows "
+                    "{ UPDATE $row.id SET embedding = $row.embedding }",
+                    {
+                        "rows": [
+                            {"id": ensure_record_id(rid), "embedding": vector}
+                            for rid, vector in updates.items()
+                        ]
+                    },
+                )
             )
-        else:  # mode == "all"
-            # Query all insights with non-empty content
-            result = await repo_query(
-                "SELECT id FROM source_insight WHERE content != none AND string::trim(content) != ''"
+        if table == "note":
+            checkpoint.notes += len(updates)
+        else:
+            checkpoint.insights += len(updates)
+
+    checkpoint.phase = table
+    checkpoint.cursor = str(rows[-1]["id"])
+    checkpoint.processed += len(rows)
+    checkpoint.run_processed += len(rows)
+    statements.append(checkpoint.statement(command_id))
+
+    if embeddings:
+        await prepare_vector_indexes(len(embeddings[0]))
+    async with AsyncExitStack() as locks:
+        # Lock in a fixed order; single-record writers hold one lock at a time
+        for record_id in sorted(chunks_by_id):
+            await locks.enter_async_context(
+                get_write_coordinator().serialize(record_id)
             )
+        results = await repo_batch(statements, transaction=True)
+        if get_vector_search_backend() == "numpy":
+            chunk_ids: Dict[str, List[str]] = {rid: [] for rid in vectors_by_id}
+            if table == "source" and records:
+                inserted = sorted(
+                    results[1], key=lambda row: (str(row["source"]), row["order"])
+                )
+                for row in inserted:
+                    chunk_ids[str(row["source"])].append(str(row["id"]))
+            elif table != "source":
+                chunk_ids = {rid: [rid] for rid in vectors_by_id}
+            for record_id, vectors in vectors_by_id.items():
+                await update_numpy_index(record_id, chunk_ids[record_id], vectors)
+
 
-        items["insights"] = [str(item["id"]) for item in result] if result else []
-        logger.info(f"Collected {len(items['insights'])} insights for rebuild")
+async def start_checkpoint(
+    command_id: str, scope: str, resume: bool
+) -> Tuple[RebuildCheckpoint, bool]:
+    """
+    The checkpoint to continue from, and whether it continues earlier work.
 
-    return items
+    A retried command continues its own checkpoint; a new command takes over
+    the latest unfinished rebuild of the same scope when `resume` is set.
+    """
+    checkpoint = await load_checkpoint(command_id)
+    if checkpoint and checkpoint.status in ("running", "failed"):
+        return checkpoint, checkpoint.processed > 0
+    if resume:
+        found = await find_resumable_checkpoint(scope, command_id)
+        if found:
+            previous_id, checkpoint = found
+            logger.info(
+                f"Resuming embedding rebuild {previous_id} after "
+                f"{checkpoint.processed} items ({checkpoint.phase} {checkpoint.cursor})"
+            )
+            resumed = checkpoint.model_copy()
+            checkpoint.status = "resumed"
+            await checkpoint.save(previous_id)
+            return resumed, True
+    return RebuildCheckpoint(scope=scope), False
 
 
-@command("rebuild_embeddings", app="open_notebook", retry=None)
+@command(
+    "rebuild_embeddings",
+    app="open_notebook",
+    retry={
+        "max_attempts": 3,
+        "wait_strategy": "exponential_jitter",
+        "wait_min": 5,
+        "wait_max": 120,
+        "stop_on": [ValueError],  # Don't retry validation errors
+        "retry_log_level": "debug",
+    },
+)
 async def rebuild_embeddings_command(
     input_data: RebuildEmbeddingsInput,
 ) -> RebuildEmbeddingsOutput:
     """
     Rebuild embeddings for sources, notes, and/or insights.
 
-    This command submits individual embedding jobs for each item:
-    - embed_source for sources
-    - embed_note for notes
-    - embed_insight for insights
+    Records are processed in id order, EMBEDDING_REBUILD_WINDOW_SIZE at a
+    time, inside this command (see rebuild_window()): the chunks of a whole
+    window are embedded in full-size requests and written with one
+    transaction, instead of queueing one embed_* command per record.
 
-    The command returns after submitting all jobs. Actual embedding
-    happens asynchronously via the individual commands (which have
-    their own retry strategies).
+    Each window also saves the rebuild checkpoint (see rebuild_checkpoint.py),
+    so the status endpoint reports progress, throughput and time remaining,
+    and an interrupted rebuild resumes after its last finished window.
 
     Retry Strategy:
-    - Retries disabled (retry=None) for this coordinator command
-    - Individual embed_* commands handle their own retries
+    - Retries up to 3 times for transient failures, resuming from the
+      checkpoint
+    - Does NOT retry permanent failures (ValueError for validation errors)
+    - Records that cannot be embedded (no text) are skipped and counted as
+      failed
     """
     start_time = time.time()
+    command_id = get_command_id(input_data)
+    included = {
+        "source": input_data.include_sources,
+        "note": input_data.include_notes,
+        "source_insight": input_data.include_insights,
+    }
+    tables = tuple(table for table, include in included.items() if include)
+    checkpoint = RebuildCheckpoint(scope=rebuild_scope(input_data.mode, tables))
+    resumed = False
 
     try:
-        logger.info("=" * 60)
-        logger.info(f"Starting embedding rebuild with mode={input_data.mode}")
         logger.info(
-            f"Include: sources={input_data.include_sources}, notes={input_data.include_notes}, insights={input_data.include_insights}"
+            f"Starting embedding rebuild with mode={input_data.mode}, "
+            f"tables={', '.join(tables)}"
         )
-        logger.info("=" * 60)
 
         # Check embedding model availability (fail fast)
-        EMBEDDING_MODEL = await model_manager.get_embedding_model()
-        if not EMBEDDING_MODEL:
+        embedding_model = await model_manager.get_embedding_model()
+        if not embedding_model:
             raise ValueError(
                 "No embedding model configured. Please configure one in the Models section."
             )
+        model_key = embedding_model_key(embedding_model)
 
-        logger.info(f"Embedding model configured: {EMBEDDING_MODEL}")
-
-        # Collect items to process (returns IDs only)
-        items = await collect_items_for_rebuild(
-            input_data.mode,
-            input_data.include_sources,
-            input_data.include_notes,
-            input_data.include_insights,
+        checkpoint, resumed = await start_checkpoint(
+            command_id, checkpoint.scope, input_data.resume
         )
-
-        total_items = (
-            len(items["sources"]) + len(items["notes"]) + len(items["insights"])
+        conditions = rebuild_conditions(input_data.mode)
+        # Tables before the checkpoint's phase are done
+        if checkpoint.phase in tables:
+            tables = tables[tables.index(checkpoint.phase) :]
+
+        remaining = 0
+        for table in tables:
+            after = checkpoint.cursor if table == checkpoint.phase else None
+            remaining += await count_rebuild_items(table, conditions[table], after)
+        checkpoint.total = checkpoint.processed + remaining
+        checkpoint.status = "running"
+        checkpoint.error_message = None
+        checkpoint.run_started = datetime.now(timezone.utc)
+        checkpoint.run_processed = 0
+        await checkpoint.save(command_id)
+        logger.info(
+            f"Rebuilding embeddings of {remaining} items with {model_key}"
+            + (f" ({checkpoint.processed} done earlier)" if resumed else "")
         )
-        logger.info(f"Total items to rebuild: {total_items}")
 
-        if total_items == 0:
-            logger.warning("No items found to rebuild")
-            return RebuildEmbeddingsOutput(
-                success=True,
-                total_items=0,
-                jobs_submitted=0,
-                failed_submissions=0,
-                processing_time=time.time() - start_time,
+        for table in tables:
+            after = checkpoint.cursor if table == checkpoint.phase else None
+            fields = (
+                "id, string::len(full_text ?? '') AS length"
+                if table == "source"
+                else "id, content"
             )
-
-        # Initialize counters
-        sources_submitted = 0
-        notes_submitted = 0
-        insights_submitted = 0
-        failed_submissions = 0
-
-        # Submit embed_source commands for sources
-        logger.info(f"\nSubmitting {len(items['sources'])} source embedding jobs...")
-        for idx, source_id in enumerate(items["sources"], 1):
-            try:
-                submit_command(
-                    "open_notebook",
-                    "embed_source",
-                    {"source_id": source_id},
+            async for rows in _rebuild_windows(
+                table, conditions[table], fields, after
+            ):
+                await rebuild_window(table, rows, checkpoint, command_id, model_key)
+                rate, eta = checkpoint.throughput()
+                logger.info(
+                    f"  Progress: {checkpoint.processed}/{checkpoint.total} items"
+                    + (f", {rate:.1f}/s, {eta:.0f}s left" if rate else "")
                 )
-                sources_submitted += 1
-
-                if idx % 50 == 0 or idx == len(items["sources"]):
-                    logger.info(
-                        f"  Progress: {idx}/{len(items['sources'])} source jobs submitted"
-                    )
 
-            except Exception as e:
-                logger.error(f"Failed to submit embed_source for {source_id}: {e}")
-                failed_submissions += 1
-
-        # Submit embed_note commands for notes
-        logger.info(f"\nSubmitting {len(items['notes'])} note embedding jobs...")
-        for idx, note_id in enumerate(items["notes"], 1):
-            try:
-                submit_command(
-                    "open_notebook",
-                    "embed_note",
-                    {"note_id": note_id},
-                )
-                notes_submitted += 1
-
-                if idx % 50 == 0 or idx == len(items["notes"]):
-                    logger.info(
-                        f"  Progress: {idx}/{len(items['notes'])} note jobs submitted"
-                    )
-
-            except Exception as e:
-                logger.error(f"Failed to submit embed_note for {note_id}: {e}")
-                failed_submissions += 1
-
-        # Submit embed_insight commands for insights
-        logger.info(f"\nSubmitting {len(items['insights'])} insight embedding jobs...")
-        for idx, insight_id in enumerate(items["insights"], 1):
-            try:
-                submit_command(
-                    "open_notebook",
-                    "embed_insight",
-                    {"insight_id": insight_id},
-                )
-                insights_submitted += 1
-
-                if idx % 50 == 0 or idx == len(items["insights"]):
-                    logger.info(
-                        f"  Progress: {idx}/{len(items['insights'])} insight jobs submitted"
-                    )
-
-            except Exception as e:
-                logger.error(f"Failed to submit embed_insight for {insight_id}: {e}")
-                failed_submissions += 1
+        checkpoint.status = "completed"
+        # Items that appeared during the rebuild were rebuilt as well
+        checkpoint.total = max(checkpoint.total, checkpoint.processed)
+        await checkpoint.save(command_id)
+        processing_time = time.time() - start_time
+        rate, _ = checkpoint.throughput()
+        logger.info(
+            f"Rebuilt embeddings of {checkpoint.processed} items in "
+            f"{processing_time:.2f}s: {checkpoint.sources} sources, "
+            f"{checkpoint.notes} notes, {checkpoint.insights} insights, "
+            f"{checkpoint.failed} failed"
+        )
+        return rebuild_output(checkpoint, resumed, processing_time, rate)
 
+    except ValueError as e:
+        # Permanent failure - don't retry
         processing_time = time.time() - start_time
-        jobs_submitted = sources_submitted + notes_submitted + insights_submitted
-
-        logger.info("=" * 60)
-        logger.info("REBUILD JOBS SUBMITTED")
-        logger.info(f"  Total jobs submitted: {jobs_submitted}/{total_items}")
-        logger.info(f"  Sources: {sources_submitted}")
-        logger.info(f"  Notes: {notes_submitted}")
-        logger.info(f"  Insights: {insights_submitted}")
-        logger.info(f"  Failed submissions: {failed_submissions}")
-        logger.info(f"  Submission time: {processing_time:.2f}s")
-        logger.info("  Note: Actual embedding happens asynchronously")
-        logger.info("=" * 60)
-
-        return RebuildEmbeddingsOutput(
-            success=True,
-            total_items=total_items,
-            jobs_submitted=jobs_submitted,
-            failed_submissions=failed_submissions,
-            sources_submitted=sources_submitted,
-            notes_submitted=notes_submitted,
-            insights_submitted=insights_submitted,
-            processing_time=processing_time,
+        logger.error(f"Rebuild embeddings failed (command: {command_id}): {e}")
+        checkpoint.error_message = str(e)
+        await _save_failed_checkpoint(checkpoint, command_id)
+        return rebuild_output(checkpoint, resumed, processing_time, None)
+    except Exception as e:
+        # Transient failure - retried from the checkpoint
+        logger.debug(
+            f"Transient error rebuilding embeddings (command: {command_id}): {e}"
         )
+        checkpoint.error_message = str(e)
+        await _save_failed_checkpoint(checkpoint, command_id)
+        raise
+
 
+async def _save_failed_checkpoint(
+    checkpoint: RebuildCheckpoint, command_id: str
+) -> None:
+    checkpoint.status = "failed"
+    try:
+        await checkpoint.save(command_id)
     except Exception as e:
-        processing_time = time.time() - start_time
-        logger.error(f"Rebuild embeddings failed: {e}")
-        logger.exception(e)
+        logger.warning(f"Could not save embedding rebuild checkpoint: {e}")
 
-        return RebuildEmbeddingsOutput(
-            success=False,
-            total_items=0,
-            jobs_submitted=0,
-            failed_submissions=0,
-            processing_time=processing_time,
-            error_message=str(e),
-        )
+
+def rebuild_output(
+    checkpoint: RebuildCheckpoint,
+    resumed: bool,
+    processing_time: float,
+    items_per_second: Optional[float],
+) -> RebuildEmbeddingsOutput:
+    return RebuildEmbeddingsOutput(
+        success=checkpoint.status == "completed",
+        total_items=checkpoint.total,
+        processed_items=checkpoint.processed,
+        failed_items=checkpoint.failed,
+        sources_processed=checkpoint.sources,
+        notes_processed=checkpoint.notes,
+        insights_processed=checkpoint.insights,
+        items_per_second=items_per_second,
+        resumed=resumed,
+        processing_time=processing_time,
+        error_message=checkpoint.error_message,
+    )
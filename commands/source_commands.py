@@ -83,7 +83,7 @@ async def process_source_command(
         logger.info(f"Loaded {len(transformations)} transformations")
 
         # 2. Get existing source record to update its command field
-        source = await Source.get(input_data.source_id)
+        source = await Source.get(input_data.source_id, cached=False)
         if not source:
             raise ValueError(f"Source '{input_data.source_id}' not found")
 
@@ -216,7 +216,7 @@ async def run_transformation_command(
         )
 
         # Load source
-        source = await Source.get(input_data.source_id)
+        source = await Source.get(input_data.source_id, cached=False)
         if not source:
             raise ValueError(f"Source '{input_data.source_id}' not found")
 
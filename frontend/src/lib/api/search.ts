@@ -1,5 +1,11 @@
 import apiClient from './client'
-import { SearchRequest, SearchResponse, AskRequest } from '@/lib/types/search'
+import {
+  SearchRequest,
+  SearchResponse,
+  BatchSearchRequest,
+  BatchSearchResponse,
+  AskRequest,
+} from '@/lib/types/search'
 
 export const searchApi = {
   // Standard search (non-streaming)
@@ -8,6 +14,12 @@ export const searchApi = {
     return response.data
   },
 
+  // Vector search for several queries in one request
+  batchSearch: async (params: BatchSearchRequest) => {
+    const response = await apiClient.post<BatchSearchResponse>('/search/batch', params)
+    return response.data
+  },
+
   // Ask with streaming (uses relative URL for Docker compatibility)
   askKnowledgeBase: async (params: AskRequest) => {
     // Get auth token using the same logic as apiClient interceptor
@@ -1,11 +1,17 @@
 // Search types
 export interface SearchRequest {
   query: string
-  type: 'text' | 'vector'
+  type: 'text' | 'vector' | 'hybrid'
   limit: number
   search_sources: boolean
   search_notes: boolean
   minimum_score: number
+  text_weight?: number
+  vector_weight?: number
+  notebook_id?: string
+  owned_only?: boolean
+  max_chunks_per_parent?: number
+  snippet_chars?: number
 }
 
 export interface SearchResult {
@@ -14,6 +20,8 @@ export interface SearchResult {
   parent_id: string
   final_score: number
   matches?: string[]
+  // [start, end] offsets of the query terms in each of `matches`
+  highlights?: [number, number][][]
   relevance?: number
   similarity?: number
   score?: number
@@ -29,12 +37,29 @@ export interface SearchResponse {
   search_type: string
 }
 
+export interface BatchSearchRequest {
+  queries: string[]
+  limit?: number
+  search_sources?: boolean
+  search_notes?: boolean
+  minimum_score?: number
+  notebook_id?: string
+  owned_only?: boolean
+  max_chunks_per_parent?: number
+  snippet_chars?: number
+}
+
+export interface BatchSearchResponse {
+  searches: SearchResponse[]
+}
+
 // Ask types
 export interface AskRequest {
   question: string
   strategy_model: string
   answer_model: string
   final_answer_model: string
+  search_type?: 'vector' | 'hybrid'
 }
 
 export interface AskResponse {
@@ -1,8 +1,14 @@
 from esperanto import LanguageModel
+from langchain_core.callbacks import BaseCallbackManager
 from langchain_core.language_models.chat_models import BaseChatModel
 from loguru import logger
 
 from open_notebook.ai.models import model_manager
+from open_notebook.ai.rate_scheduler import (
+    ModelRateLimiter,
+    model_rate_bucket,
+    priority_for,
+)
 from open_notebook.utils import token_count
 
 
@@ -57,4 +63,20 @@ async def provision_langchain_model(
             f"Please check that the model configured for '{default_type}' is a language model, not an embedding or speech model."
         )
 
-    return model.to_langchain()
+    lc_model = model.to_langchain()
+    bucket = model_rate_bucket(model)
+    if bucket is not None and isinstance(lc_model, BaseChatModel):
+        # Providers count the requested completion tokens against the budget
+        limiter = ModelRateLimiter(
+            bucket,
+            priority_for(default_type),
+            token_count,
+            kwargs.get("max_tokens") or 0,
+        )
+        lc_model.rate_limiter = limiter
+        # The limiter learns each call's prompt from on_chat_model_start
+        if isinstance(lc_model.callbacks, BaseCallbackManager):
+            lc_model.callbacks.add_handler(limiter, inherit=False)
+        else:
+            lc_model.callbacks = [*(lc_model.callbacks or []), limiter]
+    return lc_model
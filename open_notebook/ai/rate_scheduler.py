@@ -0,0 +1,452 @@
+"""
+Shared request and token budgets for model provider calls.
+
+Embeddings, transformations, chat and ask all call providers directly, so
+a bulk import used to send requests as fast as the worker could make them
+and run into HTTP 429 storms. Every chat model provisioned through
+provision_langchain_model() and every embedding request now first takes its
+share of a token bucket per provider and API key:
+
+- MODEL_RATE_LIMITS sets requests and tokens per minute per provider; a
+  provider without a budget is not limited
+- Calls that do not fit the budget queue, interactive ones (chat, ask,
+  search queries) ahead of background ones (embedding, transformations),
+  first come first served within a priority
+- A call that waits longer than its priority's deadline fails with
+  RateLimitTimeout, a TimeoutError, so commands retry it later like other
+  transient failures
+- Token costs are estimates: each chat model call is charged its own
+  prompt plus max_tokens, embeddings estimate_tokens() of each request. A
+  cost larger than the whole budget is clamped to it
+
+Podcast generation is not limited: podcast_creator creates and calls its
+own models, out of reach of these buckets.
+
+Buckets are shared by every event loop and thread of a process, so the API
+and the worker each use the full budget; split it between them when both
+make heavy use of one provider. GET /api/models/rate-limits reports each
+bucket's queue depth.
+
+Environment Variables:
+    MODEL_RATE_LIMITS: Budgets as "provider=RPM/TPM,...", e.g. "openai=500/200000,voyage=300" ("*" for any provider; unset: unlimited)
+    MODEL_RATE_LIMIT_INTERACTIVE_DEADLINE: Seconds an interactive call waits for its budget (default: 30)
+    MODEL_RATE_LIMIT_BACKGROUND_DEADLINE: Seconds a background call waits for its budget (default: 600)
+"""
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage, get_buffer_string
+from langchain_core.rate_limiters import BaseRateLimiter
+from loguru import logger
+
+from open_notebook.config import get_env_number
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# Shortest sleep between budget checks, against float rounding
+MIN_WAIT_SECONDS = 0.001
+
+_priority: ContextVar[int] = ContextVar("model_call_priority", default=BACKGROUND)
+# Prompt tokens of the chat model call about to acquire its budget
+_prompt_tokens: ContextVar[Optional[int]] = ContextVar(
+    "model_call_prompt_tokens", default=None
+)
+
+
+class RateLimitTimeout(TimeoutError):
+    """A model call waited longer than its deadline for its rate budget."""
+
+
+@dataclass(frozen=True)
+class RateBudget:
+    rpm: Optional[float] = None  # None: unlimited
+    tpm: Optional[float] = None
+
+
+@lru_cache(maxsize=8)
+def parse_rate_limits(value: str) -> Dict[str, RateBudget]:
+    """Parse "provider=RPM/TPM,..."; either number may be empty or 0."""
+    budgets: Dict[str, RateBudget] = {}
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        try:
+            provider, limits = entry.split("=", 1)
+            rpm, _, tpm = limits.partition("/")
+            budget = RateBudget(
+                rpm=float(rpm) if rpm.strip() else None,
+                tpm=float(tpm) if tpm.strip() else None,
+            )
+        except ValueError:
+            logger.warning(f"Ignoring invalid MODEL_RATE_LIMITS entry '{entry}'")
+            continue
+        budgets[provider.strip().lower().replace("_", "-")] = RateBudget(
+            rpm=budget.rpm if budget.rpm and budget.rpm > 0 else None,
+            tpm=budget.tpm if budget.tpm and budget.tpm > 0 else None,
+        )
+    return budgets
+
+
+def get_rate_budget(provider: str) -> Optional[RateBudget]:
+    budgets = parse_rate_limits(os.environ.get("MODEL_RATE_LIMITS", ""))
+    budget = budgets.get(provider) or budgets.get("*")
+    if budget is None or (budget.rpm is None and budget.tpm is None):
+        return None
+    return budget
+
+
+def get_rate_limit_deadline(priority: int) -> float:
+    if priority == INTERACTIVE:
+        return get_env_number("MODEL_RATE_LIMIT_INTERACTIVE_DEADLINE", 30, 0)
+    return get_env_number("MODEL_RATE_LIMIT_BACKGROUND_DEADLINE", 600, 0)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+@contextmanager
+def model_priority(priority: int) -> Iterator[None]:
+    """Run the model calls made in this context with `priority`."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    tokens: float = field(compare=False)
+    wake: Callable[[], None] = field(compare=False)
+    granted: bool = field(default=False, compare=False)
+    abandoned: bool = field(default=False, compare=False)
+
+
+class RateBucket:
+    """Request and token budgets of one provider key, refilled continuously."""
+
+    def __init__(self, key: str, budget: RateBudget) -> None:
+        self.key = key
+        self.budget = budget
+        self._lock = threading.Lock()
+        # Start full: providers allow a minute's budget as a burst
+        self._requests = budget.rpm or 0.0
+        self._tokens = budget.tpm or 0.0
+        self._updated = time.monotonic()
+        self._waiters: List[_Waiter] = []  # Heap by (priority, arrival)
+        self._seq = itertools.count()
+        self._queued = {priority: 0 for priority in PRIORITY_NAMES}
+        self.granted = 0
+        self.delayed = 0
+        self.timed_out = 0
+        self.wait_seconds = 0.0
+        self.max_queue_depth = 0
+
+    def _cost(self, tokens: float) -> float:
+        if self.budget.tpm is None:
+            return 0.0
+        return min(max(tokens, 0.0), self.budget.tpm)
+
+    def _refill(self, now: float) -> None:
+        elapsed, self._updated = now - self._updated, now
+        if self.budget.rpm is not None:
+            self._requests = min(
+                self.budget.rpm, self._requests + elapsed * self.budget.rpm / 60
+            )
+        if self.budget.tpm is not None:
+            self._tokens = min(
+                self.budget.tpm, self._tokens + elapsed * self.budget.tpm / 60
+            )
+
+    def _delay(self, tokens: float) -> float:
+        """Seconds until a call costing `tokens` fits; 0 if it fits now."""
+        delay = 0.0
+        if self.budget.rpm is not None and self._requests < 1:
+            delay = (1 - self._requests) * 60 / self.budget.rpm
+        if self.budget.tpm is not None and self._tokens < tokens:
+            delay = max(delay, (tokens - self._tokens) * 60 / self.budget.tpm)
+        return delay
+
+    def _grant(self, waiter: _Waiter) -> None:
+        self._requests -= 1
+        self._tokens -= waiter.tokens
+        waiter.granted = True
+        self._queued[waiter.priority] -= 1
+        self.granted += 1
+        waiter.wake()
+
+    def _dispatch(self) -> float:
+        """Grant queued calls in order while they fit; seconds until the next."""
+        self._refill(time.monotonic())
+        while self._waiters:
+            waiter = self._waiters[0]
+            if waiter.abandoned:
+                heapq.heappop(self._waiters)
+                continue
+            delay = self._delay(waiter.tokens)
+            if delay > 0:
+                return delay
+            heapq.heappop(self._waiters)
+            self._grant(waiter)
+        return 0.0
+
+    def _enqueue(
+        self, tokens: float, priority: int, wake: Callable[[], None]
+    ) -> _Waiter:
+        with self._lock:
+            waiter = _Waiter(priority, next(self._seq), self._cost(tokens), wake)
+            heapq.heappush(self._waiters, waiter)
+            self._queued[priority] += 1
+            self._dispatch()
+            if not waiter.granted:
+                self.delayed += 1
+                self.max_queue_depth = max(
+                    self.max_queue_depth, sum(self._queued.values())
+                )
+        return waiter
+
+    def _poll(self, waiter: _Waiter) -> Optional[float]:
+        """None once `waiter` is granted, else seconds to sleep before retrying."""
+        delay = 0.0
+        with self._lock:
+            if not waiter.granted:
+                delay = self._dispatch()
+            if waiter.granted:
+                return None
+        return max(delay, MIN_WAIT_SECONDS)
+
+    def _abandon(self, waiter: _Waiter, timed_out: bool) -> bool:
+        """Leave the queue; True if the call was granted in the meantime."""
+        with self._lock:
+            if waiter.granted:
+                return True
+            waiter.abandoned = True
+            self._queued[waiter.priority] -= 1
+            if timed_out:
+                self.timed_out += 1
+            # Calls behind it may fit now
+            self._dispatch()
+            return False
+
+    def _waited(self, started: float) -> None:
+        with self._lock:
+            self.wait_seconds += time.monotonic() - started
+
+    def _timeout_error(self, priority: int, deadline: float) -> RateLimitTimeout:
+        logger.warning(
+            f"A {PRIORITY_NAMES[priority]} model call timed out after "
+            f"{deadline:.0f}s waiting for the {self.key} rate budget"
+        )
+        return RateLimitTimeout(
+            f"Timed out after {deadline:.0f}s waiting for the {self.key} rate budget"
+        )
+
+    def acquire(
+        self,
+        tokens: float = 0,
+        priority: int = BACKGROUND,
+        deadline: Optional[float] = None,
+        blocking: bool = True,
+    ) -> bool:
+        """Take one request and `tokens`, waiting in line up to `deadline`s."""
+        event = threading.Event()
+        waiter = self._enqueue(tokens, priority, event.set)
+        if waiter.granted:
+            return True
+        if not blocking:
+            return self._abandon(waiter, timed_out=False)
+        if deadline is None:
+            deadline = get_rate_limit_deadline(priority)
+        started = time.monotonic()
+        while (delay := self._poll(waiter)) is not None:
+            remaining = started + deadline - time.monotonic()
+            if remaining <= 0:
+                if self._abandon(waiter, timed_out=True):
+                    break
+                raise self._timeout_error(priority, deadline)
+            event.wait(min(delay, remaining))
+            event.clear()
+        self._waited(started)
+        return True
+
+    async def aacquire(
+        self,
+        tokens: float = 0,
+        priority: int = BACKGROUND,
+        deadline: Optional[float] = None,
+        blocking: bool = True,
+    ) -> bool:
+        """acquire() for event loops; waiting does not block the loop."""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+
+        def wake() -> None:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # The loop closed; its caller is gone
+
+        waiter = self._enqueue(tokens, priority, wake)
+        if waiter.granted:
+            return True
+        if not blocking:
+            return self._abandon(waiter, timed_out=False)
+        if deadline is None:
+            deadline = get_rate_limit_deadline(priority)
+        started = time.monotonic()
+        try:
+            while (delay := self._poll(waiter)) is not None:
+                remaining = started + deadline - time.monotonic()
+                if remaining <= 0:
+                    if self._abandon(waiter, timed_out=True):
+                        break
+                    raise self._timeout_error(priority, deadline)
+                try:
+                    await asyncio.wait_for(event.wait(), min(delay, remaining))
+                except TimeoutError:
+                    pass
+                event.clear()
+        except asyncio.CancelledError:
+            self._abandon(waiter, timed_out=False)
+            raise
+        self._waited(started)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "key": self.key,
+                "rpm": self.budget.rpm,
+                "tpm": self.budget.tpm,
+                "queue_depth": {
+                    PRIORITY_NAMES[priority]: queued
+                    for priority, queued in self._queued.items()
+                },
+                "max_queue_depth": self.max_queue_depth,
+                "available_requests": (
+                    round(self._requests, 2) if self.budget.rpm is not None else None
+                ),
+                "available_tokens": (
+                    round(self._tokens) if self.budget.tpm is not None else None
+                ),
+                "granted": self.granted,
+                "delayed": self.delayed,
+                "timed_out": self.timed_out,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+
+_buckets_lock = threading.Lock()
+_buckets: Dict[str, RateBucket] = {}
+
+
+def credential_fingerprint(model: Any) -> str:
+    """Tell apart the API keys and endpoints of one provider, without the key."""
+    api_key = getattr(model, "api_key", None)
+    base_url = getattr(model, "base_url", None)
+    if not api_key and not base_url:
+        return "default"
+    identity = f"{api_key or ''}|{base_url or ''}"
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()[:12]
+
+
+def get_rate_bucket(provider: str, credential: str = "default") -> Optional[RateBucket]:
+    """The bucket of a provider key, or None if the provider has no budget."""
+    provider = provider.lower().replace("_", "-")
+    budget = get_rate_budget(provider)
+    if budget is None:
+        return None
+    key = f"{provider}:{credential}"
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None or bucket.budget != budget:
+            bucket = _buckets[key] = RateBucket(key, budget)
+        return bucket
+
+
+def model_rate_bucket(model: Any) -> Optional[RateBucket]:
+    """The bucket of an Esperanto model's provider and API key."""
+    provider = getattr(model, "provider", None)
+    if not provider:
+        return None
+    return get_rate_bucket(str(provider), credential_fingerprint(model))
+
+
+def rate_limit_stats() -> List[Dict[str, Any]]:
+    with _buckets_lock:
+        buckets = list(_buckets.values())
+    return [bucket.stats() for bucket in buckets]
+
+
+class ModelRateLimiter(BaseRateLimiter, BaseCallbackHandler):
+    """
+    Makes a LangChain chat model take its budget before each call.
+
+    LangChain acquires from a rate limiter without saying what the call
+    sends, so the limiter is also one of the model's callbacks:
+    on_chat_model_start counts the prompt of the call about to be made and
+    acquire() charges it plus max_tokens. The count is passed in a
+    ContextVar, so concurrent calls of one model each pay for their prompt.
+    """
+
+    # Runs in the caller's context, where acquire() reads the prompt size
+    run_inline = True
+
+    def __init__(
+        self,
+        bucket: RateBucket,
+        priority: int,
+        count_tokens: Callable[[str], int],
+        max_tokens: int = 0,
+    ) -> None:
+        self.bucket = bucket
+        self.priority = priority
+        self.count_tokens = count_tokens
+        self.max_tokens = max_tokens
+
+    def on_chat_model_start(
+        self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], **kwargs
+    ) -> None:
+        _prompt_tokens.set(
+            sum(self.count_tokens(get_buffer_string(prompt)) for prompt in messages)
+        )
+
+    def _call_tokens(self) -> int:
+        tokens = _prompt_tokens.get() or 0
+        _prompt_tokens.set(None)
+        return tokens + self.max_tokens
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        return self.bucket.acquire(
+            self._call_tokens(), self.priority, blocking=blocking
+        )
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        return await self.bucket.aacquire(
+            self._call_tokens(), self.priority, blocking=blocking
+        )
+
+
+def priority_for(default_type: str) -> int:
+    """Chat and ask models answer users; others keep the caller's priority."""
+    if default_type in ("chat", "tools"):
+        return INTERACTIVE
+    return current_priority()
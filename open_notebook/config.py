@@ -1,5 +1,28 @@
 import os
 
+from loguru import logger
+
+
+def get_env_number(name: str, default: float, minimum: float) -> float:
+    """
+    Read a numeric setting from the environment.
+
+    Unset or invalid values fall back to `default`, and values below
+    `minimum` are raised to it, with a warning.
+    """
+    value_str = os.getenv(name)
+    if not value_str:
+        return default
+    try:
+        value = float(value_str)
+    except ValueError:
+        logger.warning(f"Invalid {name} value: '{value_str}'. Using default: {default}")
+        return default
+    if value < minimum:
+        logger.warning(f"{name} ({value}) is too small. Using minimum value of {minimum}.")
+        return minimum
+    return value
+
 # ROOT DATA FOLDER
 DATA_FOLDER = "./data"
 
@@ -0,0 +1,126 @@
+"""
+Request-scoped batching of record lookups (DataLoader pattern).
+
+Code that resolves many records concurrently, e.g.
+
+    sources = await asyncio.gather(*(Source.get(id) for id in source_ids))
+
+would normally issue one `SELECT * FROM $id` per record. Inside a
+`record_loader()` scope, `ObjectModel.get()` instead registers the id with the
+active loader; every id requested in the same event-loop tick is fetched with
+a single `SELECT * FROM $ids` query, and duplicate ids share one result.
+
+The API opens a scope per request (see `RecordLoaderMiddleware`), so batching
+is transparent to routers and services.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Optional
+
+from loguru import logger
+
+from .repository import ensure_record_id, repo_query
+
+# Upper bound on ids per query so huge batches do not build huge statements
+MAX_BATCH_SIZE = 500
+
+_current_loader: ContextVar[Optional["RecordLoader"]] = ContextVar(
+    "record_loader", default=None
+)
+
+
+class RecordLoader:
+    """Collects record lookups made in one tick and resolves them in one query."""
+
+    def __init__(self, max_batch_size: int = MAX_BATCH_SIZE) -> None:
+        self.max_batch_size = max_batch_size
+        self.loop = asyncio.get_running_loop()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._dispatch_scheduled = False
+        self._tasks: "set[asyncio.Task]" = set()
+        self.batches = 0
+        self.requested = 0
+
+    async def load(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """Return the row for `record_id`, or None if it does not exist."""
+        self.requested += 1
+        future = self._pending.get(record_id)
+        if future is None:
+            future = self._pending[record_id] = self.loop.create_future()
+            if not self._dispatch_scheduled:
+                self._dispatch_scheduled = True
+                # Run after every coroutine ready in this tick had its chance
+                # to register its id
+                self.loop.call_soon(self._start_dispatch)
+        return await asyncio.shield(future)
+
+    def _start_dispatch(self) -> None:
+        self._dispatch_scheduled = False
+        pending, self._pending = self._pending, {}
+        ids = list(pending)
+        for start in range(0, len(ids), self.max_batch_size):
+            chunk_ids = ids[start : start + self.max_batch_size]
+            chunk = {key: pending[key] for key in chunk_ids}
+            task = asyncio.ensure_future(self._dispatch(chunk))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: Dict[str, asyncio.Future]) -> None:
+        self.batches += 1
+        try:
+            rows = await repo_query(
+                "SELECT * FROM $ids",
+                {"ids": [ensure_record_id(record_id) for record_id in batch]},
+                idempotent=True,
+            )
+        except asyncio.CancelledError:
+            for future in batch.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            logger.debug(f"Batched record lookup failed: {e}")
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+                    # Callers may all have gone away; avoid "never retrieved" noise
+                    future.exception()
+            return
+
+        by_id = {str(row.get("id")): row for row in rows if isinstance(row, dict)}
+        for record_id, future in batch.items():
+            if future.done():
+                continue
+            row = by_id.get(record_id)
+            if row is None:
+                row = by_id.get(str(ensure_record_id(record_id)))
+            future.set_result(row)
+
+    def stats(self) -> Dict[str, int]:
+        return {"requested": self.requested, "batches": self.batches}
+
+
+def get_current_loader() -> Optional[RecordLoader]:
+    """The loader of the enclosing `record_loader()` scope, if any."""
+    loader = _current_loader.get()
+    # Context variables follow code into worker threads (asyncio.to_thread),
+    # where another event loop may be running; the loader is bound to its own
+    if loader is None or loader.loop is not asyncio.get_running_loop():
+        return None
+    return loader
+
+
+@asynccontextmanager
+async def record_loader() -> AsyncIterator[RecordLoader]:
+    """Batch `ObjectModel.get()` calls made within this block."""
+    existing = get_current_loader()
+    if existing is not None:
+        yield existing
+        return
+    loader = RecordLoader()
+    token = _current_loader.set(loader)
+    try:
+        yield loader
+    finally:
+        _current_loader.reset(token)
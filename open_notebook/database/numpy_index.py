@@ -0,0 +1,790 @@
+"""
+In-process NumPy vector index, an alternative search backend.
+
+With `VECTOR_SEARCH_BACKEND=numpy`, semantic search does not score embeddings
+in SurrealDB. All chunk, insight and note embeddings are kept in one
+contiguous float32 matrix that is memory-mapped from `DATA_FOLDER`, and top-k
+is answered with a single matrix-vector product and `argpartition`. Only the
+winning rows are then read from the database.
+
+Layout of `{DATA_FOLDER}/vector-index`:
+
+    manifest.json       generation, dimension and completeness of the files
+    vectors-<gen>.f32   L2-normalized float32 rows, append-only
+    codes-<gen>.<kind>  the same rows as compact codes (when quantized)
+    log-<gen>.jsonl     one line per added row ({"row", "id", "group"}),
+                        removed group ({"remove"}) or removed rows of a
+                        group ({"remove", "ids"})
+    .lock               serializes writers across processes
+
+A group is the unit of replacement: all chunks of a source, one insight or one
+note. Rows are never rewritten in place. Replacing a group appends new rows
+and tombstones the old ones, and once most rows are dead the live ones are
+compacted into a new generation. Readers (the API) apply new log lines before
+each search, so updates written by the worker are picked up without restarts.
+
+With `VECTOR_INDEX_QUANTIZATION`, each row is also stored as a compact code:
+int8 (one byte per dimension, scaled to the row's largest component) or binary
+(one sign bit per dimension). Searches then take two stages: an approximate
+pass over the codes picks `VECTOR_SEARCH_RESCORE` times more candidates than
+requested, and only those are rescored exactly from the float32 rows. The
+codes are 4x (int8) or 32x (binary) smaller, so the bytes scanned per search
+shrink accordingly and only the codes need to stay in the page cache.
+
+The database stays the source of truth: rows whose record no longer exists
+are dropped from results, and the API rebuilds the index on startup when its
+row count drifts from the database (see `sync_numpy_index()`).
+
+Environment Variables:
+    VECTOR_SEARCH_BACKEND: "surreal" (default) or "numpy"
+    VECTOR_INDEX_QUANTIZATION: "none" (default), "int8" or "binary"
+    VECTOR_SEARCH_RESCORE: Candidates rescored per requested result (default: 8)
+"""
+
+import asyncio
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from open_notebook.config import DATA_FOLDER, get_env_number
+
+from .repository import ensure_record_id, repo_batch, repo_query, repo_stream
+from .vector_index import (
+    VECTOR_INDEX_TABLES,
+    get_vector_search_backend,
+    infer_embedding_dimension,
+)
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows runs a single writer process
+    fcntl = None  # type: ignore[assignment]
+
+VECTOR_INDEX_FOLDER = os.path.join(DATA_FOLDER, "vector-index")
+
+# Compaction starts once dead rows outnumber live ones and reach this count
+COMPACT_MIN_DEAD_ROWS = 10000
+# Rows copied per step when compacting
+COMPACT_CHUNK_ROWS = 65536
+# Groups written per append while rebuilding from the database
+REBUILD_BATCH_GROUPS = 200
+# Rows decoded per step when scoring compact codes
+SCORE_CHUNK_ROWS = 16384
+
+QUANTIZATIONS = ("none", "int8", "binary")
+
+# (group, record ids, vectors)
+IndexGroup = Tuple[str, Sequence[str], Sequence[Sequence[float]]]
+
+_NO_TABLE = 255
+
+
+def _table_code(record_id: str) -> int:
+    table = record_id.split(":", 1)[0]
+    if table in VECTOR_INDEX_TABLES:
+        return VECTOR_INDEX_TABLES.index(table)
+    return _NO_TABLE
+
+
+def _normalize(vectors: Sequence[Sequence[float]]) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim != 2:
+        raise ValueError("Vectors must form a 2-dimensional matrix")
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
+
+
+def get_vector_index_quantization() -> str:
+    quantization = os.environ.get("VECTOR_INDEX_QUANTIZATION", "none").lower()
+    if quantization not in QUANTIZATIONS:
+        logger.warning(
+            f"Unknown VECTOR_INDEX_QUANTIZATION {quantization!r}, storing floats only"
+        )
+        return "none"
+    return quantization
+
+
+def get_vector_search_rescore() -> int:
+    return int(get_env_number("VECTOR_SEARCH_RESCORE", 8, 1))
+
+
+def _code_dtype(quantization: str) -> type:
+    return np.int8 if quantization == "int8" else np.uint8
+
+
+def _code_width(quantization: str, dimension: int) -> int:
+    return dimension if quantization == "int8" else (dimension + 7) // 8
+
+
+def quantize(matrix: np.ndarray, quantization: str) -> np.ndarray:
+    """
+    Compact codes of L2-normalized rows.
+
+    int8 scales each row so its largest component maps to 127; binary keeps
+    one sign bit per dimension, packed into bytes.
+    """
+    if quantization == "int8":
+        peaks = np.abs(matrix).max(axis=1, keepdims=True)
+        scaled = matrix * (127.0 / np.where(peaks > 0, peaks, 1.0))
+        return np.rint(scaled).astype(np.int8)
+    if quantization == "binary":
+        return np.packbits(matrix > 0, axis=1)
+    raise ValueError(f"Unknown quantization {quantization!r}")
+
+
+def _truncate_partial_line(path: str) -> None:
+    """Drop a trailing line left incomplete by a writer that crashed."""
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        start = max(0, size - 65536)
+        f.seek(start)
+        tail = f.read()
+        if tail.endswith(b"\n"):
+            return
+        f.truncate(start + tail.rfind(b"\n") + 1)
+
+
+def _approximate_scores(
+    codes: np.ndarray, code_norms: np.ndarray, query: np.ndarray, quantization: str
+) -> np.ndarray:
+    """Scores of every row from its code; only their order is meaningful."""
+    scores = np.empty(len(codes), dtype=np.float32)
+    if quantization == "binary":
+        # Sign agreements between the query and each row
+        packed_query = np.packbits(query > 0)
+        bits = len(packed_query) * 8
+    for start in range(0, len(codes), SCORE_CHUNK_ROWS):
+        chunk = codes[start : start + SCORE_CHUNK_ROWS]
+        if quantization == "binary":
+            differing = np.bitwise_count(chunk ^ packed_query).sum(axis=1)
+            scores[start : start + len(chunk)] = bits - differing
+        else:
+            scores[start : start + len(chunk)] = chunk.astype(np.float32) @ query
+    if quantization == "int8":
+        scores /= np.where(code_norms > 0, code_norms, 1.0)
+    return scores
+
+
+class NumpyVectorIndex:
+    """Memory-mapped embedding matrix shared by the API and worker processes."""
+
+    def __init__(
+        self, folder: str = VECTOR_INDEX_FOLDER, quantization: str = "none"
+    ) -> None:
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization {quantization!r}")
+        self.folder = folder
+        # Used for new generations; an existing one keeps its own
+        self.quantization = quantization
+        # Searches run on worker threads (asyncio.to_thread)
+        self._lock = threading.Lock()
+        self._reset(None, None)
+
+    def _reset(
+        self,
+        generation: Optional[int],
+        dimension: Optional[int],
+        quantization: str = "none",
+    ) -> None:
+        self.generation = generation
+        self.dimension = dimension
+        self.stored_quantization = quantization
+        self.complete = False
+        self._log_offset = 0
+        self._ids: List[str] = []
+        self._row_groups: List[str] = []
+        self._tables = bytearray()
+        self._alive = bytearray()
+        self._groups: Dict[str, List[int]] = {}
+        self._live = 0
+        self._arrays: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._codes: Optional[np.ndarray] = None
+        # Norms of the int8 codes, to turn dot products into cosines
+        self._code_norms = np.empty(0, dtype=np.float32)
+
+    # -- files ---------------------------------------------------------------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.folder, name)
+
+    def _vectors_path(self, generation: int) -> str:
+        return self._path(f"vectors-{generation}.f32")
+
+    def _log_path(self, generation: int) -> str:
+        return self._path(f"log-{generation}.jsonl")
+
+    def _codes_path(self, generation: int, quantization: str) -> str:
+        return self._path(f"codes-{generation}.{quantization}")
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path("manifest.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_manifest(
+        self, generation: int, dimension: int, complete: bool, quantization: str
+    ) -> None:
+        tmp_path = self._path("manifest.json.tmp")
+        with open(tmp_path, "w") as f:
+            manifest = {
+                "generation": generation,
+                "dimension": dimension,
+                "complete": complete,
+                "quantization": quantization,
+            }
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path("manifest.json"))
+
+    def _remove_generation_files(self, generation: int) -> None:
+        paths = [self._vectors_path(generation), self._log_path(generation)]
+        paths += [self._codes_path(generation, q) for q in QUANTIZATIONS[1:]]
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                # Still mapped by a reader on platforms that lock open files
+                pass
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        os.makedirs(self.folder, exist_ok=True)
+        with open(self._path(".lock"), "a") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    # -- reading -------------------------------------------------------------
+
+    def _refresh(self) -> None:
+        """Catch up with the files written by any process."""
+        manifest = self._read_manifest()
+        if manifest is None:
+            if self.generation is not None:
+                self._reset(None, None)
+            return
+        if manifest["generation"] != self.generation:
+            self._reset(
+                manifest["generation"],
+                manifest["dimension"],
+                manifest.get("quantization", "none"),
+            )
+        self.complete = bool(manifest.get("complete"))
+
+        try:
+            with open(self._log_path(self.generation), "rb") as f:
+                f.seek(self._log_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # Only complete lines; a writer may be appending right now
+        end = data.rfind(b"\n") + 1
+        if end:
+            for line in data[:end].splitlines():
+                if line:
+                    self._apply(json.loads(line))
+            self._log_offset += end
+
+        rows = len(self._ids)
+        if rows and (self._vectors is None or len(self._vectors) != rows):
+            self._vectors = np.memmap(
+                self._vectors_path(self.generation),
+                dtype=np.float32,
+                mode="r",
+                shape=(rows, self.dimension),
+            )
+            if self.stored_quantization != "none":
+                self._map_codes(rows)
+
+    def _map_codes(self, rows: int) -> None:
+        quantization = self.stored_quantization
+        self._codes = np.memmap(
+            self._codes_path(self.generation, quantization),
+            dtype=_code_dtype(quantization),
+            mode="r",
+            shape=(rows, _code_width(quantization, self.dimension)),
+        )
+        known = len(self._code_norms)
+        if quantization == "int8" and rows > known:
+            new_codes = self._codes[known:].astype(np.float32)
+            self._code_norms = np.concatenate(
+                [self._code_norms, np.linalg.norm(new_codes, axis=1)]
+            )
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        if "remove" in entry:
+            group = entry["remove"]
+            rows = self._groups.pop(group, [])
+            if "ids" in entry:
+                # Only some rows of the group
+                removed = set(entry["ids"])
+                kept = [row for row in rows if self._ids[row] not in removed]
+                if kept:
+                    self._groups[group] = kept
+                rows = [row for row in rows if self._ids[row] in removed]
+            for row in rows:
+                self._alive[row] = 0
+                self._live -= 1
+        else:
+            row = entry["row"]
+            # Rows written by a writer that crashed before logging them
+            while len(self._ids) < row:
+                self._ids.append("")
+                self._row_groups.append("")
+                self._tables.append(_NO_TABLE)
+                self._alive.append(0)
+            self._ids.append(entry["id"])
+            self._row_groups.append(entry["group"])
+            self._tables.append(_table_code(entry["id"]))
+            self._alive.append(1)
+            self._groups.setdefault(entry["group"], []).append(row)
+            self._live += 1
+        self._arrays = None
+
+    def _masks(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._arrays is None:
+            self._arrays = (
+                np.frombuffer(bytes(self._alive), dtype=np.bool_),
+                np.frombuffer(bytes(self._tables), dtype=np.uint8),
+            )
+        return self._arrays
+
+    def is_ready(self, dimension: int) -> bool:
+        """Whether a complete index of `dimension`-sized vectors exists."""
+        with self._lock:
+            self._refresh()
+            return self.complete and self.dimension == dimension
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            return {
+                "generation": self.generation,
+                "dimension": self.dimension,
+                "complete": self.complete,
+                "quantization": self.stored_quantization,
+                "rows": len(self._ids),
+                "live_rows": self._live,
+            }
+
+    def search(
+        self,
+        query: Sequence[float],
+        k: int,
+        tables: Sequence[str] = VECTOR_INDEX_TABLES,
+        minimum_score: float = -1.0,
+        rescore: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Top `k` rows of each table in `tables` by cosine similarity.
+
+        Returns (record id, similarity) pairs sorted by similarity, best first.
+        Quantized indexes rank candidates by their codes first, then rescore
+        `rescore` candidates per result exactly (default: VECTOR_SEARCH_RESCORE).
+        """
+        with self._lock:
+            self._refresh()
+            vectors, ids, dimension = self._vectors, self._ids, self.dimension
+            codes, code_norms = self._codes, self._code_norms
+            quantization = self.stored_quantization
+            if vectors is None or k < 1:
+                return []
+            alive, table_codes = self._masks()
+
+        q = np.asarray(query, dtype=np.float32)
+        if q.shape != (dimension,):
+            raise ValueError(f"Query has {q.size} dimensions, index has {dimension}")
+        norm = np.linalg.norm(q)
+        if norm == 0:
+            return []
+        q = q / norm
+        if codes is None:
+            scores = vectors @ q
+            candidates = k
+        else:
+            scores = _approximate_scores(codes, code_norms, q, quantization)
+            candidates = k * (rescore or get_vector_search_rescore())
+
+        hits: List[Tuple[str, float]] = []
+        for table in tables:
+            rows = np.flatnonzero(
+                alive & (table_codes == VECTOR_INDEX_TABLES.index(table))
+            )
+            if len(rows) > candidates:
+                top = np.argpartition(-scores[rows], candidates - 1)[:candidates]
+                rows = rows[top]
+            if codes is None:
+                row_scores = scores[rows]
+            else:
+                # Exact rescoring reads only the candidates' float rows
+                rows = np.sort(rows)
+                row_scores = vectors[rows] @ q
+                if len(rows) > k:
+                    top = np.argpartition(-row_scores, k - 1)[:k]
+                    rows, row_scores = rows[top], row_scores[top]
+            for row, score in zip(rows, row_scores):
+                if score >= minimum_score:
+                    hits.append((ids[row], float(score)))
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        return hits
+
+    # -- writing -------------------------------------------------------------
+
+    def _start_generation(self, dimension: int, complete: bool) -> None:
+        previous = self.generation
+        generation = (previous or 0) + 1
+        quantization = self.quantization
+        open(self._vectors_path(generation), "wb").close()
+        open(self._log_path(generation), "wb").close()
+        if quantization != "none":
+            open(self._codes_path(generation, quantization), "wb").close()
+        self._write_manifest(generation, dimension, complete, quantization)
+        if previous is not None:
+            self._remove_generation_files(previous)
+        self._reset(generation, dimension, quantization)
+        self.complete = complete
+
+    def _append_log(self, entries: List[Dict[str, Any]]) -> None:
+        path = self._log_path(self.generation)
+        _truncate_partial_line(path)
+        with open(path, "ab") as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in entries).encode())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _append(
+        self, groups: List[Tuple[str, Sequence[str], np.ndarray]], replace: bool = True
+    ) -> None:
+        path = self._vectors_path(self.generation)
+        row_bytes = self.dimension * 4
+        first_row = os.path.getsize(path) // row_bytes
+        # Drop a partial row left by a writer that crashed
+        os.truncate(path, first_row * row_bytes)
+
+        entries: List[Dict[str, Any]] = []
+        row = first_row
+        with open(path, "ab") as f:
+            for group, ids, matrix in groups:
+                f.write(matrix.tobytes())
+                if replace:
+                    entries.append({"remove": group})
+                else:
+                    # Appended rows replace the group's rows with the same ids
+                    entries.append({"remove": group, "ids": list(ids)})
+                for record_id in ids:
+                    entries.append({"row": row, "id": record_id, "group": group})
+                    row += 1
+            f.flush()
+            os.fsync(f.fileno())
+
+        quantization = self.stored_quantization
+        if quantization != "none":
+            codes_path = self._codes_path(self.generation, quantization)
+            width = _code_width(quantization, self.dimension)
+            os.truncate(codes_path, first_row * width)
+            with open(codes_path, "ab") as f:
+                for _, _, matrix in groups:
+                    f.write(quantize(matrix, quantization).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        # Vectors and codes are durable before the log references them
+        self._append_log(entries)
+
+    def _compact(self) -> None:
+        alive, _ = self._masks()
+        live_rows = np.flatnonzero(alive)
+        old_generation, vectors = self.generation, self._vectors
+        generation = old_generation + 1
+
+        entries = []
+        copies = [(self._vectors_path(generation), vectors)]
+        if self._codes is not None:
+            codes_path = self._codes_path(generation, self.stored_quantization)
+            copies.append((codes_path, self._codes))
+        for path, source in copies:
+            with open(path, "wb") as f:
+                for start in range(0, len(live_rows), COMPACT_CHUNK_ROWS):
+                    chunk = live_rows[start : start + COMPACT_CHUNK_ROWS]
+                    f.write(np.ascontiguousarray(source[chunk]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        for new_row, row in enumerate(live_rows):
+            entries.append(
+                {"row": new_row, "id": self._ids[row], "group": self._row_groups[row]}
+            )
+        with open(self._log_path(generation), "wb") as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in entries).encode())
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._write_manifest(
+            generation, self.dimension, self.complete, self.stored_quantization
+        )
+        self._remove_generation_files(old_generation)
+        logger.debug(
+            f"Compacted vector index to {len(live_rows)} rows "
+            f"(generation {generation})"
+        )
+        self._reset(None, None)
+        self._refresh()
+
+    def _maybe_compact(self) -> None:
+        dead = len(self._ids) - self._live
+        if dead >= COMPACT_MIN_DEAD_ROWS and dead > self._live:
+            self._compact()
+
+    def replace_groups(
+        self,
+        groups: Sequence[IndexGroup],
+        only_if_missing: bool = False,
+        append: bool = False,
+    ) -> None:
+        """
+        Replace the rows of each group with the given ids and vectors.
+
+        A dimension different from the index's starts a new, empty generation
+        (the embedding model changed). With `only_if_missing`, groups already
+        in the index are left alone; a rebuild uses this so that it never
+        overwrites a newer update made by the worker meanwhile. With `append`,
+        the rows are added to the group's existing rows (replacing those with
+        the same ids), so a large group can be written a window at a time.
+        """
+        prepared = [
+            (group, list(ids), _normalize(vectors))
+            for group, ids, vectors in groups
+            if len(ids)
+        ]
+        empty = [group for group, ids, _ in groups if not len(ids)]
+        for group, ids, matrix in prepared:
+            if len(ids) != len(matrix):
+                raise ValueError(
+                    f"Group {group} has {len(ids)} ids for {len(matrix)} vectors"
+                )
+
+        with self._lock, self._write_lock():
+            self._refresh()
+            if only_if_missing:
+                prepared = [p for p in prepared if p[0] not in self._groups]
+            if prepared:
+                dimension = prepared[0][2].shape[1]
+                if any(p[2].shape[1] != dimension for p in prepared):
+                    raise ValueError("Vectors of different dimensions in one update")
+                if self.generation is None or self.dimension != dimension:
+                    if self.generation is not None:
+                        logger.info(
+                            f"Embeddings now have {dimension} dimensions "
+                            f"(index had {self.dimension}); starting a new vector index"
+                        )
+                    self._start_generation(dimension, complete=False)
+                self._append(prepared, replace=not append)
+            if empty and not append and self.generation is not None:
+                self._append_log([{"remove": group} for group in empty])
+            self._refresh()
+            self._maybe_compact()
+
+    def replace_group(
+        self,
+        group: str,
+        ids: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        append: bool = False,
+    ) -> None:
+        self.replace_groups([(group, ids, vectors)], append=append)
+
+    def remove_groups(self, groups: Sequence[str]) -> None:
+        with self._lock, self._write_lock():
+            self._refresh()
+            if self.generation is None:
+                return
+            self._append_log([{"remove": group} for group in groups])
+            self._refresh()
+            self._maybe_compact()
+
+    def remove_rows(self, group: str, ids: Sequence[str]) -> None:
+        """Remove the rows with the given ids from a group, keeping the others."""
+        with self._lock, self._write_lock():
+            self._refresh()
+            if self.generation is None:
+                return
+            self._append_log([{"remove": group, "ids": list(ids)}])
+            self._refresh()
+            self._maybe_compact()
+
+    def start_rebuild(self, dimension: int) -> None:
+        """Start an empty generation; searches ignore it until marked complete."""
+        with self._lock, self._write_lock():
+            self._refresh()
+            self._start_generation(dimension, complete=False)
+
+    def mark_complete(self) -> None:
+        with self._lock, self._write_lock():
+            self._refresh()
+            if self.generation is not None:
+                self._write_manifest(
+                    self.generation, self.dimension, True, self.stored_quantization
+                )
+                self.complete = True
+
+
+_numpy_index: Optional[NumpyVectorIndex] = None
+
+
+def get_numpy_index() -> NumpyVectorIndex:
+    """Get the process-wide NumPy vector index."""
+    global _numpy_index
+    if _numpy_index is None:
+        _numpy_index = NumpyVectorIndex(quantization=get_vector_index_quantization())
+    return _numpy_index
+
+
+async def update_numpy_index(
+    group: str,
+    ids: Sequence[str],
+    vectors: Sequence[Sequence[float]],
+    append: bool = False,
+) -> None:
+    """
+    Mirror newly stored embeddings into the NumPy index, when it is in use.
+
+    With `append`, the rows are added to the group instead of replacing it.
+    Failures only log: the database write already succeeded, and the API
+    rebuilds an index that drifted from the database on startup.
+    """
+    if get_vector_search_backend() != "numpy":
+        return
+    try:
+        await asyncio.to_thread(
+            get_numpy_index().replace_group, group, ids, vectors, append
+        )
+    except Exception as e:
+        logger.warning(f"Could not update NumPy vector index for {group}: {e}")
+
+
+async def remove_from_numpy_index(groups: Sequence[str]) -> None:
+    if get_vector_search_backend() != "numpy":
+        return
+    try:
+        await asyncio.to_thread(get_numpy_index().remove_groups, groups)
+    except Exception as e:
+        logger.warning(f"Could not remove {groups} from NumPy vector index: {e}")
+
+
+async def remove_rows_from_numpy_index(group: str, ids: Sequence[str]) -> None:
+    if get_vector_search_backend() != "numpy" or not ids:
+        return
+    try:
+        await asyncio.to_thread(get_numpy_index().remove_rows, group, ids)
+    except Exception as e:
+        logger.warning(f"Could not remove rows of {group} from NumPy vector index: {e}")
+
+
+async def count_stored_embeddings(dimension: int) -> int:
+    """Embeddings a rebuild would index (orphaned source chunks excluded)."""
+    where = "embedding != NONE AND array::len(embedding) = $dimension"
+    results = await repo_batch(
+        [
+            (
+                f"SELECT count() FROM source_embedding "
+                f"WHERE {where} AND source.id != NONE GROUP ALL",
+                {"dimension": dimension},
+            ),
+            (
+                f"SELECT count() FROM source_insight WHERE {where} GROUP ALL",
+                {"dimension": dimension},
+            ),
+            (
+                f"SELECT count() FROM note WHERE {where} GROUP ALL",
+                {"dimension": dimension},
+            ),
+        ]
+    )
+    return sum(result[0]["count"] for result in results if result)
+
+
+async def rebuild_numpy_index(dimension: int) -> int:
+    """Load every stored embedding of `dimension` into a fresh index generation."""
+    index = get_numpy_index()
+    await asyncio.to_thread(index.start_rebuild, dimension)
+    pending: List[IndexGroup] = []
+    rows = 0
+
+    async def flush() -> None:
+        if pending:
+            await asyncio.to_thread(index.replace_groups, pending, True)
+            pending.clear()
+
+    async for source in repo_stream("source", fields="id"):
+        chunks = await repo_query(
+            "SELECT id, embedding, order FROM source_embedding "
+            "WHERE source = $source AND embedding != NONE ORDER BY order",
+            {"source": ensure_record_id(source["id"])},
+        )
+        chunks = [c for c in chunks if len(c["embedding"]) == dimension]
+        if chunks:
+            pending.append(
+                (
+                    str(source["id"]),
+                    [str(c["id"]) for c in chunks],
+                    [c["embedding"] for c in chunks],
+                )
+            )
+            rows += len(chunks)
+        if len(pending) >= REBUILD_BATCH_GROUPS:
+            await flush()
+
+    for table in ("source_insight", "note"):
+        async for row in repo_stream(
+            table,
+            where="embedding != NONE AND array::len(embedding) = $dimension",
+            vars={"dimension": dimension},
+            fields="id, embedding",
+        ):
+            record_id = str(row["id"])
+            pending.append((record_id, [record_id], [row["embedding"]]))
+            rows += 1
+            if len(pending) >= REBUILD_BATCH_GROUPS:
+                await flush()
+
+    await flush()
+    await asyncio.to_thread(index.mark_complete)
+    return rows
+
+
+async def sync_numpy_index() -> Optional[int]:
+    """
+    Rebuild the NumPy index if it is missing or out of step with the database.
+
+    Returns the number of indexed rows, or None when nothing is stored yet.
+    """
+    dimension = await infer_embedding_dimension()
+    if dimension is None:
+        return None
+    stats = await asyncio.to_thread(get_numpy_index().stats)
+    stored = await count_stored_embeddings(dimension)
+    if (
+        stats["complete"]
+        and stats["dimension"] == dimension
+        and stats["quantization"] == get_numpy_index().quantization
+        and stats["live_rows"] == stored
+    ):
+        return stored
+    logger.info(
+        f"Rebuilding NumPy vector index ({stored} stored embeddings, "
+        f"{stats['live_rows']} indexed)"
+    )
+    return await rebuild_numpy_index(dimension)
@@ -0,0 +1,211 @@
+"""
+Async connection pool for SurrealDB.
+
+Keeps a bounded set of authenticated connections open so that repository
+helpers do not pay for a WebSocket handshake, signin and `use` on every query.
+
+Features:
+- Configurable maximum size (backpressure: callers wait when all are busy)
+- Health check for connections that have been idle for a while, and
+  connections whose socket is known to have closed are never handed out
+- Broken connections are discarded and transparently replaced; after one
+  breaks, the idle ones are dropped too, since they usually broke together
+  (e.g. on a database restart)
+
+Environment Variables:
+    SURREAL_POOL_SIZE: Maximum number of open connections (default: 10)
+    SURREAL_POOL_TIMEOUT: Seconds to wait for a free connection (default: 30)
+    SURREAL_POOL_HEALTH_CHECK_INTERVAL: Idle seconds after which a connection
+        is pinged before reuse (default: 30)
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+
+from loguru import logger
+from surrealdb.errors import ConnectionUnavailableError  # type: ignore
+from websockets.exceptions import ConnectionClosed
+
+from open_notebook.config import get_env_number
+
+ConnectionFactory = Callable[[], Awaitable[Any]]
+
+# Errors that mean the connection itself is unusable (as opposed to a query
+# error reported by the server over a healthy connection)
+CONNECTION_ERRORS: Tuple[type, ...] = (
+    ConnectionError,
+    OSError,
+    ConnectionClosed,
+    ConnectionUnavailableError,
+    asyncio.TimeoutError,
+    asyncio.CancelledError,
+)
+
+# Connection errors after which a statement may be retried on a fresh
+# connection (see repository._execute). Timeouts are not among them.
+RECONNECT_ERRORS: Tuple[type, ...] = (
+    ConnectionError,
+    ConnectionClosed,
+    ConnectionUnavailableError,
+)
+
+
+def _is_closed(connection: Any) -> bool:
+    """True if the connection's socket is already known to have closed."""
+    # The WebSocket client's receive loop ends when its socket closes
+    recv_task = getattr(connection, "recv_task", None)
+    return recv_task is not None and recv_task.done()
+
+
+def get_pool_size() -> int:
+    return int(get_env_number("SURREAL_POOL_SIZE", 10, 1))
+
+
+def get_pool_timeout() -> float:
+    return get_env_number("SURREAL_POOL_TIMEOUT", 30.0, 0.1)
+
+
+def get_pool_health_check_interval() -> float:
+    return get_env_number("SURREAL_POOL_HEALTH_CHECK_INTERVAL", 30.0, 0.0)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of SurrealDB connections.
+
+    Connections are created lazily by `factory` (which must return a connection
+    that is already signed in and bound to a namespace/database) and reused in
+    LIFO order so that the hottest connections stay warm.
+    """
+
+    def __init__(
+        self,
+        factory: ConnectionFactory,
+        max_size: int = 10,
+        acquire_timeout: float = 30.0,
+        health_check_interval: float = 30.0,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("Pool max_size must be at least 1")
+        self._factory = factory
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self._semaphore = asyncio.Semaphore(max_size)
+        self._idle: List[Tuple[Any, float]] = []
+        self._in_use = 0
+        self._waiting = 0
+        self._created = 0
+        self._discarded = 0
+        self._closed = False
+
+    async def acquire(self) -> Any:
+        """Check out a connection, waiting up to `acquire_timeout` seconds."""
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(
+                self._semaphore.acquire(), timeout=self.acquire_timeout
+            )
+        except asyncio.TimeoutError:
+            raise RuntimeError(
+                f"Timed out after {self.acquire_timeout}s waiting for a database "
+                f"connection (pool size: {self.max_size})"
+            )
+        finally:
+            self._waiting -= 1
+
+        try:
+            connection = await self._checkout()
+        except BaseException:
+            self._semaphore.release()
+            raise
+        self._in_use += 1
+        return connection
+
+    async def release(self, connection: Any, discard: bool = False) -> None:
+        """Return a connection to the pool, or close it if `discard` is set."""
+        self._in_use -= 1
+        try:
+            if discard or self._closed:
+                self._discarded += 1
+                await self._close_quietly(connection)
+            else:
+                self._idle.append((connection, time.monotonic()))
+        finally:
+            self._semaphore.release()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[Any]:
+        """Context manager that checks out a connection and always returns it."""
+        connection = await self.acquire()
+        discard = False
+        try:
+            yield connection
+        except BaseException as e:
+            discard = isinstance(e, CONNECTION_ERRORS)
+            if discard:
+                logger.debug(f"Discarding database connection after error: {e!r}")
+            if isinstance(e, RECONNECT_ERRORS):
+                await self._discard_idle()
+            raise
+        finally:
+            await self.release(connection, discard=discard)
+
+    async def close(self) -> None:
+        """Close all idle connections; checked-out ones are closed on release."""
+        self._closed = True
+        await self._discard_idle()
+
+    async def _discard_idle(self) -> None:
+        idle, self._idle = self._idle, []
+        self._discarded += len(idle)
+        for connection, _ in idle:
+            await self._close_quietly(connection)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_size": self.max_size,
+            "in_use": self._in_use,
+            "idle": len(self._idle),
+            "waiting": self._waiting,
+            "created": self._created,
+            "discarded": self._discarded,
+        }
+
+    async def _checkout(self) -> Any:
+        while self._idle:
+            connection, last_used = self._idle.pop()
+            if _is_closed(connection):
+                self._discarded += 1
+                await self._close_quietly(connection)
+                continue
+            if time.monotonic() - last_used < self.health_check_interval:
+                return connection
+            if await self._is_healthy(connection):
+                return connection
+            self._discarded += 1
+            await self._close_quietly(connection)
+
+        connection = await self._factory()
+        self._created += 1
+        return connection
+
+    async def _is_healthy(self, connection: Any) -> bool:
+        try:
+            await asyncio.wait_for(connection.query("RETURN true"), timeout=5)
+            return True
+        except Exception as e:
+            logger.debug(f"Idle database connection failed health check: {e!r}")
+            return False
+
+    @staticmethod
+    async def _close_quietly(connection: Any) -> None:
+        try:
+            await connection.close()
+        except Exception as e:
+            logger.debug(f"Error closing database connection: {e!r}")
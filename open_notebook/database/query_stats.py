@@ -0,0 +1,286 @@
+"""
+Query latency instrumentation for the repository layer.
+
+Every `repo_*` helper reports its round trips here. Statements are grouped by
+a normalized template (literals, record ids and whitespace collapsed), so
+`SELECT * FROM source:abc` and `SELECT * FROM source:xyz` share one entry and
+variables never split the statistics. For each template we keep:
+
+- Call and error counts
+- A latency histogram (fixed millisecond buckets) with min/max/mean
+- Returned row counts and an estimate of the result payload size
+
+Round trips slower than the configured threshold are logged as warnings.
+
+Environment Variables:
+    SURREAL_QUERY_STATS: Set to "false" to disable collection (default: true)
+    SURREAL_SLOW_QUERY_MS: Slow-query log threshold in milliseconds;
+        0 disables the log (default: 500)
+"""
+
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from open_notebook.config import get_env_number
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (
+    1,
+    2.5,
+    5,
+    10,
+    25,
+    50,
+    100,
+    250,
+    500,
+    1000,
+    2500,
+    5000,
+    10000,
+)
+
+# Dynamic SQL must not grow the table without bound; extra templates share one entry
+MAX_TEMPLATES = 500
+OVERFLOW_TEMPLATE = "<other>"
+
+_STRING_PATTERN = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_RECORD_ID_PATTERN = re.compile(
+    r"(?<![\w:$])([A-Za-z_]\w*):(?!:)(?:⟨[^⟩]*⟩|`[^`]*`|\w+)"
+)
+_NUMBER_PATTERN = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b")
+_LIST_PATTERN = re.compile(r"\[\s*\?(?:\s*,\s*\?)*\s*\]")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Reduce a SurrealQL statement to its template."""
+    template = _STRING_PATTERN.sub("?", query)
+    template = _RECORD_ID_PATTERN.sub(r"\1:?", template)
+    template = _NUMBER_PATTERN.sub("?", template)
+    template = _LIST_PATTERN.sub("[?]", template)
+    return _WHITESPACE_PATTERN.sub(" ", template).strip().rstrip(";")
+
+
+def estimate_payload_size(obj: Any) -> int:
+    """
+    Cheaply estimate the serialized size of a query result in bytes.
+
+    Numeric arrays (embeddings) are sized from their length instead of being
+    walked, which keeps the estimate cheap on vector-heavy results.
+    """
+    if obj is None:
+        return 4
+    if isinstance(obj, str):
+        return len(obj) + 2
+    if isinstance(obj, (bool, int, float)):
+        return 8
+    if isinstance(obj, dict):
+        return 2 + sum(
+            len(str(key)) + 3 + estimate_payload_size(value)
+            for key, value in obj.items()
+        )
+    if isinstance(obj, (list, tuple)):
+        if obj and isinstance(obj[0], (float, int)):
+            return 2 + len(obj) * 9
+        return 2 + sum(estimate_payload_size(item) + 1 for item in obj)
+    return len(str(obj))
+
+
+def count_rows(result: Any) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    return 1
+
+
+class TemplateStats:
+    """Aggregated statistics for one query template."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.min_ms = float("inf")
+        self.max_ms = 0.0
+        self.rows = 0
+        self.payload_bytes = 0
+        self.buckets: List[int] = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, duration_ms: float, rows: int, payload_bytes: int, error: bool) -> None:
+        self.calls += 1
+        self.errors += int(error)
+        self.total_ms += duration_ms
+        self.min_ms = min(self.min_ms, duration_ms)
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.rows += rows
+        self.payload_bytes += payload_bytes
+        for idx, bound in enumerate(LATENCY_BUCKETS_MS):
+            if duration_ms <= bound:
+                self.buckets[idx] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Estimate a latency percentile from the histogram (bucket upper bound)."""
+        if not self.calls:
+            return 0.0
+        threshold = fraction * self.calls
+        seen = 0
+        for idx, count in enumerate(self.buckets):
+            seen += count
+            if seen >= threshold:
+                if idx < len(LATENCY_BUCKETS_MS):
+                    return min(float(LATENCY_BUCKETS_MS[idx]), self.max_ms)
+                break
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        histogram = {
+            f"le_{bound:g}ms": count
+            for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets)
+        }
+        histogram["inf"] = self.buckets[-1]
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "min_ms": round(self.min_ms, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": round(self.percentile(0.50), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "p99_ms": round(self.percentile(0.99), 3),
+            "rows": self.rows,
+            "payload_bytes": self.payload_bytes,
+            "histogram": histogram,
+        }
+
+
+class _QueryTimer:
+    """Handle used inside `QueryStats.track` to report the result."""
+
+    def __init__(self) -> None:
+        self.result: Any = None
+
+    def set_result(self, result: Any) -> None:
+        self.result = result
+
+
+class QueryStats:
+    """Process-wide registry of per-template query statistics."""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        slow_query_ms: float = 500.0,
+        max_templates: int = MAX_TEMPLATES,
+    ) -> None:
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self.max_templates = max_templates
+        self._templates: Dict[str, TemplateStats] = {}
+        # Graph nodes run queries on their own threads/event loops
+        self._lock = threading.Lock()
+        self._started_at = time.time()
+
+    def record(
+        self,
+        query: str,
+        duration_ms: float,
+        result: Any = None,
+        error: bool = False,
+    ) -> None:
+        template = normalize_query(query)
+        rows = count_rows(result)
+        payload_bytes = estimate_payload_size(result) if result is not None else 0
+        with self._lock:
+            entry = self._templates.get(template)
+            if entry is None:
+                if len(self._templates) >= self.max_templates:
+                    template = OVERFLOW_TEMPLATE
+                    entry = self._templates.get(template)
+                if entry is None:
+                    entry = self._templates[template] = TemplateStats()
+            entry.add(duration_ms, rows, payload_bytes, error)
+
+        if self.slow_query_ms > 0 and duration_ms >= self.slow_query_ms:
+            logger.warning(
+                f"Slow query ({duration_ms:.0f}ms, {rows} rows, "
+                f"~{payload_bytes} bytes{', failed' if error else ''}): {template}"
+            )
+
+    @contextmanager
+    def track(self, query: str) -> Iterator[_QueryTimer]:
+        """Time the enclosed round trip and record it under `query`'s template."""
+        timer = _QueryTimer()
+        if not self.enabled:
+            yield timer
+            return
+        started = time.perf_counter()
+        error = False
+        try:
+            yield timer
+        except BaseException:
+            error = True
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            try:
+                self.record(query, duration_ms, timer.result, error)
+            except Exception as e:
+                # Instrumentation must never break a query
+                logger.debug(f"Failed to record query stats: {e}")
+
+    def snapshot(
+        self, sort_by: str = "total_ms", limit: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Return the aggregates, hottest templates first."""
+        with self._lock:
+            entries = [
+                {"template": template, **stats.to_dict()}
+                for template, stats in self._templates.items()
+            ]
+        entries.sort(key=lambda entry: entry.get(sort_by, 0), reverse=True)
+        if limit is not None:
+            entries = entries[:limit]
+        return {
+            "enabled": self.enabled,
+            "slow_query_ms": self.slow_query_ms,
+            "since": self._started_at,
+            "templates": entries,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._templates.clear()
+            self._started_at = time.time()
+
+
+def get_slow_query_ms() -> float:
+    return get_env_number("SURREAL_SLOW_QUERY_MS", 500.0, 0.0)
+
+
+def get_query_stats_enabled() -> bool:
+    return os.getenv("SURREAL_QUERY_STATS", "true").lower() not in ("false", "0", "no")
+
+
+_query_stats: Optional[QueryStats] = None
+
+
+def get_query_stats() -> QueryStats:
+    """Get the process-wide query statistics registry."""
+    global _query_stats
+    if _query_stats is None:
+        _query_stats = QueryStats(
+            enabled=get_query_stats_enabled(),
+            slow_query_ms=get_slow_query_ms(),
+        )
+    return _query_stats
@@ -0,0 +1,213 @@
+"""
+In-process read-through cache for single records.
+
+`ObjectModel.get()` consults this cache for models that opt in with a
+`cache_ttl`, so repeated lookups of the same source, notebook or note within
+(and across) requests skip the database round trip.
+
+Memory stays bounded on two axes:
+- At most `max_entries` rows are kept, evicted in LRU order
+- String fields larger than `large_field_bytes` (e.g. `full_text`) are stored
+  separately in a byte-budgeted LRU; a row whose large field was evicted is
+  treated as a miss and re-read from the database
+
+Writes through the repository layer (`repo_update`, `repo_upsert`,
+`repo_delete`) and `ObjectModel.save()`/`delete()` invalidate the record.
+Writes made by other processes are only picked up once the TTL expires,
+which is why TTLs are per model and short. Models, credentials and
+transformations are not cached: the worker must see a rotated key or an
+edited prompt as soon as the API saves it.
+
+Environment Variables:
+    SURREAL_RECORD_CACHE_SIZE: Maximum cached rows; 0 disables (default: 1000)
+    SURREAL_RECORD_CACHE_LARGE_FIELD_BYTES: Strings above this size are stored
+        separately (default: 16384)
+    SURREAL_RECORD_CACHE_LARGE_MAX_BYTES: Budget for separately stored
+        fields (default: 33554432)
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from open_notebook.config import get_env_number
+
+
+class _Entry:
+    __slots__ = ("row", "large_fields", "expires_at")
+
+    def __init__(
+        self, row: Dict[str, Any], large_fields: Tuple[str, ...], expires_at: float
+    ) -> None:
+        self.row = row
+        self.large_fields = large_fields
+        self.expires_at = expires_at
+
+
+class RecordCache:
+    """Thread-safe LRU cache of record rows keyed by record id."""
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        large_field_bytes: int = 16 * 1024,
+        large_max_bytes: int = 32 * 1024 * 1024,
+    ) -> None:
+        self.max_entries = max_entries
+        self.large_field_bytes = large_field_bytes
+        self.large_max_bytes = large_max_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # (record id, field) -> (value, size in bytes)
+        self._large: "OrderedDict[Tuple[str, str], Tuple[str, int]]" = OrderedDict()
+        self._large_bytes = 0
+        # Bumped on invalidation so that reads racing a write do not
+        # repopulate the cache with the old row
+        self._versions: Dict[str, int] = {}
+        self._epoch = 0
+        # Graph nodes run on their own threads/event loops
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def version(self, key: str) -> Tuple[int, int]:
+        """Current version of `key`; pass it back to put()."""
+        with self._lock:
+            return self._epoch, self._versions.get(key, 0)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached row, or None on a miss."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                self._drop(key)
+                self.misses += 1
+                return None
+            row = copy.deepcopy(entry.row)
+            for field in entry.large_fields:
+                large = self._large.get((key, field))
+                if large is None:
+                    # Large value was evicted: the row is incomplete
+                    self._drop(key)
+                    self.misses += 1
+                    return None
+                self._large.move_to_end((key, field))
+                row[field] = large[0]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return row
+
+    def put(
+        self,
+        key: str,
+        row: Dict[str, Any],
+        ttl: float,
+        version: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        """Cache `row` for `ttl` seconds unless `key` changed since `version`."""
+        if not self.enabled or ttl <= 0:
+            return
+        with self._lock:
+            current = (self._epoch, self._versions.get(key, 0))
+            if version is not None and version != current:
+                return
+            self._drop(key)
+            large: Dict[str, Tuple[str, int]] = {}
+            for field, value in row.items():
+                if isinstance(value, str) and len(value) * 4 > self.large_field_bytes:
+                    size = len(value.encode("utf-8"))
+                    if size > self.large_field_bytes:
+                        large[field] = (value, size)
+            if sum(size for _, size in large.values()) > self.large_max_bytes:
+                # Would evict everything else; do not cache this row
+                return
+            stored = {
+                field: copy.deepcopy(value)
+                for field, value in row.items()
+                if field not in large
+            }
+            for field, (value, size) in large.items():
+                self._large[(key, field)] = (value, size)
+                self._large_bytes += size
+            self._entries[key] = _Entry(stored, tuple(large), time.monotonic() + ttl)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+            while self._large_bytes > self.large_max_bytes:
+                _, (_, size) = self._large.popitem(last=False)
+                self._large_bytes -= size
+
+    def invalidate(self, key: str) -> None:
+        """Forget `key` and reject in-flight reads that started before now."""
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._drop(key)
+            if len(self._versions) > 4 * max(self.max_entries, 1):
+                # Start a new epoch instead of growing forever; reads that
+                # started in the old epoch will not be cached
+                self._versions.clear()
+                self._epoch += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._large.clear()
+            self._large_bytes = 0
+            self._versions.clear()
+            self._epoch += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_entries": self.max_entries,
+                "entries": len(self._entries),
+                "large_fields": len(self._large),
+                "large_bytes": self._large_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for field in entry.large_fields:
+            large = self._large.pop((key, field), None)
+            if large is not None:
+                self._large_bytes -= large[1]
+
+
+def get_record_cache_size() -> int:
+    return int(get_env_number("SURREAL_RECORD_CACHE_SIZE", 1000, 0))
+
+
+def get_record_cache_large_field_bytes() -> int:
+    return int(get_env_number("SURREAL_RECORD_CACHE_LARGE_FIELD_BYTES", 16384, 0))
+
+
+def get_record_cache_large_max_bytes() -> int:
+    return int(
+        get_env_number("SURREAL_RECORD_CACHE_LARGE_MAX_BYTES", 32 * 1024 * 1024, 0)
+    )
+
+
+_record_cache: Optional[RecordCache] = None
+
+
+def get_record_cache() -> RecordCache:
+    """Get the process-wide record cache."""
+    global _record_cache
+    if _record_cache is None:
+        _record_cache = RecordCache(
+            max_entries=get_record_cache_size(),
+            large_field_bytes=get_record_cache_large_field_bytes(),
+            large_max_bytes=get_record_cache_large_max_bytes(),
+        )
+    return _record_cache
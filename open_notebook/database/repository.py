@@ -1,12 +1,45 @@
+import asyncio
 import os
+import re
+import weakref
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, TypeVar, Union
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 from loguru import logger
 from surrealdb import AsyncSurreal, RecordID  # type: ignore
 
+from .pool import (
+    RECONNECT_ERRORS,
+    ConnectionPool,
+    get_pool_health_check_interval,
+    get_pool_size,
+    get_pool_timeout,
+)
+from .query_stats import get_query_stats
+from .record_cache import get_record_cache
+from .write_coordinator import get_write_coordinator
+
 T = TypeVar("T", Dict[str, Any], List[Dict[str, Any]])
+R = TypeVar("R")
+
+# A single statement for repo_batch: (query, vars)
+BatchStatement = Tuple[str, Optional[Dict[str, Any]]]
+
+_QUERY_VAR_PATTERN = re.compile(r"\$([A-Za-z_][A-Za-z0-9_]*)")
 
 
 def get_database_url():
@@ -26,14 +59,48 @@ def get_database_password():
     return os.getenv("SURREAL_PASSWORD") or os.getenv("SURREAL_PASS")
 
 
-def parse_record_ids(obj: Any) -> Any:
-    """Recursively parse and convert RecordIDs into strings."""
-    if isinstance(obj, dict):
-        return {k: parse_record_ids(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [parse_record_ids(item) for item in obj]
-    elif isinstance(obj, RecordID):
+def _decode_record_ids(obj: Any) -> Any:
+    """Convert RecordIDs to strings, mutating freshly decoded containers in place."""
+    if isinstance(obj, RecordID):
         return str(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if isinstance(value, RecordID):
+                obj[key] = str(value)
+            elif isinstance(value, (dict, list)):
+                obj[key] = _decode_record_ids(value)
+        return obj
+    if isinstance(obj, list):
+        # Numeric arrays (embeddings) cannot hold RecordIDs - skip them untouched
+        if not obj or isinstance(obj[0], (float, int)):
+            return obj
+        for idx, item in enumerate(obj):
+            if isinstance(item, RecordID):
+                obj[idx] = str(item)
+            elif isinstance(item, (dict, list)):
+                obj[idx] = _decode_record_ids(item)
+        return obj
+    return obj
+
+
+def parse_record_ids(obj: Any, fields: Optional[Iterable[str]] = None) -> Any:
+    """
+    Convert RecordIDs into strings.
+
+    Containers are updated in place rather than rebuilt, and numeric arrays
+    (embeddings) are skipped without being walked. When `fields` is given,
+    only those top-level fields of each row are decoded; everything else
+    (e.g. large `full_text` or `content` payloads) is left untouched.
+    """
+    if fields is None:
+        return _decode_record_ids(obj)
+
+    field_names = frozenset(fields)
+    rows = obj if isinstance(obj, list) else [obj]
+    for row in rows:
+        if isinstance(row, dict):
+            for key in field_names.intersection(row):
+                row[key] = _decode_record_ids(row[key])
     return obj
 
 
@@ -44,43 +111,305 @@ def ensure_record_id(value: Union[str, RecordID]) -> RecordID:
     return RecordID.parse(value)
 
 
-@asynccontextmanager
-async def db_connection():
+async def _open_connection():
+    """Open a new authenticated connection bound to the configured namespace."""
     db = AsyncSurreal(get_database_url())
-    await db.signin(
-        {
-            "username": os.environ.get("SURREAL_USER"),
-            "password": get_database_password(),
-        }
-    )
-    await db.use(
-        os.environ.get("SURREAL_NAMESPACE"), os.environ.get("SURREAL_DATABASE")
-    )
     try:
-        yield db
-    finally:
+        await db.signin(
+            {
+                "username": os.environ.get("SURREAL_USER"),
+                "password": get_database_password(),
+            }
+        )
+        await db.use(
+            os.environ.get("SURREAL_NAMESPACE"), os.environ.get("SURREAL_DATABASE")
+        )
+    except BaseException:
         await db.close()
+        raise
+    return db
+
+
+# One pool per event loop: connections are bound to the loop that opened them,
+# and some code paths (e.g. graph model provisioning) run their own loops.
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ConnectionPool]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_connection_pool() -> ConnectionPool:
+    """Get the connection pool for the running event loop, creating it if needed."""
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = ConnectionPool(
+            _open_connection,
+            max_size=get_pool_size(),
+            acquire_timeout=get_pool_timeout(),
+            health_check_interval=get_pool_health_check_interval(),
+        )
+        _pools[loop] = pool
+    return pool
+
+
+async def close_connection_pool() -> None:
+    """Close the connection pool for the running event loop."""
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.close()
+
+
+async def run_and_close_pool(awaitable: Awaitable[R]) -> R:
+    """
+    Await `awaitable`, then close the running loop's pool.
+
+    For asyncio.run() calls from sync code: their loop ends with the call,
+    and its pooled connections would otherwise stay open until collected.
+    """
+    try:
+        return await awaitable
+    finally:
+        await close_connection_pool()
+
+
+@asynccontextmanager
+async def db_connection():
+    """Borrow a pooled database connection for the duration of the block."""
+    async with get_connection_pool().connection() as connection:
+        yield connection
+
+
+async def _execute(
+    label: str, call: Callable[[Any], Awaitable[Any]], idempotent: bool = False
+) -> Any:
+    """
+    Return `await call(connection)` on a pooled connection, timed as `label`.
+
+    A connection that could not be opened is retried once, since nothing was
+    sent. Once the statement is on its way, a broken connection cannot tell
+    whether it ran, so only `idempotent` statements (reads, UPSERT or MERGE
+    by id) are retried; a CREATE, INSERT or RELATE would run twice. The pool
+    replaces idle connections whose socket is known to have closed.
+    """
+    sent = False
+
+    async def attempt() -> Any:
+        nonlocal sent
+        async with db_connection() as connection:
+            with get_query_stats().track(label) as timer:
+                sent = True
+                raw = await call(connection)
+                timer.set_result(raw)
+            return raw
+
+    try:
+        return await attempt()
+    except RECONNECT_ERRORS as e:
+        if sent and not idempotent:
+            raise
+        logger.debug(f"Retrying on a fresh database connection after: {e!r}")
+    return await attempt()
 
 
 async def repo_query(
-    query_str: str, vars: Optional[Dict[str, Any]] = None
+    query_str: str,
+    vars: Optional[Dict[str, Any]] = None,
+    record_id_fields: Optional[Iterable[str]] = None,
+    idempotent: bool = False,
 ) -> List[Dict[str, Any]]:
-    """Execute a SurrealQL query and return the results"""
+    """
+    Execute a SurrealQL query and return the results.
+
+    Pass `record_id_fields` to decode RecordIDs only in those top-level fields
+    of each row, which avoids walking large payloads on hot read paths.
+    Pass `idempotent=True` for reads and UPSERT/MERGE by id, which are then
+    retried on a fresh connection if theirs breaks mid-statement.
+    """
 
-    async with db_connection() as connection:
+    try:
+        raw = await _execute(
+            query_str,
+            lambda connection: connection.query(query_str, vars),
+            idempotent=idempotent,
+        )
+        result = parse_record_ids(raw, record_id_fields)
+        if isinstance(result, str):
+            raise RuntimeError(result)
+        return result
+    except RuntimeError as e:
+        # RuntimeError is raised for retriable transaction conflicts - log at debug to avoid noise
+        logger.debug(str(e))
+        raise
+    except Exception as e:
+        logger.exception(e)
+        raise
+
+
+def _build_batch_query(
+    statements: Sequence[BatchStatement], transaction: bool
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Join statements into one query, prefixing each statement's vars so that
+    identical names in different statements cannot collide.
+    """
+    parts: List[str] = []
+    batch_vars: Dict[str, Any] = {}
+    for idx, (query_str, vars) in enumerate(statements):
+        vars = vars or {}
+        prefix = f"b{idx}_"
+
+        def rename(match: re.Match) -> str:
+            name = match.group(1)
+            return f"${prefix}{name}" if name in vars else match.group(0)
+
+        parts.append(_QUERY_VAR_PATTERN.sub(rename, query_str.strip().rstrip(";")))
+        batch_vars.update({f"{prefix}{key}": value for key, value in vars.items()})
+
+    body = ";\n".join(parts) + ";"
+    if transaction:
+        body = f"BEGIN TRANSACTION;\n{body}\nCOMMIT TRANSACTION;"
+    return body, batch_vars
+
+
+async def repo_batch(
+    statements: Sequence[BatchStatement], transaction: bool = False
+) -> List[Any]:
+    """
+    Execute several SurrealQL statements in a single round trip.
+
+    Args:
+        statements: List of (query, vars) pairs, one statement each
+        transaction: Wrap the batch in BEGIN/COMMIT TRANSACTION so that it
+            either applies fully or not at all
+
+    Returns:
+        One result per statement, in order
+
+    Raises:
+        RuntimeError: If any statement fails (transaction conflicts included)
+    """
+    if not statements:
+        return []
+
+    query_str, vars = _build_batch_query(statements, transaction)
+    try:
+        response = await _execute(
+            query_str, lambda connection: connection.query_raw(query_str, vars)
+        )
+        error = response.get("error")
+        if error:
+            message = error.get("message") if isinstance(error, dict) else None
+            raise RuntimeError(message or str(error))
+
+        results = response.get("result") or []
+        errors = [str(r.get("result")) for r in results if r.get("status") == "ERR"]
+        if errors:
+            # In a failed transaction every statement reports an error;
+            # surface the one that caused it
+            causes = [e for e in errors if "not executed" not in e] or errors
+            raise RuntimeError(causes[0])
+        if len(results) != len(statements):
+            raise RuntimeError(
+                f"Batch returned {len(results)} results for "
+                f"{len(statements)} statements"
+            )
+        return [parse_record_ids(r.get("result")) for r in results]
+    except RuntimeError as e:
+        # RuntimeError is raised for retriable transaction conflicts - log at debug to avoid noise
+        logger.debug(str(e))
+        raise
+    except Exception as e:
+        logger.exception(e)
+        raise
+
+
+async def repo_stream(
+    table: str,
+    where: Optional[str] = None,
+    vars: Optional[Dict[str, Any]] = None,
+    page_size: int = 500,
+    fields: str = "*",
+    order_by: str = "id",
+    after: Optional[Union[str, RecordID]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Iterate over the rows of a table page by page using keyset pagination.
+
+    Each page is fetched with `ORDER BY <order_by>, id LIMIT <page_size>` and
+    resumes strictly after the last row of the previous page, so memory stays
+    bounded by `page_size` and pages stay stable while rows are inserted.
+
+    Args:
+        table: Table to scan
+        where: Optional SurrealQL condition (without the WHERE keyword)
+        vars: Variables referenced by `where`
+        page_size: Rows fetched per round trip
+        fields: Projection; must include `id` and the `order_by` field
+        order_by: Scalar column to page on (ascending), `id` by default
+        after: Start strictly after this record (only when paging on `id`),
+            e.g. to resume an earlier scan
+
+    Yields:
+        Rows in ascending (order_by, id) order
+    """
+    if page_size < 1:
+        raise ValueError("page_size must be at least 1")
+    if after is not None and order_by != "id":
+        raise ValueError("repo_stream can only resume after an id when paging on id")
+
+    conditions = [f"({where})"] if where else []
+    order_clause = "id" if order_by == "id" else f"{order_by}, id"
+    page_vars: Dict[str, Any] = dict(vars or {})
+    page_vars["_page_size"] = page_size
+    keyset: List[str] = []
+    if after is not None:
+        page_vars["_cursor_id"] = ensure_record_id(after)
+        keyset = ["id > $_cursor_id"]
+
+    while True:
+        where_clause = " AND ".join(conditions + keyset)
+        query = (
+            f"SELECT {fields} FROM {table}"
+            + (f" WHERE {where_clause}" if where_clause else "")
+            + f" ORDER BY {order_clause} LIMIT $_page_size"
+        )
         try:
-            result = parse_record_ids(await connection.query(query_str, vars))
-            if isinstance(result, str):
-                raise RuntimeError(result)
-            return result
+            rows = await _execute(
+                query,
+                lambda connection: connection.query(query, page_vars),
+                idempotent=True,
+            )
+            if isinstance(rows, str):
+                raise RuntimeError(rows)
         except RuntimeError as e:
-            # RuntimeError is raised for retriable transaction conflicts - log at debug to avoid noise
             logger.debug(str(e))
             raise
         except Exception as e:
             logger.exception(e)
             raise
 
+        if rows:
+            last = rows[-1]
+            if "id" not in last:
+                raise ValueError("repo_stream projections must include the id field")
+            # Keep the raw RecordID: its string form loses the id's type
+            # (e.g. note:4 would compare as the string '4')
+            page_vars["_cursor_id"] = last["id"]
+            if order_by == "id":
+                keyset = ["id > $_cursor_id"]
+            else:
+                page_vars["_cursor_value"] = last.get(order_by)
+                keyset = [
+                    f"({order_by} > $_cursor_value OR "
+                    f"({order_by} = $_cursor_value AND id > $_cursor_id))"
+                ]
+
+        for row in parse_record_ids(rows):
+            yield row
+
+        if len(rows) < page_size:
+            return
+
 
 async def repo_create(table: str, data: Dict[str, Any]) -> Dict[str, Any]:
     """Create a new record in the specified table"""
@@ -89,12 +418,14 @@ async def repo_create(table: str, data: Dict[str, Any]) -> Dict[str, Any]:
     data["created"] = datetime.now(timezone.utc)
     data["updated"] = datetime.now(timezone.utc)
     try:
-        async with db_connection() as connection:
-            result = parse_record_ids(await connection.insert(table, data))
-            # SurrealDB may return a string error message instead of the expected record
-            if isinstance(result, str):
-                raise RuntimeError(result)
-            return result
+        raw = await _execute(
+            f"INSERT INTO {table}", lambda connection: connection.insert(table, data)
+        )
+        result = parse_record_ids(raw)
+        # SurrealDB may return a string error message instead of the expected record
+        if isinstance(result, str):
+            raise RuntimeError(result)
+        return result
     except RuntimeError as e:
         logger.error(str(e))
         raise
@@ -128,7 +459,16 @@ async def repo_upsert(
     if add_timestamp:
         data["updated"] = datetime.now(timezone.utc)
     query = f"UPSERT {id if id else table} MERGE $data;"
-    return await repo_query(query, {"data": data})
+    if not id:
+        return await repo_query(query, {"data": data})
+    try:
+        return await get_write_coordinator().merge(
+            str(id),
+            data,
+            lambda merged: repo_query(query, {"data": merged}, idempotent=True),
+        )
+    finally:
+        get_record_cache().invalidate(str(id))
 
 
 async def repo_update(
@@ -147,7 +487,15 @@ async def repo_update(
         data["updated"] = datetime.now(timezone.utc)
         query = f"UPDATE {record_id} MERGE $data;"
         # logger.debug(f"Update query: {query}")
-        result = await repo_query(query, {"data": data})
+        # Serialize per record and fold concurrent updates into one MERGE
+        try:
+            result = await get_write_coordinator().merge(
+                str(record_id),
+                data,
+                lambda merged: repo_query(query, {"data": merged}, idempotent=True),
+            )
+        finally:
+            get_record_cache().invalidate(str(record_id))
         # if isinstance(result, list):
         #     return [_return_data(item) for item in result]
         return parse_record_ids(result)
@@ -159,11 +507,15 @@ async def repo_delete(record_id: Union[str, RecordID]):
     """Delete a record by record id"""
 
     try:
-        async with db_connection() as connection:
-            return await connection.delete(ensure_record_id(record_id))
+        return await _execute(
+            f"DELETE {record_id}",
+            lambda connection: connection.delete(ensure_record_id(record_id)),
+        )
     except Exception as e:
         logger.exception(e)
         raise RuntimeError(f"Failed to delete record: {str(e)}")
+    finally:
+        get_record_cache().invalidate(str(record_id))
 
 
 async def repo_insert(
@@ -171,12 +523,15 @@ async def repo_insert(
 ) -> List[Dict[str, Any]]:
     """Create a new record in the specified table"""
     try:
-        async with db_connection() as connection:
-            result = parse_record_ids(await connection.insert(table, data))
-            # SurrealDB may return a string error message instead of the expected records
-            if isinstance(result, str):
-                raise RuntimeError(result)
-            return result
+        raw = await _execute(
+            f"INSERT INTO {table} [?]",
+            lambda connection: connection.insert(table, data),
+        )
+        result = parse_record_ids(raw)
+        # SurrealDB may return a string error message instead of the expected records
+        if isinstance(result, str):
+            raise RuntimeError(result)
+        return result
     except RuntimeError as e:
         if ignore_duplicates and "already contains" in str(e):
             return []
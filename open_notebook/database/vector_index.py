@@ -0,0 +1,256 @@
+"""
+HNSW vector indexes for embedding search.
+
+`fn::vector_search` scores every embedding in the database, so its latency grows
+linearly with the corpus. With HNSW indexes on the embedding fields, search
+uses the KNN operator (`embedding <|k,ef|> $query`) and only visits a small
+neighbourhood of the index graph.
+
+An HNSW index is bound to a vector dimension. That dimension depends on the
+configured embedding model, so the indexes cannot be defined by a static
+migration. Instead:
+
+- Embedding commands call `ensure_vector_indexes()` with the dimension of the
+  vectors they are about to write. A model with a different dimension drops
+  the indexes (an HNSW index rejects vectors of another size), and they are
+  rebuilt once all stored embeddings agree again.
+- On API startup, `sync_vector_indexes()` infers the dimension from stored
+  embeddings and defines any missing index.
+
+Indexes are defined with CONCURRENTLY: the statement returns at once and the
+database builds the graph in the background, so neither an embedding command
+nor startup waits for a build over the whole corpus. Until the indexes for the
+query's dimension have finished building, search falls back to the exact
+`fn::vector_search`.
+
+Environment Variables:
+    VECTOR_SEARCH_EXACT: Set to "true" to always use exact search (default: false)
+    VECTOR_SEARCH_EF: HNSW search breadth; higher is more accurate and slower
+        (default: 64)
+    VECTOR_SEARCH_BACKEND: "surreal" (default) searches in the database,
+        "numpy" uses the in-process index of numpy_index.py
+"""
+
+import asyncio
+import os
+import re
+import time
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+
+from open_notebook.config import get_env_number
+
+from .repository import repo_query
+
+VECTOR_INDEX_TABLES = ("source_embedding", "source_insight", "note")
+
+# Seconds the known index state is trusted before INFO FOR TABLE is re-read
+INDEX_STATE_TTL = 60.0
+# Seconds to wait before retrying a definition that failed (mixed dimensions)
+DEFINE_RETRY_INTERVAL = 300.0
+
+_DIMENSION_PATTERN = re.compile(r"\bHNSW\b.*?\bDIMENSION (\d+)")
+
+# Per table: (dimension, build status) of the HNSW index, (None, None) if missing
+_index_state: Dict[str, Tuple[Optional[int], Optional[str]]] = {}
+_checked_at = 0.0
+_failed_at: Dict[int, float] = {}
+
+
+def vector_index_name(table: str) -> str:
+    return f"idx_{table}_embedding_hnsw"
+
+
+def get_vector_search_exact() -> bool:
+    return os.getenv("VECTOR_SEARCH_EXACT", "false").lower() in ("true", "1", "yes")
+
+
+def get_vector_search_ef() -> int:
+    return int(get_env_number("VECTOR_SEARCH_EF", 64, 1))
+
+
+def get_vector_search_backend() -> str:
+    backend = os.getenv("VECTOR_SEARCH_BACKEND", "surreal").lower()
+    if backend not in ("surreal", "numpy"):
+        logger.warning(f"Unknown VECTOR_SEARCH_BACKEND '{backend}', using surreal")
+        return "surreal"
+    return backend
+
+
+async def _read_index_state() -> Dict[str, Tuple[Optional[int], Optional[str]]]:
+    state: Dict[str, Tuple[Optional[int], Optional[str]]] = {}
+    for table in VECTOR_INDEX_TABLES:
+        name = vector_index_name(table)
+        info = await repo_query(f"INFO FOR TABLE {table}")
+        indexes = info.get("indexes", {}) if isinstance(info, dict) else {}
+        definition = indexes.get(name)
+        match = _DIMENSION_PATTERN.search(definition) if definition else None
+        if not match:
+            state[table] = (None, None)
+            continue
+        index_info = await repo_query(f"INFO FOR INDEX {name} ON {table}")
+        building = (
+            index_info.get("building", {}) if isinstance(index_info, dict) else {}
+        )
+        state[table] = (int(match.group(1)), building.get("status", "ready"))
+    return state
+
+
+async def get_index_state(
+    refresh: bool = False,
+) -> Dict[str, Tuple[Optional[int], Optional[str]]]:
+    """Dimension and build status of the HNSW index on each embedding table."""
+    global _index_state, _checked_at
+    stale = time.monotonic() - _checked_at > INDEX_STATE_TTL
+    if refresh or stale or not _index_state:
+        _index_state = await _read_index_state()
+        _checked_at = time.monotonic()
+    return _index_state
+
+
+async def get_index_dimensions(refresh: bool = False) -> Dict[str, Optional[int]]:
+    """Dimension of the built HNSW index on each table (None if missing or building)."""
+    state = await get_index_state(refresh)
+    return {
+        table: dim if status == "ready" else None
+        for table, (dim, status) in state.items()
+    }
+
+
+async def get_vector_index_dimension() -> Optional[int]:
+    """The dimension served by the indexes, if every table has one and they agree."""
+    state = await get_index_state()
+    if any(status == "building" for _, status in state.values()):
+        # Re-check builds in progress instead of trusting the state for a TTL
+        state = await get_index_state(refresh=True)
+    dimensions = {
+        dim if status == "ready" else None for dim, status in state.values()
+    }
+    if len(dimensions) == 1:
+        return dimensions.pop()
+    return None
+
+
+def _forget_index_state() -> None:
+    global _index_state
+    _index_state = {}
+
+
+async def drop_vector_indexes() -> None:
+    for table in VECTOR_INDEX_TABLES:
+        await repo_query(
+            f"REMOVE INDEX IF EXISTS {vector_index_name(table)} ON {table}"
+        )
+    _forget_index_state()
+
+
+def _all_ready(
+    state: Dict[str, Tuple[Optional[int], Optional[str]]], dimension: int
+) -> bool:
+    return all(entry == (dimension, "ready") for entry in state.values())
+
+
+async def ensure_vector_indexes(dimension: int) -> bool:
+    """
+    Make the HNSW indexes match `dimension`.
+
+    Indexes with another dimension are dropped first, so writes of the new
+    vectors are never rejected. Missing indexes are defined CONCURRENTLY, so
+    this never waits for a build. Returns True when every table has a built
+    index for `dimension`; False means search keeps using the exact fallback
+    for now.
+    """
+    if _all_ready(await get_index_state(), dimension):
+        return True
+    state = await get_index_state(refresh=True)
+    if _all_ready(state, dimension):
+        return True
+
+    for table, (dim, status) in state.items():
+        if status == "error" and dim is not None:
+            # Typically stored embeddings of another dimension (a rebuild after
+            # changing the embedding model is still in progress)
+            logger.warning(
+                f"Could not build {dim}-dimension vector index on {table}, "
+                "using exact search for now"
+            )
+            _failed_at[dim] = time.monotonic()
+    if any(status == "error" for _, status in state.values()):
+        await drop_vector_indexes()
+        state = await get_index_state(refresh=True)
+
+    for table, (dim, _) in state.items():
+        if dim is not None and dim != dimension:
+            logger.info(
+                f"Dropping {dim}-dimension vector index on {table} "
+                f"(embeddings now have {dimension} dimensions)"
+            )
+            await repo_query(
+                f"REMOVE INDEX IF EXISTS {vector_index_name(table)} ON {table}"
+            )
+    _forget_index_state()
+
+    failed_at = _failed_at.get(dimension)
+    if failed_at and time.monotonic() - failed_at < DEFINE_RETRY_INTERVAL:
+        return False
+
+    try:
+        for table in VECTOR_INDEX_TABLES:
+            await repo_query(
+                f"DEFINE INDEX IF NOT EXISTS {vector_index_name(table)} ON {table} "
+                f"FIELDS embedding HNSW DIMENSION {int(dimension)} DIST COSINE "
+                "TYPE F32 CONCURRENTLY"
+            )
+    except Exception as e:
+        logger.warning(
+            f"Could not define {dimension}-dimension vector indexes, "
+            f"using exact search for now: {e}"
+        )
+        _failed_at[dimension] = time.monotonic()
+        await drop_vector_indexes()
+        return False
+
+    if not _all_ready(await get_index_state(refresh=True), dimension):
+        logger.info(f"Building vector indexes for {dimension}-dimension embeddings")
+        return False
+    _failed_at.pop(dimension, None)
+    logger.info(f"Vector indexes ready for {dimension}-dimension embeddings")
+    return True
+
+
+async def wait_for_vector_indexes(
+    dimension: int, timeout: float = 600.0, interval: float = 0.5
+) -> bool:
+    """Define the indexes for `dimension` and wait until they are built."""
+    deadline = time.monotonic() + timeout
+    while not await ensure_vector_indexes(dimension):
+        failed_at = _failed_at.get(dimension)
+        if failed_at and time.monotonic() - failed_at < DEFINE_RETRY_INTERVAL:
+            return False
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(interval)
+    return True
+
+
+async def infer_embedding_dimension() -> Optional[int]:
+    """Dimension of the stored embeddings, if any are stored."""
+    for table in VECTOR_INDEX_TABLES:
+        result = await repo_query(
+            f"SELECT VALUE array::len(embedding) FROM {table} "
+            "WHERE embedding != none AND array::len(embedding) > 0 LIMIT 1"
+        )
+        if result:
+            return int(result[0])
+    return None
+
+
+async def sync_vector_indexes() -> Optional[int]:
+    """Define missing indexes for the stored embeddings' dimension."""
+    dimension = await infer_embedding_dimension()
+    if dimension is None:
+        return None
+    if await ensure_vector_indexes(dimension):
+        return dimension
+    return None
@@ -0,0 +1,131 @@
+"""
+Per-record write coordination for SurrealDB.
+
+Concurrent writes to the same record (e.g. several transformations finishing
+for one source) make SurrealDB abort transactions with conflicts, which the
+commands then retry with exponential backoff. The coordinator avoids most of
+these inside a process:
+
+- Writes to the same record key run one at a time (keyed async locks)
+- MERGE updates queued while a record is busy are combined into a single
+  statement, so N pending updates cost one round trip instead of N
+
+Writes to different records are not affected and keep full parallelism.
+"""
+
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+R = TypeVar("R")
+
+
+def _deep_merge(target: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge `data` into `target` the way consecutive SurrealDB MERGEs would."""
+    for key, value in data.items():
+        existing = target.get(key)
+        if isinstance(existing, dict) and isinstance(value, dict):
+            target[key] = _deep_merge(dict(existing), value)
+        else:
+            target[key] = value
+    return target
+
+
+class _PendingMerge:
+    """MERGE data accumulated for a record while it waits for its turn."""
+
+    def __init__(self, data: Dict[str, Any], future: asyncio.Future) -> None:
+        self.data = data
+        self.future = future
+        self.waiters = 0
+
+
+class WriteCoordinator:
+    """Serializes writes per record key and coalesces pending MERGE updates."""
+
+    def __init__(self) -> None:
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._users: Dict[str, int] = {}
+        self._pending: Dict[str, _PendingMerge] = {}
+        self.coalesced = 0
+
+    @asynccontextmanager
+    async def serialize(self, key: str) -> AsyncIterator[None]:
+        """Hold the write lock for `key` for the duration of the block."""
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._users[key] = self._users.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            # Drop the lock once nobody uses it so the dict does not grow
+            self._users[key] -= 1
+            if not self._users[key]:
+                del self._users[key]
+                del self._locks[key]
+
+    async def merge(
+        self,
+        key: str,
+        data: Dict[str, Any],
+        execute: Callable[[Dict[str, Any]], Awaitable[R]],
+    ) -> R:
+        """
+        Apply a MERGE update to `key`, combining it with other pending ones.
+
+        `execute` receives the combined data and performs the write. Every
+        caller whose update was folded into the same statement receives that
+        statement's result (or exception).
+        """
+        pending = self._pending.get(key)
+        if pending is not None:
+            _deep_merge(pending.data, data)
+            pending.waiters += 1
+            self.coalesced += 1
+            return await asyncio.shield(pending.future)
+
+        pending = _PendingMerge(dict(data), asyncio.get_running_loop().create_future())
+        self._pending[key] = pending
+        try:
+            async with self.serialize(key):
+                # From here on, new updates start the next batch
+                if self._pending.get(key) is pending:
+                    del self._pending[key]
+                result = await execute(pending.data)
+        except BaseException as e:
+            if self._pending.get(key) is pending:
+                del self._pending[key]
+            if isinstance(e, asyncio.CancelledError):
+                pending.future.cancel()
+            else:
+                pending.future.set_exception(e)
+                if not pending.waiters:
+                    # Mark as retrieved: the leader re-raises it below
+                    pending.future.exception()
+            raise
+        pending.future.set_result(result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "locked_keys": len(self._locks),
+            "pending_merges": len(self._pending),
+            "coalesced": self.coalesced,
+        }
+
+
+_coordinators: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, WriteCoordinator]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_write_coordinator() -> WriteCoordinator:
+    """Get the write coordinator for the running event loop."""
+    loop = asyncio.get_running_loop()
+    coordinator: Optional[WriteCoordinator] = _coordinators.get(loop)
+    if coordinator is None:
+        coordinator = _coordinators[loop] = WriteCoordinator()
+    return coordinator
@@ -1,5 +1,17 @@
+import asyncio
 from datetime import datetime
-from typing import Any, ClassVar, Dict, List, Optional, Type, TypeVar, Union, cast
+from typing import (
+    Any,
+    AsyncIterator,
+    ClassVar,
+    Dict,
+    List,
+    Optional,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
 
 from loguru import logger
 from pydantic import (
@@ -10,12 +22,15 @@ from pydantic import (
     model_validator,
 )
 
+from open_notebook.database.loader import get_current_loader, record_loader
+from open_notebook.database.record_cache import get_record_cache
 from open_notebook.database.repository import (
     ensure_record_id,
     repo_create,
     repo_delete,
     repo_query,
     repo_relate,
+    repo_stream,
     repo_update,
     repo_upsert,
 )
@@ -32,6 +47,8 @@ class ObjectModel(BaseModel):
     id: Optional[str] = None
     table_name: ClassVar[str] = ""
     nullable_fields: ClassVar[set[str]] = set()  # Fields that can be saved as None
+    # Seconds get() may serve this model from the in-process record cache (0 = off)
+    cache_ttl: ClassVar[float] = 0
     created: Optional[datetime] = None
     updated: Optional[datetime] = None
 
@@ -52,7 +69,7 @@ class ObjectModel(BaseModel):
             else:
                 query = f"SELECT * FROM {table_name}"
 
-            result = await repo_query(query)
+            result = await repo_query(query, idempotent=True)
             objects = []
             for obj in result:
                 try:
@@ -67,7 +84,32 @@ class ObjectModel(BaseModel):
             raise DatabaseOperationError(e)
 
     @classmethod
-    async def get(cls: Type[T], id: str) -> T:
+    async def stream_all(cls: Type[T], page_size: int = 500) -> AsyncIterator[T]:
+        """
+        Iterate over every record of this model in id order.
+
+        Unlike get_all(), records are fetched one page at a time, so memory
+        stays bounded on large tables (rebuilds, exports, admin scans).
+        """
+        if not cls.table_name:
+            raise InvalidInputError(
+                "stream_all() must be called from a specific model class"
+            )
+        async for row in repo_stream(cls.table_name, page_size=page_size):
+            try:
+                yield cls(**row)
+            except Exception as e:
+                logger.critical(f"Error creating object: {str(e)}")
+
+    @classmethod
+    async def get(cls: Type[T], id: str, cached: bool = True) -> T:
+        """
+        Fetch one record by id.
+
+        Pass cached=False to read past the record cache. Commands do: the
+        cache is per process and only the writing process invalidates it, so
+        the worker would otherwise miss edits made through the API.
+        """
         if not id:
             raise InvalidInputError("ID cannot be empty")
         try:
@@ -84,8 +126,26 @@ class ObjectModel(BaseModel):
                     raise InvalidInputError(f"No class found for table {table_name}")
                 target_class = cast(Type[T], found_class)
 
-            result = await repo_query("SELECT * FROM $id", {"id": ensure_record_id(id)})
+            cache = get_record_cache()
+            use_cache = cached and target_class.cache_ttl > 0 and cache.enabled
+            if use_cache:
+                row = cache.get(id)
+                if row is not None:
+                    return target_class(**row)
+                version = cache.version(id)
+
+            loader = get_current_loader()
+            if loader is not None:
+                # Batched with other lookups made in the same tick
+                row = await loader.load(id)
+                result = [row] if row is not None else []
+            else:
+                result = await repo_query(
+                    "SELECT * FROM $id", {"id": ensure_record_id(id)}, idempotent=True
+                )
             if result:
+                if use_cache:
+                    cache.put(id, result[0], target_class.cache_ttl, version)
                 return target_class(**result[0])
             else:
                 raise NotFoundError(f"{table_name} with id {id} not found")
@@ -94,6 +154,25 @@ class ObjectModel(BaseModel):
             logger.exception(e)
             raise NotFoundError(f"Object with id {id} not found - {str(e)}")
 
+    @classmethod
+    async def get_many(cls: Type[T], ids: List[str]) -> List[T]:
+        """
+        Fetch several records in one round trip, in the order given.
+
+        Ids that do not exist are skipped. Lookups go through get(), so cached
+        records are not fetched again and duplicate ids are queried once.
+        """
+
+        async def get_or_none(id: str) -> Optional[T]:
+            try:
+                return await cls.get(id)
+            except NotFoundError:
+                return None
+
+        async with record_loader():
+            results = await asyncio.gather(*(get_or_none(id) for id in ids))
+        return [result for result in results if result is not None]
+
     @classmethod
     def _get_class_by_table_name(cls, table_name: str) -> Optional[Type["ObjectModel"]]:
         """Find the appropriate subclass based on table_name."""
@@ -137,6 +216,7 @@ class ObjectModel(BaseModel):
                 repo_result = await repo_update(
                     self.__class__.table_name, self.id, data
                 )
+                get_record_cache().invalidate(str(self.id))
             # Update the current instance with the result
             # repo_result is a list of dictionaries
             result_list: List[Dict[str, Any]] = (
@@ -172,6 +252,7 @@ class ObjectModel(BaseModel):
             raise InvalidInputError("Cannot delete object without an ID")
         try:
             logger.debug(f"Deleting record with id {self.id}")
+            get_record_cache().invalidate(str(self.id))
             return await repo_delete(self.id)
         except Exception as e:
             logger.error(
@@ -155,6 +155,20 @@ class Credential(ObjectModel):
         )
         return [Model(**row) for row in results]
 
+    @classmethod
+    async def get_linked_model_counts(
+        cls, credential_ids: List[str]
+    ) -> Dict[str, int]:
+        """Count linked models for several credentials in one query."""
+        if not credential_ids:
+            return {}
+        results = await repo_query(
+            "SELECT credential, count() AS count FROM model "
+            "WHERE credential IN $cred_ids GROUP BY credential",
+            {"cred_ids": [ensure_record_id(cid) for cid in credential_ids]},
+        )
+        return {str(row["credential"]): row["count"] for row in results}
+
     def _prepare_save_data(self) -> Dict[str, Any]:
         """Override to encrypt api_key before storage."""
         data = {}
@@ -8,13 +8,30 @@ from pydantic import BaseModel, ConfigDict, Field, field_validator
 from surreal_commands import submit_command
 from surrealdb import RecordID
 
-from open_notebook.database.repository import ensure_record_id, repo_query
+from open_notebook.database.repository import (
+    ensure_record_id,
+    repo_batch,
+    repo_query,
+)
+from open_notebook.database.numpy_index import (
+    get_numpy_index,
+    remove_from_numpy_index,
+)
+from open_notebook.database.record_cache import get_record_cache
+from open_notebook.database.vector_index import (
+    get_vector_index_dimension,
+    get_vector_search_backend,
+    get_vector_search_ef,
+    get_vector_search_exact,
+)
 from open_notebook.domain.base import ObjectModel
 from open_notebook.exceptions import DatabaseOperationError, InvalidInputError
+from open_notebook.utils.search_results import collapse_results
 
 
 class Notebook(ObjectModel):
     table_name: ClassVar[str] = "notebook"
+    cache_ttl: ClassVar[float] = 5
     name: str
     description: str
     archived: Optional[bool] = False
@@ -155,18 +172,29 @@ class Notebook(ObjectModel):
             deleted_sources = 0
             unlinked_sources = 0
 
-            # 1. Get and delete all notes linked to this notebook
+            # 1. Delete all notes linked to this notebook and their artifact
+            # relationships in a single round trip
             notes = await self.get_notes()
-            for note in notes:
-                await note.delete()
-                deleted_notes += 1
-            logger.info(f"Deleted {deleted_notes} notes for notebook {self.id}")
-
-            # Delete artifact relationships
-            await repo_query(
-                "DELETE artifact WHERE out = $notebook_id",
-                {"notebook_id": notebook_id},
+            await repo_batch(
+                [
+                    (
+                        "DELETE $note_ids",
+                        {"note_ids": [ensure_record_id(n.id) for n in notes if n.id]},
+                    ),
+                    (
+                        "DELETE artifact WHERE out = $notebook_id",
+                        {"notebook_id": notebook_id},
+                    ),
+                ],
+                transaction=True,
             )
+            # The batch bypasses Note.delete(), so do its cleanup here
+            note_ids = [str(n.id) for n in notes if n.id]
+            for note_id in note_ids:
+                get_record_cache().invalidate(note_id)
+            await remove_from_numpy_index(note_ids)
+            deleted_notes = len(notes)
+            logger.info(f"Deleted {deleted_notes} notes for notebook {self.id}")
 
             # 2. Handle sources
             if delete_exclusive_sources:
@@ -289,6 +317,8 @@ class Source(ObjectModel):
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
     table_name: ClassVar[str] = "source"
+    # Kept short: workers update sources from another process
+    cache_ttl: ClassVar[float] = 5
     asset: Optional[Asset] = None
     title: Optional[str] = None
     topics: Optional[List[str]] = Field(default_factory=list)
@@ -408,7 +438,7 @@ class Source(ObjectModel):
             raise InvalidInputError("Notebook ID must be provided")
         return await self.relate("reference", notebook_id)
 
-    async def vectorize(self) -> str:
+    async def vectorize(self, incremental: bool = False) -> str:
         """
         Submit vectorization as a background job using the embed_source command.
 
@@ -419,6 +449,9 @@ class Source(ObjectModel):
         3. Generates all embeddings in a single API call
         4. Bulk inserts source_embedding records
 
+        With `incremental`, chunks whose text did not change keep their stored
+        embeddings and only the changed chunks are embedded and written.
+
         Returns:
             str: The command/job ID that can be used to track progress via the commands API
 
@@ -436,7 +469,7 @@ class Source(ObjectModel):
             command_id = submit_command(
                 "open_notebook",
                 "embed_source",
-                {"source_id": str(self.id)},
+                {"source_id": str(self.id), "incremental": incremental},
             )
 
             command_id_str = str(command_id)
@@ -533,15 +566,26 @@ class Source(ObjectModel):
         # Delete associated embeddings and insights to prevent orphaned records
         try:
             source_id = ensure_record_id(self.id)
-            await repo_query(
-                "DELETE source_embedding WHERE source = $source_id",
-                {"source_id": source_id},
-            )
-            await repo_query(
-                "DELETE source_insight WHERE source = $source_id",
-                {"source_id": source_id},
+            await repo_batch(
+                [
+                    (
+                        "DELETE source_embedding WHERE source = $source_id",
+                        {"source_id": source_id},
+                    ),
+                    (
+                        "DELETE source_insight WHERE source = $source_id",
+                        {"source_id": source_id},
+                    ),
+                    # Windows of an unfinished streamed embedding
+                    (
+                        "DELETE source_embedding_staging WHERE source = $source_id",
+                        {"source_id": source_id},
+                    ),
+                ],
+                transaction=True,
             )
             logger.debug(f"Deleted embeddings and insights for source {self.id}")
+            await remove_from_numpy_index([str(self.id)])
         except Exception as e:
             logger.warning(
                 f"Failed to delete embeddings/insights for source {self.id}: {e}. "
@@ -590,6 +634,11 @@ class Note(ObjectModel):
 
         return None
 
+    async def delete(self) -> bool:
+        deleted = await super().delete()
+        await remove_from_numpy_index([str(self.id)])
+        return deleted
+
     async def add_to_notebook(self, notebook_id: str) -> Any:
         if not notebook_id:
             raise InvalidInputError("Notebook ID must be provided")
@@ -610,6 +659,7 @@ class Note(ObjectModel):
 
 class ChatSession(ObjectModel):
     table_name: ClassVar[str] = "chat_session"
+    cache_ttl: ClassVar[float] = 5
     nullable_fields: ClassVar[set[str]] = {"model_override"}
     title: Optional[str] = None
     model_override: Optional[str] = None
@@ -625,18 +675,137 @@ class ChatSession(ObjectModel):
         return await self.relate("refers_to", source_id)
 
 
+# Search results only carry record links in these fields; skip decoding the
+# (potentially large) matched content
+SEARCH_RESULT_ID_FIELDS = ("id", "parent_id")
+
+
+def _search_scope(
+    notebook_id: Optional[str], user_id: Optional[str]
+) -> Tuple[str, str]:
+    """
+    SurrealQL expressions for the sources and notes a scoped search visits.
+
+    Notebook scopes follow the `reference`/`artifact` edges of the notebook;
+    user scopes use the `user_id` indexes. The scope is materialized into a
+    variable first: `field IN $variable` is answered from the index on
+    `source`, whereas an inline subquery makes SurrealDB scan the table.
+    """
+    if notebook_id:
+        source_node = "(source WHERE user_id = $user_id)" if user_id else "source"
+        note_node = "(note WHERE user_id = $user_id)" if user_id else "note"
+        return (
+            f"(SELECT VALUE <-reference<-{source_node} FROM ONLY $notebook_id) ?? []",
+            f"(SELECT VALUE <-artifact<-{note_node} FROM ONLY $notebook_id) ?? []",
+        )
+    return (
+        "(SELECT VALUE id FROM source WHERE user_id = $user_id)",
+        "(SELECT VALUE id FROM note WHERE user_id = $user_id)",
+    )
+
+
+def _scope_vars(notebook_id: Optional[str], user_id: Optional[str]) -> Dict[str, Any]:
+    return {
+        "notebook_id": ensure_record_id(notebook_id) if notebook_id else None,
+        "user_id": ensure_record_id(user_id) if user_id else None,
+    }
+
+
+def _scoped_text_search_query(
+    notebook_id: Optional[str], user_id: Optional[str]
+) -> str:
+    """fn::text_search restricted to the sources and notes in scope."""
+    sources, notes = _search_scope(notebook_id, user_id)
+    highlight = "search::highlight('`', '`', 1) AS content"
+    relevance = "math::max(search::score(1)) AS relevance"
+    return f"""
+    RETURN {{
+        LET $scope_sources = IF $source {{ {sources} }} ELSE {{ [] }};
+        LET $scope_notes = IF $note {{ {notes} }} ELSE {{ [] }};
+        LET $source_title_search = (
+            SELECT id, title, {highlight}, id AS parent_id, {relevance}
+            FROM source WHERE title @1@ $keyword AND id IN $scope_sources
+            GROUP BY id
+        );
+        LET $source_embedding_search = (
+            SELECT source.id AS id, source.title AS title, {highlight},
+                source.id AS parent_id, {relevance}
+            FROM source_embedding
+            WHERE content @1@ $keyword AND source IN $scope_sources
+            GROUP BY id
+        );
+        LET $source_full_search = (
+            SELECT id, title, {highlight}, id AS parent_id, {relevance}
+            FROM source WHERE full_text @1@ $keyword AND id IN $scope_sources
+            GROUP BY id
+        );
+        LET $source_insight_search = (
+            SELECT id, insight_type + ' - ' + (source.title OR '') AS title,
+                {highlight}, id AS parent_id, {relevance}
+            FROM source_insight
+            WHERE content @1@ $keyword AND source IN $scope_sources
+            GROUP BY id
+        );
+        LET $note_title_search = (
+            SELECT id, title, {highlight}, id AS parent_id, {relevance}
+            FROM note WHERE title @1@ $keyword AND id IN $scope_notes
+            GROUP BY id
+        );
+        LET $note_content_search = (
+            SELECT id, title, {highlight}, id AS parent_id, {relevance}
+            FROM note WHERE content @1@ $keyword AND id IN $scope_notes
+            GROUP BY id
+        );
+        LET $all_results = array::union(
+            array::union(
+                array::union($source_embedding_search, $source_full_search),
+                array::union($source_title_search, $source_insight_search)
+            ),
+            array::union($note_title_search, $note_content_search)
+        );
+        RETURN SELECT * FROM (
+            SELECT id, parent_id, title, math::max(relevance) AS relevance
+            FROM $all_results WHERE id IS NOT NONE
+            GROUP BY id, parent_id, title
+        ) ORDER BY relevance DESC LIMIT $results;
+    }};
+    """
+
+
 async def text_search(
-    keyword: str, results: int, source: bool = True, note: bool = True
+    keyword: str,
+    results: int,
+    source: bool = True,
+    note: bool = True,
+    notebook_id: Optional[str] = None,
+    user_id: Optional[str] = None,
 ):
+    """
+    Full-text (BM25) search over sources, insights and notes.
+
+    Pass `notebook_id` and/or `user_id` to only search that notebook's or
+    that user's content.
+    """
     if not keyword:
         raise InvalidInputError("Search keyword cannot be empty")
     try:
-        search_results = await repo_query(
-            """
+        if notebook_id or user_id:
+            query = _scoped_text_search_query(notebook_id, user_id)
+        else:
+            query = """
             select *
             from fn::text_search($keyword, $results, $source, $note)
-            """,
-            {"keyword": keyword, "results": results, "source": source, "note": note},
+            """
+        search_results = await repo_query(
+            query,
+            {
+                "keyword": keyword,
+                "results": results,
+                "source": source,
+                "note": note,
+                **_scope_vars(notebook_id, user_id),
+            },
+            record_id_fields=SEARCH_RESULT_ID_FIELDS,
         )
         return search_results
     except Exception as e:
@@ -645,34 +814,409 @@ async def text_search(
         raise DatabaseOperationError(e)
 
 
+def _knn_search_query(results: int, ef: int) -> str:
+    """
+    Same result shape as fn::vector_search, but each table is searched through
+    its HNSW index. The KNN operator only accepts literal sizes, which is why
+    this is built here rather than stored as a function.
+    """
+    knn = f"<|{int(results)},{max(int(ef), int(results))}|>"
+    return f"""
+    RETURN {{
+        LET $source_embedding_search = IF $source {{(
+            SELECT * FROM (
+                SELECT source.id AS id, source.title AS title, content,
+                    source.id AS parent_id,
+                    vector::similarity::cosine(embedding, $embed) AS similarity
+                FROM source_embedding WHERE embedding {knn} $embed
+            ) WHERE similarity >= $minimum_score
+        )}} ELSE {{ [] }};
+        LET $source_insight_search = IF $source {{(
+            SELECT * FROM (
+                SELECT id, insight_type + ' - ' + (source.title OR '') AS title,
+                    content, source.id AS parent_id,
+                    vector::similarity::cosine(embedding, $embed) AS similarity
+                FROM source_insight WHERE embedding {knn} $embed
+            ) WHERE similarity >= $minimum_score
+        )}} ELSE {{ [] }};
+        LET $note_content_search = IF $note {{(
+            SELECT * FROM (
+                SELECT id, title, content, id AS parent_id,
+                    vector::similarity::cosine(embedding, $embed) AS similarity
+                FROM note WHERE embedding {knn} $embed
+            ) WHERE similarity >= $minimum_score
+        )}} ELSE {{ [] }};
+        LET $all_results = array::union(
+            array::union($source_embedding_search, $source_insight_search),
+            $note_content_search
+        );
+        RETURN SELECT * FROM (
+            SELECT id, parent_id, title, math::max(similarity) AS similarity,
+                array::flatten(content) AS matches
+            FROM $all_results WHERE id IS NOT NONE
+            GROUP BY id, parent_id, title
+        ) ORDER BY similarity DESC LIMIT $results;
+    }};
+    """
+
+
+def _scoped_vector_search_query(
+    notebook_id: Optional[str], user_id: Optional[str]
+) -> str:
+    """
+    Exact vector search over the sources and notes in scope only, so the cost
+    follows the size of the scope rather than of the whole database.
+    """
+    sources, notes = _search_scope(notebook_id, user_id)
+    same_dimension = "embedding != NONE AND array::len(embedding) = array::len($embed)"
+    similarity = "vector::similarity::cosine(embedding, $embed) AS similarity"
+    return f"""
+    RETURN {{
+        LET $scope_sources = IF $source {{ {sources} }} ELSE {{ [] }};
+        LET $scope_notes = IF $note {{ {notes} }} ELSE {{ [] }};
+        LET $source_embedding_search = (
+            SELECT * FROM (
+                SELECT source.id AS id, source.title AS title, content,
+                    source.id AS parent_id, {similarity}
+                FROM source_embedding
+                WHERE source IN $scope_sources AND {same_dimension}
+            ) WHERE similarity >= $minimum_score
+            ORDER BY similarity DESC LIMIT $results
+        );
+        LET $source_insight_search = (
+            SELECT * FROM (
+                SELECT id, insight_type + ' - ' + (source.title OR '') AS title,
+                    content, source.id AS parent_id, {similarity}
+                FROM source_insight
+                WHERE source IN $scope_sources AND {same_dimension}
+            ) WHERE similarity >= $minimum_score
+            ORDER BY similarity DESC LIMIT $results
+        );
+        LET $note_content_search = (
+            SELECT * FROM (
+                SELECT id, title, content, id AS parent_id, {similarity}
+                FROM $scope_notes WHERE {same_dimension}
+            ) WHERE similarity >= $minimum_score
+            ORDER BY similarity DESC LIMIT $results
+        );
+        LET $all_results = array::union(
+            array::union($source_embedding_search, $source_insight_search),
+            $note_content_search
+        );
+        RETURN SELECT * FROM (
+            SELECT id, parent_id, title, math::max(similarity) AS similarity,
+                array::flatten(content) AS matches
+            FROM $all_results WHERE id IS NOT NONE
+            GROUP BY id, parent_id, title
+        ) ORDER BY similarity DESC LIMIT $results;
+    }};
+    """
+
+
+async def _numpy_vector_search(
+    embed: List[float],
+    results: int,
+    source: bool,
+    note: bool,
+    minimum_score: float,
+) -> List[Dict[str, Any]]:
+    """
+    fn::vector_search over the NumPy index: the index ranks rows, and only
+    the winning rows are read from the database to build the same results.
+    """
+    tables = []
+    if source:
+        tables += ["source_embedding", "source_insight"]
+    if note:
+        tables.append("note")
+    hits = await asyncio.to_thread(
+        get_numpy_index().search, embed, results, tables, minimum_score
+    )
+    if not hits:
+        return []
+
+    rows = await repo_query(
+        """
+        SELECT id, title, content, insight_type,
+            source.id AS source_id, source.title AS source_title
+        FROM $ids
+        """,
+        {"ids": [ensure_record_id(record_id) for record_id, _ in hits]},
+        record_id_fields=("id", "source_id"),
+    )
+    rows_by_id = {row["id"]: row for row in rows}
+
+    grouped: Dict[Tuple[Any, Any, Any], Dict[str, Any]] = {}
+    for record_id, similarity in hits:
+        row = rows_by_id.get(record_id)
+        if row is None:
+            # Deleted since it was indexed
+            continue
+        table = record_id.split(":", 1)[0]
+        if table == "source_embedding":
+            result_id = parent_id = row.get("source_id")
+            title = row.get("source_title")
+        elif table == "source_insight":
+            result_id, parent_id = record_id, row.get("source_id")
+            title = f"{row.get('insight_type')} - {row.get('source_title') or ''}"
+        else:
+            result_id = parent_id = record_id
+            title = row.get("title")
+        if result_id is None:
+            continue
+        result = grouped.setdefault(
+            (result_id, parent_id, title),
+            {
+                "id": result_id,
+                "parent_id": parent_id,
+                "title": title,
+                "similarity": similarity,
+                "matches": [],
+            },
+        )
+        result["similarity"] = max(result["similarity"], similarity)
+        result["matches"].append(row.get("content"))
+
+    ranked = sorted(grouped.values(), key=lambda r: r["similarity"], reverse=True)
+    return ranked[:results]
+
+
+async def _search_embeddings(
+    embeds: List[List[float]],
+    results: int,
+    source: bool,
+    note: bool,
+    minimum_score: float,
+    exact: Optional[bool],
+    notebook_id: Optional[str],
+    user_id: Optional[str],
+) -> List[List[Dict[str, Any]]]:
+    """Run one vector search per query embedding, all in one round trip."""
+    if exact is None:
+        exact = get_vector_search_exact()
+    dimension = len(embeds[0])
+    if notebook_id or user_id:
+        query = _scoped_vector_search_query(notebook_id, user_id)
+    elif get_vector_search_backend() == "numpy" and await asyncio.to_thread(
+        get_numpy_index().is_ready, dimension
+    ):
+        return list(
+            await asyncio.gather(
+                *(
+                    _numpy_vector_search(embed, results, source, note, minimum_score)
+                    for embed in embeds
+                )
+            )
+        )
+    elif not exact and await get_vector_index_dimension() == dimension:
+        query = _knn_search_query(results, get_vector_search_ef())
+    else:
+        query = """
+        SELECT * FROM fn::vector_search($embed, $results, $source, $note, $minimum_score);
+        """
+    statements = [
+        (
+            query,
+            {
+                "embed": embed,
+                "results": results,
+                "source": source,
+                "note": note,
+                "minimum_score": minimum_score,
+                **_scope_vars(notebook_id, user_id),
+            },
+        )
+        for embed in embeds
+    ]
+    if len(statements) == 1:
+        return [
+            await repo_query(*statements[0], record_id_fields=SEARCH_RESULT_ID_FIELDS)
+        ]
+    return await repo_batch(statements)
+
+
 async def vector_search(
     keyword: str,
     results: int,
     source: bool = True,
     note: bool = True,
     minimum_score=0.2,
+    exact: Optional[bool] = None,
+    notebook_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    max_chunks_per_parent: Optional[int] = None,
+    snippet_chars: Optional[int] = None,
 ):
+    """
+    Semantic search over source chunks, insights and notes.
+
+    Uses the HNSW indexes when they exist for the query's dimension and falls
+    back to the exact fn::vector_search otherwise. Pass `exact=True` (or set
+    VECTOR_SEARCH_EXACT) to always score every embedding. With
+    VECTOR_SEARCH_BACKEND=numpy, a complete NumPy index is used instead.
+
+    Pass `notebook_id` and/or `user_id` to only search that notebook's or
+    that user's content; only the embeddings in scope are scored.
+
+    Results are collapsed to `max_chunks_per_parent` chunks per source or
+    note, and each chunk in `matches` is cut to the `snippet_chars` window
+    that best matches the query, with term offsets in `highlights`. None
+    uses SEARCH_MAX_CHUNKS_PER_PARENT and SEARCH_SNIPPET_CHARS; 0 disables.
+    """
     if not keyword:
         raise InvalidInputError("Search keyword cannot be empty")
     try:
-        from open_notebook.utils.embedding import generate_embedding
+        from open_notebook.utils.embedding import generate_query_embedding
 
-        # Use unified embedding function (handles chunking if query is very long)
-        embed = await generate_embedding(keyword)
-        search_results = await repo_query(
-            """
-            SELECT * FROM fn::vector_search($embed, $results, $source, $note, $minimum_score);
-            """,
-            {
-                "embed": embed,
-                "results": results,
-                "source": source,
-                "note": note,
-                "minimum_score": minimum_score,
-            },
+        # Cached per embedding model; chunks and pools very long queries
+        embed = await generate_query_embedding(keyword)
+        search_results = await _search_embeddings(
+            [embed], results, source, note, minimum_score, exact, notebook_id, user_id
+        )
+        return collapse_results(
+            search_results[0], keyword, max_chunks_per_parent, snippet_chars
         )
-        return search_results
     except Exception as e:
         logger.error(f"Error performing vector search: {str(e)}")
         logger.exception(e)
         raise DatabaseOperationError(e)
+
+
+async def batch_vector_search(
+    keywords: List[str],
+    results: int,
+    source: bool = True,
+    note: bool = True,
+    minimum_score=0.2,
+    exact: Optional[bool] = None,
+    notebook_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    max_chunks_per_parent: Optional[int] = None,
+    snippet_chars: Optional[int] = None,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Semantic search for several queries at once; see vector_search().
+
+    All queries are embedded in a single embedding call and searched in a
+    single database round trip. Returns one result list per query, in order.
+    """
+    if any(not keyword for keyword in keywords):
+        raise InvalidInputError("Search keyword cannot be empty")
+    if not keywords:
+        return []
+    try:
+        from open_notebook.utils.embedding import generate_query_embeddings
+
+        embeds = await generate_query_embeddings(keywords)
+        searches = await _search_embeddings(
+            embeds, results, source, note, minimum_score, exact, notebook_id, user_id
+        )
+        return [
+            collapse_results(search, keyword, max_chunks_per_parent, snippet_chars)
+            for keyword, search in zip(keywords, searches)
+        ]
+    except Exception as e:
+        logger.error(f"Error performing batch vector search: {str(e)}")
+        logger.exception(e)
+        raise DatabaseOperationError(e)
+
+
+# Reciprocal rank fusion constant; larger values flatten the rank curve
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: List[Tuple[List[Dict[str, Any]], str, float]],
+    limit: int,
+    k: int = RRF_K,
+) -> List[Dict[str, Any]]:
+    """
+    Fuse result lists by weighted reciprocal rank.
+
+    Each entry of `ranked_lists` is (results, score field, weight). Results
+    are ranked by their score field, and every result scores
+    `weight / (k + rank)` summed over the lists it appears in. A result found
+    by several lists keeps the fields of each (e.g. `relevance` and
+    `similarity`), and the fused score is stored in `score`.
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for results, score_field, weight in ranked_lists:
+        if weight <= 0:
+            continue
+        ranked = sorted(results, key=lambda r: r.get(score_field) or 0, reverse=True)
+        for rank, result in enumerate(ranked, start=1):
+            key = str(result["id"])
+            merged = fused.get(key)
+            if merged is None:
+                merged = fused[key] = {**result, "score": 0.0}
+            else:
+                for field, value in result.items():
+                    merged.setdefault(field, value)
+            merged["score"] += weight / (k + rank)
+    return sorted(fused.values(), key=lambda r: r["score"], reverse=True)[:limit]
+
+
+async def hybrid_search(
+    keyword: str,
+    results: int,
+    source: bool = True,
+    note: bool = True,
+    minimum_score=0.2,
+    text_weight: float = 1.0,
+    vector_weight: float = 1.0,
+    notebook_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    max_chunks_per_parent: Optional[int] = None,
+    snippet_chars: Optional[int] = None,
+):
+    """
+    Full-text (BM25) and semantic search fused into a single ranking.
+
+    Both searches run concurrently and are combined with reciprocal rank
+    fusion, so results found lexically and semantically rise to the top.
+    A weight of 0 skips that search. `notebook_id` and `user_id` scope both
+    searches; `max_chunks_per_parent` and `snippet_chars` shape the vector
+    matches as in vector_search().
+    """
+    if not keyword:
+        raise InvalidInputError("Search keyword cannot be empty")
+
+    async def no_results() -> List[Dict[str, Any]]:
+        return []
+
+    text_results, vector_results = await asyncio.gather(
+        (
+            text_search(
+                keyword,
+                results,
+                source,
+                note,
+                notebook_id=notebook_id,
+                user_id=user_id,
+            )
+            if text_weight
+            else no_results()
+        ),
+        (
+            vector_search(
+                keyword,
+                results,
+                source,
+                note,
+                minimum_score,
+                notebook_id=notebook_id,
+                user_id=user_id,
+                max_chunks_per_parent=max_chunks_per_parent,
+                snippet_chars=snippet_chars,
+            )
+            if vector_weight
+            else no_results()
+        ),
+    )
+    return reciprocal_rank_fusion(
+        [
+            (text_results or [], "relevance", text_weight),
+            (vector_results or [], "similarity", vector_weight),
+        ],
+        results,
+    )
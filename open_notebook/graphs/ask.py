@@ -10,7 +10,7 @@ from pydantic import BaseModel, Field
 from typing_extensions import TypedDict
 
 from open_notebook.ai.provision import provision_langchain_model
-from open_notebook.domain.notebook import vector_search
+from open_notebook.domain.notebook import batch_vector_search, hybrid_search
 from open_notebook.utils import clean_thinking_content
 
 
@@ -18,7 +18,7 @@ class SubGraphState(TypedDict):
     question: str
     term: str
     instructions: str
-    results: dict
+    results: list
     answer: str
     ids: list  # Added for provide_answer function
 
@@ -41,6 +41,7 @@ class Strategy(BaseModel):
 class ThreadState(TypedDict):
     question: str
     strategy: Strategy
+    search_results: list  # One result list per strategy search, if prefetched
     answers: Annotated[list, operator.add]
     final_answer: str
 
@@ -75,7 +76,17 @@ async def call_model_with_messages(state: ThreadState, config: RunnableConfig) -
     return {"strategy": strategy}
 
 
+async def run_searches(state: ThreadState, config: RunnableConfig) -> dict:
+    """Embed and run every vector search of the strategy in one batch."""
+    terms = [s.term for s in state["strategy"].searches]
+    # Hybrid searches run per answer branch
+    if not terms or config.get("configurable", {}).get("search_type") == "hybrid":
+        return {"search_results": []}
+    return {"search_results": await batch_vector_search(terms, 10, True, True)}
+
+
 async def trigger_queries(state: ThreadState, config: RunnableConfig):
+    search_results = state.get("search_results") or []
     return [
         Send(
             "provide_answer",
@@ -84,21 +95,25 @@ async def trigger_queries(state: ThreadState, config: RunnableConfig):
                 "instructions": s.instructions,
                 "term": s.term,
                 # "type": s.type,
+                **({"results": search_results[i]} if search_results else {}),
             },
         )
-        for s in state["strategy"].searches
+        for i, s in enumerate(state["strategy"].searches)
     ]
 
 
 async def provide_answer(state: SubGraphState, config: RunnableConfig) -> dict:
     payload = state
-    # if state["type"] == "text":
-    #     results = text_search(state["term"], 10, True, True)
-    # else:
-    results = await vector_search(state["term"], 10, True, True)
+    results = state.get("results")
+    if results is None:
+        # "hybrid" also matches exact terms (names, acronyms) that embeddings miss
+        results = await hybrid_search(state["term"], 10, True, True)
     if len(results) == 0:
         return {"answers": []}
-    payload["results"] = results
+    # Highlight offsets are for the UI; the snippets alone go in the prompt
+    payload["results"] = [
+        {k: v for k, v in r.items() if k != "highlights"} for r in results
+    ]
     ids = [r["id"] for r in results]
     payload["ids"] = ids
     system_prompt = Prompter(prompt_template="ask/query_process").render(data=payload)  # type: ignore[arg-type]
@@ -136,10 +151,12 @@ async def write_final_answer(state: ThreadState, config: RunnableConfig) -> dict
 
 agent_state = StateGraph(ThreadState)
 agent_state.add_node("agent", call_model_with_messages)
+agent_state.add_node("run_searches", run_searches)
 agent_state.add_node("provide_answer", provide_answer)
 agent_state.add_node("write_final_answer", write_final_answer)
 agent_state.add_edge(START, "agent")
-agent_state.add_conditional_edges("agent", trigger_queries, ["provide_answer"])
+agent_state.add_edge("agent", "run_searches")
+agent_state.add_conditional_edges("run_searches", trigger_queries, ["provide_answer"])
 agent_state.add_edge("provide_answer", "write_final_answer")
 agent_state.add_edge("write_final_answer", END)
 
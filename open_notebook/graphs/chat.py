@@ -12,6 +12,10 @@ from typing_extensions import TypedDict
 
 from open_notebook.ai.provision import provision_langchain_model
 from open_notebook.config import LANGGRAPH_CHECKPOINT_FILE
+from open_notebook.database.repository import (
+    close_connection_pool,
+    run_and_close_pool,
+)
 from open_notebook.domain.notebook import Notebook
 from open_notebook.utils import clean_thinking_content
 
@@ -43,6 +47,7 @@ def call_model_with_messages(state: ThreadState, config: RunnableConfig) -> dict
                 )
             )
         finally:
+            new_loop.run_until_complete(close_connection_pool())
             new_loop.close()
             asyncio.set_event_loop(None)
 
@@ -58,11 +63,13 @@ def call_model_with_messages(state: ThreadState, config: RunnableConfig) -> dict
     except RuntimeError:
         # No event loop running, safe to use asyncio.run()
         model = asyncio.run(
-            provision_langchain_model(
-                str(payload),
-                model_id,
-                "chat",
-                max_tokens=8192,
+            run_and_close_pool(
+                provision_langchain_model(
+                    str(payload),
+                    model_id,
+                    "chat",
+                    max_tokens=8192,
+                )
             )
         )
 
@@ -83,7 +83,7 @@ async def save_source(state: SourceState) -> dict:
     content_state = state["content_state"]
 
     # Get existing source using the provided source_id
-    source = await Source.get(state["source_id"])
+    source = await Source.get(state["source_id"], cached=False)
     if not source:
         raise ValueError(f"Source with ID {state['source_id']} not found")
 
@@ -102,7 +102,8 @@ async def save_source(state: SourceState) -> dict:
 
     if state["embed"]:
         logger.debug("Embedding content for vector search")
-        await source.vectorize()
+        # Re-processed sources keep the embeddings of unchanged chunks
+        await source.vectorize(incremental=True)
 
     return {"source": source}
 
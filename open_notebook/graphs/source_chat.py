@@ -12,6 +12,10 @@ from typing_extensions import TypedDict
 
 from open_notebook.ai.provision import provision_langchain_model
 from open_notebook.config import LANGGRAPH_CHECKPOINT_FILE
+from open_notebook.database.repository import (
+    close_connection_pool,
+    run_and_close_pool,
+)
 from open_notebook.domain.notebook import Source, SourceInsight
 from open_notebook.utils import clean_thinking_content
 from open_notebook.utils.context_builder import ContextBuilder
@@ -57,6 +61,7 @@ def call_model_with_source_context(
             )
             return new_loop.run_until_complete(context_builder.build())
         finally:
+            new_loop.run_until_complete(close_connection_pool())
             new_loop.close()
             asyncio.set_event_loop(None)
 
@@ -131,6 +136,7 @@ def call_model_with_source_context(
                 )
             )
         finally:
+            new_loop.run_until_complete(close_connection_pool())
             new_loop.close()
             asyncio.set_event_loop(None)
 
@@ -146,12 +152,14 @@ def call_model_with_source_context(
     except RuntimeError:
         # No event loop running, safe to use asyncio.run()
         model = asyncio.run(
-            provision_langchain_model(
-                str(payload),
-                config.get("configurable", {}).get("model_id")
-                or state.get("model_override"),
-                "chat",
-                max_tokens=8192,
+            run_and_close_pool(
+                provision_langchain_model(
+                    str(payload),
+                    config.get("configurable", {}).get("model_id")
+                    or state.get("model_override"),
+                    "chat",
+                    max_tokens=8192,
+                )
             )
         )
 
@@ -20,12 +20,15 @@ from .chunking import (
 from .embedding import (
     generate_embedding,
     generate_embeddings,
+    generate_query_embedding,
+    generate_query_embeddings,
     mean_pool_embeddings,
 )
 from .encryption import (
     decrypt_value,
     encrypt_value,
 )
+from .search_results import collapse_results, extract_snippet
 from .text_utils import (
     clean_thinking_content,
     parse_thinking_content,
@@ -50,7 +53,12 @@ __all__ = [
     # Embedding
     "generate_embedding",
     "generate_embeddings",
+    "generate_query_embedding",
+    "generate_query_embeddings",
     "mean_pool_embeddings",
+    # Search results
+    "collapse_results",
+    "extract_snippet",
     # Text utils
     "remove_non_ascii",
     "remove_non_printable",
@@ -7,6 +7,7 @@ Supports HTML, Markdown, and plain text with appropriate splitters for each type
 Key functions:
 - detect_content_type(): Detects content type from file extension or content heuristics
 - chunk_text(): Splits text into chunks using appropriate splitter for content type
+- find_segment_boundary(): Where to cut a piece of a long text before chunking it
 
 Environment Variables:
     OPEN_NOTEBOOK_CHUNK_SIZE: Maximum chunk size in characters (default: 1200)
@@ -443,3 +444,20 @@ def chunk_text(
 
     logger.debug(f"Created {len(chunks)} chunks from {len(text)} characters")
     return chunks
+
+
+def find_segment_boundary(text: str) -> int:
+    """
+    Where to cut a piece of a longer text so that it can be chunked alone.
+
+    Streaming callers chunk huge texts one segment at a time and carry the
+    rest over to the next segment. Cutting at the last paragraph break (or
+    line break, or space) in the second half of `text` keeps chunks from
+    straddling an arbitrary cut; without any, the whole text is used.
+    """
+    half = len(text) // 2
+    for separator in ("\n\n", "\n", " "):
+        idx = text.rfind(separator, half)
+        if idx != -1:
+            return idx + len(separator)
+    return len(text)
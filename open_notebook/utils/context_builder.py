@@ -140,7 +140,10 @@ class ContextBuilder:
             raise DatabaseOperationError(f"Failed to build context: {str(e)}")
 
     async def _add_source_context(
-        self, source_id: str, inclusion_level: str = "insights"
+        self,
+        source_id: str,
+        inclusion_level: str = "insights",
+        source: Optional[Source] = None,
     ) -> None:
         """
         Add source and its insights to context.
@@ -148,17 +151,16 @@ class ContextBuilder:
         Args:
             source_id: ID of the source
             inclusion_level: "insights", "full content", or "not in"
+            source: Already loaded source, to skip fetching it again
         """
         if inclusion_level == "not in":
             return
 
         try:
-            # Ensure source ID has table prefix
-            full_source_id = (
-                source_id if source_id.startswith("source:") else f"source:{source_id}"
-            )
+            full_source_id = self._full_source_id(source_id)
 
-            source = await Source.get(full_source_id)
+            if source is None:
+                source = await Source.get(full_source_id)
             if not source:
                 logger.warning(f"Source {source_id} not found")
                 return
@@ -207,6 +209,11 @@ class ContextBuilder:
             logger.error(f"Error adding source context for {source_id}: {str(e)}")
             raise
 
+    @staticmethod
+    def _full_source_id(source_id: str) -> str:
+        """Ensure source ID has table prefix."""
+        return source_id if source_id.startswith("source:") else f"source:{source_id}"
+
     async def _add_notebook_context(self, notebook_id: str) -> None:
         """
         Add notebook content based on context configuration.
@@ -222,14 +229,31 @@ class ContextBuilder:
             # Process sources from context config or get all
             config_sources = self.context_config.sources
             if config_sources:
-                for source_id, status in config_sources.items():
-                    await self._add_source_context(source_id, status)
+                source_levels = {
+                    self._full_source_id(source_id): status
+                    for source_id, status in config_sources.items()
+                }
             else:
                 # Default: get all sources with insights
-                sources = await notebook.get_sources()
-                for source in sources:
-                    if source.id:
-                        await self._add_source_context(source.id, "insights")
+                source_levels = {
+                    source.id: "insights"
+                    for source in await notebook.get_sources()
+                    if source.id
+                }
+
+            # Load every included source in one round trip
+            loaded = await Source.get_many(
+                [
+                    source_id
+                    for source_id, status in source_levels.items()
+                    if status != "not in"
+                ]
+            )
+            sources_by_id = {source.id: source for source in loaded}
+            for source_id, status in source_levels.items():
+                await self._add_source_context(
+                    source_id, status, source=sources_by_id.get(source_id)
+                )
 
             # Process notes from context config or get all
             if self.include_notes:
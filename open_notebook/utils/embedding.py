@@ -3,19 +3,32 @@ Unified embedding utilities for Open Notebook.
 
 Provides centralized embedding generation with support for:
 - Single text embedding (with automatic chunking and mean pooling for large texts)
-- Batch text embedding (multiple texts in a single API call)
+- Batch text embedding (multiple texts per API call, in adaptive sub-batches)
 - Mean pooling for combining multiple embeddings into one
+- Cached embeddings for search queries
+- Stored embeddings of previously embedded text (see embedding_store.py)
 
 All embedding operations in the application should use these functions
 to ensure consistent behavior and proper handling of large content.
 """
 
-from typing import TYPE_CHECKING, List, Optional
+from functools import partial
+from typing import TYPE_CHECKING, Dict, List, Optional
 
 import numpy as np
 from loguru import logger
 
+from open_notebook.ai.rate_scheduler import INTERACTIVE, model_priority
+
 from .chunking import CHUNK_SIZE, ContentType, chunk_text
+from .embedding_batches import OnBatch, embed_in_batches
+from .embedding_cache import get_query_embedding_cache, normalize_query_text
+from .embedding_store import (
+    embedding_model_key,
+    get_cached_embeddings,
+    get_embedding_cache_enabled,
+    store_embeddings,
+)
 
 # Lazy import to avoid circular dependency:
 # utils -> embedding -> models -> key_provider -> provider_config -> utils
@@ -80,17 +93,24 @@ async def mean_pool_embeddings(embeddings: List[List[float]]) -> List[float]:
 
 
 async def generate_embeddings(
-    texts: List[str], command_id: Optional[str] = None
+    texts: List[str], command_id: Optional[str] = None, cache: bool = True
 ) -> List[List[float]]:
     """
-    Generate embeddings for multiple texts in a single API call.
+    Generate embeddings for multiple texts in as few API calls as possible.
 
     This is more efficient than calling generate_embedding() multiple times
-    when you have multiple texts to embed (e.g., source chunks).
+    when you have multiple texts to embed (e.g., source chunks). Texts beyond
+    the provider's request limits are embedded in concurrent sub-batches,
+    and only a failed sub-batch is retried (see embedding_batches.py).
+
+    With `cache` (and EMBEDDING_CACHE_ENABLED), texts this model embedded
+    before are read from the embedding cache table and only the others are
+    sent to the provider, each distinct text once.
 
     Args:
         texts: List of text strings to embed
         command_id: Optional command ID for error logging context
+        cache: Reuse and store embeddings in the persistent embedding cache
 
     Returns:
         List of embedding vectors, one per input text
@@ -113,19 +133,36 @@ async def generate_embeddings(
 
     model_name = getattr(embedding_model, "model_name", "unknown")
 
+    cached: Dict[str, List[float]] = {}
+    missing = texts
+    store: Optional[OnBatch] = None
+    if cache and get_embedding_cache_enabled():
+        model_key = embedding_model_key(embedding_model)
+        cached = await get_cached_embeddings(model_key, texts)
+        missing = list(dict.fromkeys(t for t in texts if t not in cached))
+        if cached:
+            logger.debug(
+                f"Reusing {len(cached)} cached embeddings, "
+                f"embedding {len(missing)} new texts"
+            )
+        if not missing:
+            return [cached[text] for text in texts]
+
+        async def store(batch: List[str], embeddings: List[List[float]]) -> None:
+            # Per sub-batch, so a retry of the whole call reuses finished ones
+            await store_embeddings(model_key, dict(zip(batch, embeddings)))
+
     # Log text sizes for debugging
-    text_sizes = [len(t) for t in texts]
+    text_sizes = [len(t) for t in missing]
     logger.debug(
-        f"Generating embeddings for {len(texts)} texts "
+        f"Generating embeddings for {len(missing)} texts "
         f"(sizes: min={min(text_sizes)}, max={max(text_sizes)}, "
         f"total={sum(text_sizes)} chars)"
     )
 
     try:
-        # Single API call for all texts
-        embeddings = await embedding_model.aembed(texts)
+        embeddings = await embed_in_batches(embedding_model, missing, store)
         logger.debug(f"Generated {len(embeddings)} embeddings")
-        return embeddings
     except Exception as e:
         # Log at debug level - the calling command will log at appropriate level
         # based on whether retries are exhausted
@@ -139,12 +176,18 @@ async def generate_embeddings(
             f"Failed to generate embeddings using model '{model_name}': {e}"
         ) from e
 
+    if missing is texts:
+        return embeddings
+    cached.update(zip(missing, embeddings))
+    return [cached[text] for text in texts]
+
 
 async def generate_embedding(
     text: str,
     content_type: Optional[ContentType] = None,
     file_path: Optional[str] = None,
     command_id: Optional[str] = None,
+    cache: bool = True,
 ) -> List[float]:
     """
     Generate a single embedding for text, handling large content via chunking and mean pooling.
@@ -162,6 +205,7 @@ async def generate_embedding(
         content_type: Optional explicit content type for chunking
         file_path: Optional file path for content type detection
         command_id: Optional command ID for error logging context
+        cache: Reuse and store embeddings in the persistent embedding cache
 
     Returns:
         Single embedding vector (list of floats)
@@ -179,7 +223,9 @@ async def generate_embedding(
     if len(text) <= CHUNK_SIZE:
         # Short text - embed directly
         logger.debug(f"Embedding short text ({len(text)} chars) directly")
-        embeddings = await generate_embeddings([text], command_id=command_id)
+        embeddings = await generate_embeddings(
+            [text], command_id=command_id, cache=cache
+        )
         return embeddings[0]
 
     # Long text - chunk and mean pool
@@ -192,16 +238,117 @@ async def generate_embedding(
 
     if len(chunks) == 1:
         # Single chunk after splitting
-        embeddings = await generate_embeddings(chunks, command_id=command_id)
+        embeddings = await generate_embeddings(
+            chunks, command_id=command_id, cache=cache
+        )
         return embeddings[0]
 
     logger.debug(f"Embedding {len(chunks)} chunks and mean pooling")
 
     # Embed all chunks in single API call
-    embeddings = await generate_embeddings(chunks, command_id=command_id)
+    embeddings = await generate_embeddings(chunks, command_id=command_id, cache=cache)
 
     # Mean pool to get single embedding
     pooled = await mean_pool_embeddings(embeddings)
 
     logger.debug(f"Mean pooled {len(embeddings)} embeddings into single vector")
     return pooled
+
+
+async def generate_query_embedding(text: str) -> List[float]:
+    """
+    Generate the embedding of a search query, reusing cached embeddings.
+
+    Queries are cached per default embedding model (see embedding_cache.py),
+    so repeated searches skip the embedding provider. They are not kept in
+    the persistent embedding cache.
+
+    Args:
+        text: The search query
+
+    Returns:
+        Single embedding vector (list of floats)
+
+    Raises:
+        ValueError: If text is empty or no embedding model configured
+        RuntimeError: If embedding generation fails
+    """
+    if not text or not text.strip():
+        raise ValueError("Cannot generate embedding for empty text")
+
+    # Lazy import to avoid circular dependency
+    from open_notebook.ai.models import model_manager
+
+    defaults = await model_manager.get_defaults()
+    model_id = defaults.default_embedding_model
+    if not model_id:
+        raise ValueError(
+            "No embedding model configured. Please configure one in the Models section."
+        )
+    # Searches are answered while the user waits
+    with model_priority(INTERACTIVE):
+        return await get_query_embedding_cache().get_or_create(
+            model_id, text, partial(generate_embedding, cache=False)
+        )
+
+
+async def generate_query_embeddings(texts: List[str]) -> List[List[float]]:
+    """
+    Generate the embeddings of several search queries at once.
+
+    Cached queries are reused; the remaining ones are embedded in a single
+    API call (queries longer than CHUNK_SIZE are chunked and pooled as in
+    generate_embedding()) and cached.
+
+    Args:
+        texts: The search queries
+
+    Returns:
+        One embedding vector per query, in order
+
+    Raises:
+        ValueError: If a text is empty or no embedding model configured
+        RuntimeError: If embedding generation fails
+    """
+    if any(not text or not text.strip() for text in texts):
+        raise ValueError("Cannot generate embedding for empty text")
+    if not texts:
+        return []
+
+    # Lazy import to avoid circular dependency
+    from open_notebook.ai.models import model_manager
+
+    defaults = await model_manager.get_defaults()
+    model_id = defaults.default_embedding_model
+    if not model_id:
+        raise ValueError(
+            "No embedding model configured. Please configure one in the Models section."
+        )
+    cache = get_query_embedding_cache()
+    cache.use_model(model_id)
+
+    embeddings: Dict[str, List[float]] = {}
+    missing: List[str] = []
+    for text in texts:
+        normalized = normalize_query_text(text)
+        if normalized in embeddings or normalized in missing:
+            continue
+        cached = cache.get(model_id, normalized)
+        if cached is None:
+            missing.append(normalized)
+        else:
+            embeddings[normalized] = cached
+
+    short = [text for text in missing if len(text) <= CHUNK_SIZE]
+    with model_priority(INTERACTIVE):
+        for text, embedding in zip(
+            short, await generate_embeddings(short, cache=False)
+        ):
+            embeddings[text] = embedding
+        for text in missing:
+            if text not in embeddings:
+                embeddings[text] = await generate_embedding(text, cache=False)
+    for text in missing:
+        cache.put(model_id, text, embeddings[text])
+
+    return [embeddings[normalize_query_text(text)] for text in texts]
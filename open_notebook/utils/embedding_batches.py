@@ -0,0 +1,357 @@
+"""
+Adaptive batching of embedding requests.
+
+Embedding a large source in one request fails as a whole when it exceeds the
+provider's request limits, and the embed_source command then retries the
+whole source. embed_in_batches() instead:
+
+- Splits the texts into sub-batches within the provider's texts-per-request
+  and tokens-per-request limits
+- Embeds the sub-batches concurrently, with at most
+  EMBEDDING_MAX_CONCURRENCY requests in flight per provider
+- Backs off exponentially when rate limited (HTTP 429), halving the
+  sub-batch that was rejected; requests rejected as too large are halved
+- Carries the reduced size forward: later sub-batches to the same provider
+  model are no larger than the last rejected one's half, and the size grows
+  back by half every GROW_AFTER_SUCCESSES successful requests
+- Retries only the sub-batch that failed; the others are kept
+- Takes each request's share of the provider's rate budget first (see
+  open_notebook/ai/rate_scheduler.py)
+
+Errors are classified by their HTTP status code; the message is only scanned
+when the provider raised a plain exception without one. Other errors
+(authentication, invalid input) fail immediately.
+
+Environment Variables:
+    EMBEDDING_MAX_CONCURRENCY: Embedding requests in flight per provider (default: 4)
+    EMBEDDING_BATCH_MAX_ITEMS: Texts per request; 0 uses the provider limit (default: 0)
+    EMBEDDING_BATCH_MAX_TOKENS: Tokens per request; 0 uses the provider limit (default: 0)
+    EMBEDDING_MAX_ATTEMPTS: Attempts per sub-batch on rate limits and transient errors (default: 6)
+"""
+
+import asyncio
+import random
+import re
+import threading
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from weakref import WeakKeyDictionary
+
+from loguru import logger
+
+from open_notebook.ai.rate_scheduler import current_priority, model_rate_bucket
+from open_notebook.config import get_env_number
+
+# Texts per request for providers whose model does not declare a limit
+DEFAULT_MAX_ITEMS = 256
+
+# Tokens per request, for providers that limit them
+PROVIDER_MAX_TOKENS = {
+    "openai": 300_000,
+    "azure": 300_000,
+    "openai-compatible": 300_000,
+    "openrouter": 300_000,
+    "voyage": 120_000,
+    "vertex": 20_000,
+    "mistral": 16_384,
+}
+
+# Successful requests after which the adaptive batch size grows by half
+GROW_AFTER_SUCCESSES = 4
+
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+RATE_LIMIT_STATUSES = {429}
+TOO_LARGE_STATUSES = {413}
+# 400 and 422 are also used for inputs over the context length
+INVALID_REQUEST_STATUSES = {400, 422}
+TRANSIENT_STATUSES = {408, 409}
+
+# Only for errors without a status code. Status codes are matched as whole
+# numbers, so "1500 tokens" is not a server error.
+RATE_LIMIT_PATTERN = re.compile(r"\b429\b|too many requests|rate[ _]limit")
+TOO_LARGE_PATTERN = re.compile(
+    r"\b413\b|too large|too many tokens|too many inputs|maximum context length"
+    r"|max_tokens_per_request|batch size"
+)
+TRANSIENT_PATTERN = re.compile(
+    r"\b(?:408|5\d\d)\b|timeout|timed out|overloaded|temporarily|connection"
+)
+
+OnBatch = Callable[[List[str], List[List[float]]], Awaitable[None]]
+
+
+def get_embedding_max_concurrency() -> int:
+    return int(get_env_number("EMBEDDING_MAX_CONCURRENCY", 4, 1))
+
+
+def get_embedding_max_attempts() -> int:
+    return int(get_env_number("EMBEDDING_MAX_ATTEMPTS", 6, 1))
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Upper estimate of the tokens in `text`, without loading a tokenizer.
+
+    Requests a provider still rejects as too large are split further.
+    """
+    return len(text.encode("utf-8")) // 3 + 1
+
+
+def get_batch_limits(embedding_model: Any) -> Tuple[int, Optional[int]]:
+    """Texts and tokens (None: unlimited) per request for the model."""
+    max_items = int(get_env_number("EMBEDDING_BATCH_MAX_ITEMS", 0, 0))
+    if not max_items:
+        # Esperanto models declare their provider's limit
+        declared = getattr(embedding_model, "MAX_BATCH_SIZE", 0)
+        max_items = declared if isinstance(declared, int) and declared > 0 else 0
+    max_tokens = int(get_env_number("EMBEDDING_BATCH_MAX_TOKENS", 0, 0))
+    if not max_tokens:
+        provider = getattr(embedding_model, "provider", None)
+        max_tokens = PROVIDER_MAX_TOKENS.get(provider, 0) if provider else 0
+    return max_items or DEFAULT_MAX_ITEMS, max_tokens or None
+
+
+def split_batches(
+    texts: Sequence[str], max_items: int, max_tokens: Optional[int] = None
+) -> List[Tuple[int, List[str]]]:
+    """Consecutive (offset, texts) batches within the item and token limits."""
+    batches: List[Tuple[int, List[str]]] = []
+    start, tokens = 0, 0
+    for idx, text in enumerate(texts):
+        text_tokens = estimate_tokens(text)
+        full = idx - start >= max_items or (
+            max_tokens is not None and idx > start and tokens + text_tokens > max_tokens
+        )
+        if full:
+            batches.append((start, list(texts[start:idx])))
+            start, tokens = idx, 0
+        tokens += text_tokens
+    if start < len(texts):
+        batches.append((start, list(texts[start:])))
+    return batches
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(error: BaseException) -> str:
+    """'rate_limit', 'too_large', 'transient' or 'permanent'."""
+    status = _status_code(error)
+    if status is not None:
+        if status in RATE_LIMIT_STATUSES:
+            return "rate_limit"
+        if status in TOO_LARGE_STATUSES:
+            return "too_large"
+        if status in TRANSIENT_STATUSES or status >= 500:
+            return "transient"
+        if status in INVALID_REQUEST_STATUSES and TOO_LARGE_PATTERN.search(
+            str(error).lower()
+        ):
+            return "too_large"
+        return "permanent"
+
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return "transient"
+    message = str(error).lower()
+    if RATE_LIMIT_PATTERN.search(message):
+        return "rate_limit"
+    if TOO_LARGE_PATTERN.search(message):
+        return "too_large"
+    if TRANSIENT_PATTERN.search(message):
+        return "transient"
+    return "permanent"
+
+
+def backoff_delay(attempt: int, error: Optional[BaseException] = None) -> float:
+    """Seconds to wait before retry `attempt` (0-based), honoring Retry-After."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        retry_after = float(headers.get("retry-after", ""))
+    except (AttributeError, TypeError, ValueError):
+        retry_after = 0.0
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt)
+    return max(retry_after, delay * random.uniform(0.5, 1.0))
+
+
+ProviderSemaphores = Dict[str, asyncio.Semaphore]
+
+_semaphores_lock = threading.Lock()
+# Embedding jobs run on several event loops (API, worker, graph threads)
+_semaphores: "WeakKeyDictionary[asyncio.AbstractEventLoop, ProviderSemaphores]" = (
+    WeakKeyDictionary()
+)
+
+
+def provider_semaphore(provider: str) -> asyncio.Semaphore:
+    """Bounds the concurrent embedding requests to `provider` on this loop."""
+    loop = asyncio.get_running_loop()
+    with _semaphores_lock:
+        semaphores = _semaphores.setdefault(loop, {})
+        if provider not in semaphores:
+            semaphores[provider] = asyncio.Semaphore(get_embedding_max_concurrency())
+        return semaphores[provider]
+
+
+class AdaptiveBatchSize:
+    """Texts per request for one provider model, learned from rejections."""
+
+    def __init__(self, max_items: int) -> None:
+        self.max_items = max_items
+        self.current = max_items
+        self._successes = 0
+        self._lock = threading.Lock()
+
+    def shrink(self, size: int) -> None:
+        with self._lock:
+            if size < self.current:
+                self.current = max(size, 1)
+            self._successes = 0
+
+    def grow(self) -> None:
+        with self._lock:
+            self._successes += 1
+            if self._successes >= GROW_AFTER_SUCCESSES:
+                self._successes = 0
+                self.current = min(
+                    self.max_items, self.current + max(self.current // 2, 1)
+                )
+
+
+_batch_sizes_lock = threading.Lock()
+_batch_sizes: Dict[str, AdaptiveBatchSize] = {}
+
+
+def adaptive_batch_size(embedding_model: Any, max_items: int) -> AdaptiveBatchSize:
+    """The batch size shared by every embedding call to the same model."""
+    provider = getattr(embedding_model, "provider", None) or "unknown"
+    key = f"{provider}/{getattr(embedding_model, 'model_name', None) or ''}"
+    with _batch_sizes_lock:
+        batch_size = _batch_sizes.get(key)
+        if batch_size is None or batch_size.max_items != max_items:
+            batch_size = _batch_sizes[key] = AdaptiveBatchSize(max_items)
+        return batch_size
+
+
+async def _gather_or_cancel(coroutines: List[Coroutine[Any, Any, None]]) -> None:
+    """Run concurrently; on the first failure, cancel the rest and raise it."""
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def embed_in_batches(
+    embedding_model: Any, texts: List[str], on_batch: Optional[OnBatch] = None
+) -> List[List[float]]:
+    """
+    Embed `texts` in concurrent sub-batches; see the module docstring.
+
+    `on_batch` is awaited with the texts and embeddings of each sub-batch as
+    it completes, so work survives a later sub-batch failing for good.
+    """
+    if not texts:
+        return []
+    provider = str(getattr(embedding_model, "provider", None) or "unknown")
+    max_items, max_tokens = get_batch_limits(embedding_model)
+    batch_size = adaptive_batch_size(embedding_model, max_items)
+    batches = split_batches(texts, batch_size.current, max_tokens)
+    semaphore = provider_semaphore(provider)
+    bucket = model_rate_bucket(embedding_model)
+    priority = current_priority()
+    max_attempts = get_embedding_max_attempts()
+    results: List[Optional[List[float]]] = [None] * len(texts)
+
+    async def embed_batch(offset: int, batch: List[str], attempt: int) -> None:
+        size = batch_size.current
+        if len(batch) > size:
+            # A request to this model was rejected since the batch was made
+            await _gather_or_cancel(
+                [
+                    embed_batch(offset + start, batch[start : start + size], attempt)
+                    for start in range(0, len(batch), size)
+                ]
+            )
+            return
+        if bucket is not None:
+            # Waiting past the deadline fails the whole call, not one attempt
+            tokens = sum(estimate_tokens(text) for text in batch)
+            await bucket.aacquire(tokens, priority)
+        try:
+            async with semaphore:
+                # The size may have shrunk while this batch waited for a slot
+                shrunk = len(batch) > batch_size.current
+                if not shrunk:
+                    embeddings = await embedding_model.aembed(batch)
+        except Exception as e:
+            kind = classify_error(e)
+            splittable = len(batch) > 1 and kind in ("rate_limit", "too_large")
+            if splittable:
+                # Both halves below must fit
+                batch_size.shrink((len(batch) + 1) // 2)
+            if kind == "permanent" or attempt + 1 >= max_attempts:
+                raise
+            if kind == "too_large" and not splittable:
+                raise
+            if kind != "too_large":
+                delay = backoff_delay(attempt, e)
+                logger.debug(
+                    f"Embedding {len(batch)} texts with {provider} failed ({kind}), "
+                    f"retrying in {delay:.1f}s: {e}"
+                )
+                await asyncio.sleep(delay)
+            if splittable:
+                half = len(batch) // 2
+                await _gather_or_cancel(
+                    [
+                        embed_batch(offset, batch[:half], attempt + 1),
+                        embed_batch(offset + half, batch[half:], attempt + 1),
+                    ]
+                )
+            else:
+                await embed_batch(offset, batch, attempt + 1)
+            return
+        if shrunk:
+            await embed_batch(offset, batch, attempt)
+            return
+
+        batch_size.grow()
+        if len(embeddings) != len(batch):
+            raise RuntimeError(
+                f"Provider {provider} returned {len(embeddings)} embeddings "
+                f"for {len(batch)} texts"
+            )
+        results[offset : offset + len(batch)] = embeddings
+        if on_batch is not None:
+            await on_batch(batch, embeddings)
+
+    if len(batches) > 1:
+        logger.debug(
+            f"Embedding {len(texts)} texts in {len(batches)} batches "
+            f"(max {max_items} texts, {max_tokens or 'unlimited'} tokens each)"
+        )
+    await _gather_or_cancel(
+        [embed_batch(offset, batch, 0) for offset, batch in batches]
+    )
+    return results  # type: ignore[return-value]
@@ -0,0 +1,184 @@
+"""
+In-process cache of search query embeddings.
+
+Every semantic search embeds its query with the default embedding model,
+which costs a provider round trip. Queries repeat often: the UI re-runs
+searches, and the ask graph fans one question out into several searches. The
+cache keys embeddings by (embedding model id, normalized query text) so
+repeated queries skip the provider entirely.
+
+- Entries expire after a TTL and the cache is bounded (LRU eviction)
+- Switching the default embedding model clears the cache, since vectors from
+  different models are not comparable
+- Concurrent requests for the same uncached query share one provider call
+
+Environment Variables:
+    QUERY_EMBEDDING_CACHE_SIZE: Maximum cached queries; 0 disables (default: 1024)
+    QUERY_EMBEDDING_CACHE_TTL: Seconds a cached embedding is reused (default: 3600)
+"""
+
+import asyncio
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+from loguru import logger
+
+from open_notebook.config import get_env_number
+
+CacheKey = Tuple[str, str]
+# Provider calls in progress, per event loop
+Inflight = Dict[CacheKey, "asyncio.Future[Tuple[float, ...]]"]
+
+
+def normalize_query_text(text: str) -> str:
+    """Unicode-normalize the text and collapse whitespace; case is kept."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class QueryEmbeddingCache:
+    """Thread-safe TTL/LRU cache of query embeddings."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Tuple[float, ...]]]" = (
+            OrderedDict()
+        )
+        self._model_id: Optional[str] = None
+        # Searches run on several event loops (API, graph threads)
+        self._lock = threading.Lock()
+        self._inflight: "WeakKeyDictionary[asyncio.AbstractEventLoop, Inflight]" = (
+            WeakKeyDictionary()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def use_model(self, model_id: str) -> None:
+        """Clear the cache if the default embedding model changed."""
+        with self._lock:
+            if self._model_id is not None and model_id != self._model_id:
+                logger.info(
+                    f"Embedding model changed to {model_id}, "
+                    "clearing query embedding cache"
+                )
+                self._entries.clear()
+            self._model_id = model_id
+
+    def get(self, model_id: str, text: str) -> Optional[List[float]]:
+        if not self.enabled:
+            return None
+        key = (model_id, normalize_query_text(text))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+
+    def put(self, model_id: str, text: str, embedding: List[float]) -> None:
+        if not self.enabled:
+            return
+        key = (model_id, normalize_query_text(text))
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, tuple(embedding))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get_or_create(
+        self,
+        model_id: str,
+        text: str,
+        create: Callable[[str], Awaitable[List[float]]],
+    ) -> List[float]:
+        """
+        Return the cached embedding of `text`, or embed it with `create`.
+
+        `create` receives the normalized text. Concurrent callers on the same
+        event loop asking for the same text wait for a single `create` call.
+        """
+        self.use_model(model_id)
+        cached = self.get(model_id, text)
+        if cached is not None:
+            return cached
+
+        key = (model_id, normalize_query_text(text))
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            inflight = self._inflight.setdefault(loop, {})
+            future = inflight.get(key)
+            owner = future is None
+            if owner:
+                future = inflight[key] = loop.create_future()
+        if not owner:
+            try:
+                return list(await asyncio.shield(future))
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The caller that was embedding this text was cancelled
+                return await self.get_or_create(model_id, text, create)
+
+        try:
+            embedding = await create(key[1])
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters may have gone away; avoid "never retrieved" noise
+            future.exception()
+            raise
+        else:
+            self.put(model_id, text, embedding)
+            future.set_result(tuple(embedding))
+            return embedding
+        finally:
+            with self._lock:
+                inflight.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_entries": self.max_entries,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def get_query_embedding_cache_size() -> int:
+    return int(get_env_number("QUERY_EMBEDDING_CACHE_SIZE", 1024, 0))
+
+
+def get_query_embedding_cache_ttl() -> float:
+    return get_env_number("QUERY_EMBEDDING_CACHE_TTL", 3600, 0)
+
+
+_query_embedding_cache: Optional[QueryEmbeddingCache] = None
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    """Get the process-wide query embedding cache."""
+    global _query_embedding_cache
+    if _query_embedding_cache is None:
+        _query_embedding_cache = QueryEmbeddingCache(
+            max_entries=get_query_embedding_cache_size(),
+            ttl=get_query_embedding_cache_ttl(),
+        )
+    return _query_embedding_cache
@@ -0,0 +1,149 @@
+"""
+Coalescing of concurrent single-text embedding requests.
+
+Every saved note and every generated insight runs its own embedding command,
+and each used to make one provider call for one text. The worker runs
+several commands at once on one event loop, so the batcher holds each
+request for a moment and embeds whatever arrived together in a single
+generate_embeddings() call (with its cache and adaptive batching), then
+hands each caller its vector.
+
+- A batch is sent when it reaches EMBEDDING_MICROBATCH_MAX_ITEMS texts, or
+  EMBEDDING_MICROBATCH_WAIT_MS after its first text arrived
+- Texts longer than CHUNK_SIZE are chunked and pooled by generate_embedding()
+  as before, without waiting
+- A failed batch fails every caller in it; their commands retry as usual
+
+Batches can only be as large as the number of commands running at once
+(the worker's --max-tasks).
+
+Environment Variables:
+    EMBEDDING_MICROBATCH_MAX_ITEMS: Texts per coalesced request (default: 64)
+    EMBEDDING_MICROBATCH_WAIT_MS: Milliseconds a request waits for others; 0 disables (default: 25)
+"""
+
+import asyncio
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+from weakref import WeakKeyDictionary
+
+from loguru import logger
+
+from open_notebook.config import get_env_number
+
+from .chunking import CHUNK_SIZE, ContentType
+from .embedding import generate_embedding, generate_embeddings
+
+Pending = Tuple[str, "asyncio.Future[List[float]]"]
+
+
+def get_microbatch_max_items() -> int:
+    return int(get_env_number("EMBEDDING_MICROBATCH_MAX_ITEMS", 64, 1))
+
+
+def get_microbatch_wait() -> float:
+    return get_env_number("EMBEDDING_MICROBATCH_WAIT_MS", 25, 0) / 1000
+
+
+class EmbeddingBatcher:
+    """Collects single texts on one event loop and embeds them in batches."""
+
+    def __init__(self, max_items: int = 64, max_wait: float = 0.025) -> None:
+        self.max_items = max_items
+        self.max_wait = max_wait
+        self._pending: List[Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Keep running flushes referenced until they finish
+        self._flushes: Set["asyncio.Task[None]"] = set()
+        self.batches = 0
+        self.texts = 0
+
+    async def embed(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[List[float]]" = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if pending:
+            task = asyncio.get_running_loop().create_task(self._embed(pending))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _embed(self, pending: List[Pending]) -> None:
+        # Callers that gave up (cancelled commands) are left out
+        waiting = [(text, future) for text, future in pending if not future.done()]
+        if not waiting:
+            return
+        self.batches += 1
+        self.texts += len(waiting)
+        try:
+            embeddings = await generate_embeddings([text for text, _ in waiting])
+        except asyncio.CancelledError:
+            for _, future in waiting:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in waiting:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        logger.debug(f"Embedded {len(waiting)} coalesced texts in one request")
+        for (_, future), embedding in zip(waiting, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "pending": len(self._pending),
+        }
+
+
+_batchers_lock = threading.Lock()
+_batchers: "WeakKeyDictionary[asyncio.AbstractEventLoop, EmbeddingBatcher]" = (
+    WeakKeyDictionary()
+)
+
+
+def get_embedding_batcher() -> EmbeddingBatcher:
+    """The batcher of the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _batchers_lock:
+        batcher = _batchers.get(loop)
+        if batcher is None:
+            batcher = _batchers[loop] = EmbeddingBatcher(
+                get_microbatch_max_items(), get_microbatch_wait()
+            )
+        return batcher
+
+
+async def generate_embedding_batched(
+    text: str,
+    content_type: Optional[ContentType] = None,
+    command_id: Optional[str] = None,
+) -> List[float]:
+    """
+    generate_embedding(), coalesced with concurrent requests on this loop.
+
+    Short texts are embedded together with other pending texts; long ones
+    and all texts when EMBEDDING_MICROBATCH_WAIT_MS is 0 go straight to
+    generate_embedding().
+    """
+    if not text or not text.strip():
+        raise ValueError("Cannot generate embedding for empty text")
+    text = text.strip()
+    if len(text) > CHUNK_SIZE or get_microbatch_wait() <= 0:
+        return await generate_embedding(
+            text, content_type=content_type, command_id=command_id
+        )
+    return await get_embedding_batcher().embed(text)
@@ -0,0 +1,186 @@
+"""
+Persistent, content-addressed cache of text embeddings.
+
+Source embedding jobs replace every chunk embedding of a source on each run:
+retries, /sources/{id}/retry and rebuild_embeddings re-embed text that has
+not changed, and boilerplate shared across sources is embedded once per
+source. The store keeps each embedding in the `embedding_cache` table, keyed
+by a hash of (embedding model, exact text), so generate_embeddings() only
+sends texts the model has never embedded to the provider.
+
+- Keys hash the provider, model name, output dimensions and endpoint, so
+  vectors of different models (or of one model served by different
+  deployments) never mix, and switching models back and forth reuses
+  earlier work
+- The store is best effort: if the database is unavailable, texts are
+  embedded as if nothing was cached
+- The table is capped at EMBEDDING_CACHE_MAX_ENTRIES: at most every
+  EMBEDDING_CACHE_PRUNE_INTERVAL seconds, a write deletes the oldest entries
+  beyond the cap. The table is only counted when the process has stored
+  enough entries since the last count to possibly exceed the cap.
+  `DELETE embedding_cache` (optionally `WHERE model = ...`) reclaims the
+  space at once
+
+Environment Variables:
+    EMBEDDING_CACHE_ENABLED: Reuse stored embeddings of identical text (default: true)
+    EMBEDDING_CACHE_MAX_ENTRIES: Stored embeddings kept; 0 keeps all (default: 500000)
+    EMBEDDING_CACHE_PRUNE_INTERVAL: Seconds between size checks (default: 3600)
+"""
+
+import hashlib
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from loguru import logger
+from surrealdb import RecordID
+
+from open_notebook.config import get_env_number
+from open_notebook.database.repository import repo_query
+
+TABLE = "embedding_cache"
+# Entries deleted per statement when pruning
+PRUNE_BATCH_SIZE = 5000
+
+_pruned_at = 0.0
+# Entries at the last count plus those stored since, an upper bound as far
+# as this process knows; None until the table is first counted
+_approx_entries: Optional[int] = None
+
+
+def get_embedding_cache_enabled() -> bool:
+    return os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in ("true", "1", "yes")
+
+
+def get_embedding_cache_max_entries() -> int:
+    return int(get_env_number("EMBEDDING_CACHE_MAX_ENTRIES", 500_000, 0))
+
+
+def get_embedding_cache_prune_interval() -> float:
+    return get_env_number("EMBEDDING_CACHE_PRUNE_INTERVAL", 3600.0, 0.0)
+
+
+def _model_setting(embedding_model: object, *names: str) -> Any:
+    config = getattr(embedding_model, "_config", None)
+    for name in names:
+        value = getattr(embedding_model, name, None)
+        if value is None and isinstance(config, dict):
+            value = config.get(name)
+        if value:
+            return value
+    return None
+
+
+def embedding_model_key(embedding_model: object) -> str:
+    """
+    Identify an embedding model by what determines its vectors.
+
+    Besides provider and model name, the output dimensions (models that can
+    shorten their vectors) and the endpoint and deployment (a self-hosted or
+    Azure deployment may serve another model under the same name) are part
+    of the key when the model sets them.
+    """
+    provider = getattr(embedding_model, "provider", None) or "unknown"
+    model_name = getattr(embedding_model, "model_name", None) or "unknown"
+    key = f"{provider}/{model_name}"
+    dimensions = _model_setting(embedding_model, "output_dimensions", "dimensions")
+    if dimensions:
+        key += f"@{dimensions}d"
+    endpoint = _model_setting(embedding_model, "azure_endpoint", "base_url")
+    if endpoint:
+        key += f"|{str(endpoint).rstrip('/')}"
+    deployment = _model_setting(embedding_model, "deployment_name")
+    if deployment and deployment != model_name:
+        key += f"|{deployment}"
+    return key
+
+
+def embedding_cache_key(model_key: str, text: str) -> str:
+    return hashlib.sha256(f"{model_key}\n{text}".encode("utf-8")).hexdigest()
+
+
+async def get_cached_embeddings(
+    model_key: str, texts: Sequence[str]
+) -> Dict[str, List[float]]:
+    """Stored embeddings of `texts` by the model, by text; misses are absent."""
+    keys = {embedding_cache_key(model_key, text): text for text in texts}
+    if not keys:
+        return {}
+    try:
+        rows = await repo_query(
+            "SELECT record::id(id) AS key, embedding FROM $ids",
+            {"ids": [RecordID(TABLE, key) for key in keys]},
+        )
+    except Exception as e:
+        logger.warning(f"Embedding cache lookup failed, embedding all texts: {e}")
+        return {}
+    return {keys[row["key"]]: row["embedding"] for row in rows if row["key"] in keys}
+
+
+async def store_embeddings(
+    model_key: str, embeddings: Dict[str, List[float]]
+) -> None:
+    """Store embeddings by text; texts already stored are left alone."""
+    global _approx_entries
+    if not embeddings:
+        return
+    records = [
+        {
+            "id": RecordID(TABLE, embedding_cache_key(model_key, text)),
+            "model": model_key,
+            "embedding": embedding,
+        }
+        for text, embedding in embeddings.items()
+    ]
+    try:
+        await repo_query(
+            "INSERT IGNORE INTO embedding_cache $records RETURN NONE",
+            {"records": records},
+        )
+    except Exception as e:
+        logger.warning(f"Failed to store {len(records)} embeddings in cache: {e}")
+        return
+    if _approx_entries is not None:
+        _approx_entries += len(records)
+    await prune_embedding_cache()
+
+
+async def prune_embedding_cache(force: bool = False) -> int:
+    """
+    Delete the oldest entries beyond EMBEDDING_CACHE_MAX_ENTRIES.
+
+    Runs at most once per EMBEDDING_CACHE_PRUNE_INTERVAL unless `force`d, and
+    skips counting the table while the approximate count is within the cap.
+    Returns the number of entries deleted.
+    """
+    global _pruned_at, _approx_entries
+    max_entries = get_embedding_cache_max_entries()
+    now = time.monotonic()
+    if not max_entries or (
+        not force and now - _pruned_at < get_embedding_cache_prune_interval()
+    ):
+        return 0
+    _pruned_at = now
+    if not force and _approx_entries is not None and _approx_entries <= max_entries:
+        return 0
+
+    deleted = 0
+    try:
+        result = await repo_query(f"SELECT count() FROM {TABLE} GROUP ALL")
+        _approx_entries = result[0]["count"] if result else 0
+        excess = _approx_entries - max_entries
+        while excess > 0:
+            batch = min(excess, PRUNE_BATCH_SIZE)
+            await repo_query(
+                f"DELETE (SELECT id, created FROM {TABLE} "
+                "ORDER BY created LIMIT $limit).id RETURN NONE",
+                {"limit": batch},
+            )
+            deleted += batch
+            excess -= batch
+            _approx_entries -= batch
+    except Exception as e:
+        logger.warning(f"Failed to prune embedding cache: {e}")
+    if deleted:
+        logger.info(f"Pruned {deleted} old entries from the embedding cache")
+    return deleted
@@ -0,0 +1,121 @@
+"""
+Persistent progress of embedding rebuilds.
+
+rebuild_embeddings walks sources, notes and insights in id order, one window
+of records at a time. With the embeddings of each window it saves, in the
+same transaction, a checkpoint in the `embedding_rebuild` table: the table
+and the last record it finished, and running counts. A rebuild that crashed
+or was interrupted by a worker restart therefore continues after the last
+finished window, whether as a retry of the same command or when a rebuild
+of the same scope is started again.
+
+The status endpoint reads the checkpoint of a command to report progress,
+throughput and the estimated time remaining while the rebuild runs.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from pydantic import BaseModel, Field
+from surrealdb import RecordID
+
+from open_notebook.database.repository import (
+    BatchStatement,
+    ensure_record_id,
+    repo_query,
+)
+
+TABLE = "embedding_rebuild"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def rebuild_scope(mode: str, tables: Tuple[str, ...]) -> str:
+    """Identify what a rebuild covers; only rebuilds of one scope resume."""
+    return f"{mode}:{','.join(tables)}"
+
+
+def checkpoint_record_id(command_id: str) -> RecordID:
+    return RecordID(TABLE, command_id)
+
+
+class RebuildCheckpoint(BaseModel):
+    """Progress of one rebuild command."""
+
+    scope: str
+    # running, completed, failed, or resumed (continued by a later command)
+    status: str = "running"
+    phase: Optional[str] = None  # Table being rebuilt
+    cursor: Optional[str] = None  # Last record of `phase` that was finished
+    total: int = 0
+    processed: int = 0  # Records finished, failed ones included
+    sources: int = 0
+    notes: int = 0
+    insights: int = 0
+    failed: int = 0
+    # Start and progress of the current run, for the throughput
+    run_started: datetime = Field(default_factory=_now)
+    run_processed: int = 0
+    updated: datetime = Field(default_factory=_now)
+    error_message: Optional[str] = None
+
+    def throughput(self) -> Tuple[Optional[float], Optional[float]]:
+        """Records per second of the current run, and seconds remaining."""
+        elapsed = (self.updated - self.run_started).total_seconds()
+        if self.run_processed <= 0 or elapsed <= 0:
+            return None, None
+        rate = self.run_processed / elapsed
+        if self.status == "completed":
+            return rate, 0.0
+        return rate, max(self.total - self.processed, 0) / rate
+
+    def statement(self, command_id: str) -> BatchStatement:
+        """Save this checkpoint, to run in the transaction of its window."""
+        self.updated = _now()
+        data: Dict[str, Any] = self.model_dump()
+        data["cursor"] = ensure_record_id(self.cursor) if self.cursor else None
+        return (
+            "UPSERT $checkpoint_id CONTENT $checkpoint RETURN NONE",
+            {"checkpoint_id": checkpoint_record_id(command_id), "checkpoint": data},
+        )
+
+    async def save(self, command_id: str) -> None:
+        query, vars = self.statement(command_id)
+        await repo_query(query, vars)
+
+
+def _parse(row: Dict[str, Any]) -> RebuildCheckpoint:
+    row = {
+        key: value for key, value in row.items() if key not in ("id", "command_id")
+    }
+    if row.get("cursor") is not None:
+        row["cursor"] = str(row["cursor"])
+    return RebuildCheckpoint(**row)
+
+
+async def load_checkpoint(command_id: str) -> Optional[RebuildCheckpoint]:
+    rows = await repo_query(
+        "SELECT * FROM $checkpoint_id",
+        {"checkpoint_id": checkpoint_record_id(command_id)},
+    )
+    return _parse(rows[0]) if rows else None
+
+
+async def find_resumable_checkpoint(
+    scope: str, command_id: str
+) -> Optional[Tuple[str, RebuildCheckpoint]]:
+    """The latest unfinished rebuild of `scope` by another command, by id."""
+    rows = await repo_query(
+        f"""
+        SELECT *, record::id(id) AS command_id FROM {TABLE}
+        WHERE scope = $scope AND status IN ['running', 'failed']
+            AND id != $checkpoint_id
+        ORDER BY updated DESC LIMIT 1
+        """,
+        {"scope": scope, "checkpoint_id": checkpoint_record_id(command_id)},
+    )
+    if not rows:
+        return None
+    return rows[0]["command_id"], _parse(rows[0])
@@ -0,0 +1,189 @@
+"""
+Server-side shaping of search results: collapsing and snippets.
+
+Vector search returns every matching chunk of a source in `matches`, and the
+ask graph pastes them all into its prompts. Before results leave the server:
+
+- Results are collapsed per `parent_id`: at most N chunks per source (or
+  note) are kept across all of its results, best first
+- Each kept chunk is cut down to the window that best matches the query
+  terms, with the offsets of the matched terms in `highlights`
+
+Environment Variables:
+    SEARCH_MAX_CHUNKS_PER_PARENT: Chunks kept per source or note; 0 keeps all (default: 3)
+    SEARCH_SNIPPET_CHARS: Characters per snippet; 0 returns whole chunks (default: 400)
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from open_notebook.config import get_env_number
+
+ELLIPSIS = "…"
+
+# Too common to locate the relevant part of a chunk
+STOPWORDS = frozenset(
+    """
+    a an and are as at be by can do does for from how i in is it of on or
+    that the this to was what when where which who why with
+    """.split()
+)
+
+# (start, end) of a matched term, relative to the snippet text
+Highlight = Tuple[int, int]
+
+
+def get_search_max_chunks_per_parent() -> int:
+    return int(get_env_number("SEARCH_MAX_CHUNKS_PER_PARENT", 3, 0))
+
+
+def get_search_snippet_chars() -> int:
+    return int(get_env_number("SEARCH_SNIPPET_CHARS", 400, 0))
+
+
+def query_terms(query: str) -> List[str]:
+    """Distinct lowercase words of the query, without stopwords."""
+    terms: List[str] = []
+    for word in re.findall(r"\w+", query.lower()):
+        if len(word) > 1 and word not in STOPWORDS and word not in terms:
+            terms.append(word)
+    return terms
+
+
+def _term_pattern(terms: Sequence[str]) -> Optional["re.Pattern[str]"]:
+    if not terms:
+        return None
+    alternatives = "|".join(re.escape(term) for term in sorted(terms, key=len)[::-1])
+    # Whole words, allowing simple inflections ("embedding" finds "embeddings")
+    return re.compile(
+        rf"(?<!\w)({alternatives})(?:s|es|ed|ing)?(?!\w)", re.IGNORECASE
+    )
+
+
+def _best_window(
+    occurrences: List[Tuple[int, int, str]], max_chars: int
+) -> Tuple[int, int, Tuple[int, int]]:
+    """Span of the occurrences in the best window, and its (distinct, total) score."""
+    best = (0, 0, (0, 0))
+    last = 0
+    for first in range(len(occurrences)):
+        start = occurrences[first][0]
+        last = max(last, first)
+        while (
+            last + 1 < len(occurrences)
+            and occurrences[last + 1][1] - start <= max_chars
+        ):
+            last += 1
+        window = occurrences[first : last + 1]
+        score = (len({term for _, _, term in window}), len(window))
+        if score > best[2]:
+            best = (start, window[-1][1], score)
+    return best
+
+
+def extract_snippet(
+    text: str, terms: Sequence[str], max_chars: int = 0
+) -> Tuple[str, List[Highlight], Tuple[int, int]]:
+    """
+    The window of `text` that best matches `terms`.
+
+    Returns the snippet (with an ellipsis where text was cut), the offsets of
+    the matched terms within it, and the (distinct terms, occurrences) score
+    of the window. `max_chars` of 0 keeps the whole text.
+    """
+    pattern = _term_pattern(terms)
+    occurrences = (
+        [(m.start(), m.end(), m.group(1).lower()) for m in pattern.finditer(text)]
+        if pattern
+        else []
+    )
+
+    if not max_chars or len(text) <= max_chars:
+        start, end = 0, len(text)
+        score = (len({term for _, _, term in occurrences}), len(occurrences))
+    else:
+        span_start, span_end, score = (
+            _best_window(occurrences, max_chars) if occurrences else (0, 0, (0, 0))
+        )
+        # Center the matched span, then snap to word boundaries
+        start = max(0, span_start - (max_chars - (span_end - span_start)) // 2)
+        end = min(len(text), start + max_chars)
+        start = max(0, end - max_chars)
+        if start > 0:
+            space = text.find(" ", start, span_start)
+            if space != -1:
+                start = space + 1
+        if end < len(text):
+            space = text.rfind(" ", span_end, end)
+            if space != -1:
+                end = space
+
+    prefix = ELLIPSIS if start > 0 else ""
+    suffix = ELLIPSIS if end < len(text) else ""
+    offset = len(prefix) - start
+    highlights = [
+        (match_start + offset, match_end + offset)
+        for match_start, match_end, _ in occurrences
+        if match_start >= start and match_end <= end
+    ]
+    return prefix + text[start:end] + suffix, highlights, score
+
+
+def collapse_results(
+    results: List[Dict[str, Any]],
+    query: str,
+    max_chunks_per_parent: Optional[int] = None,
+    snippet_chars: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Collapse ranked results per parent and reduce their matches to snippets.
+
+    Results must be ordered best first. A parent (source or note) keeps at
+    most `max_chunks_per_parent` chunks over all its results; results left
+    without any are dropped. The kept `matches` are the chunks that best
+    match the query, each cut to `snippet_chars`, with `highlights` holding
+    the term offsets of each snippet. None uses the environment defaults.
+    """
+    if max_chunks_per_parent is None:
+        max_chunks_per_parent = get_search_max_chunks_per_parent()
+    if snippet_chars is None:
+        snippet_chars = get_search_snippet_chars()
+    terms = query_terms(query)
+
+    used: Dict[str, int] = {}
+    collapsed: List[Dict[str, Any]] = []
+    for result in results:
+        parent = str(result.get("parent_id") or result.get("id"))
+        remaining = (
+            max_chunks_per_parent - used.get(parent, 0)
+            if max_chunks_per_parent
+            else None
+        )
+        if remaining is not None and remaining <= 0:
+            continue
+
+        matches = result.get("matches")
+        if not isinstance(matches, list):
+            used[parent] = used.get(parent, 0) + 1
+            collapsed.append(result)
+            continue
+
+        snippets = [
+            extract_snippet(match, terms, snippet_chars)
+            for match in matches
+            if isinstance(match, str)
+        ]
+        # Stable sort: chunks matching equally keep their similarity order
+        snippets.sort(key=lambda snippet: snippet[2], reverse=True)
+        snippets = snippets[:remaining]
+        used[parent] = used.get(parent, 0) + max(1, len(snippets))
+        collapsed.append(
+            {
+                **result,
+                "matches": [text for text, _, _ in snippets],
+                "highlights": [
+                    [list(span) for span in spans] for _, spans, _ in snippets
+                ],
+            }
+        )
+    return collapsed
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark RecordID decoding of query results against the original decoder.
+
+This script:
+1. Builds result sets shaped like source_embedding rows (long numeric
+   arrays) and source rows (large full_text strings)
+2. Decodes them with parse_record_ids() and with the original fully
+   recursive decoder, best of several runs with garbage collection paused
+3. Reports both timings and the speed-up
+"""
+
+import argparse
+import gc
+import time
+from typing import Any, Callable, Dict, List
+
+from surrealdb import RecordID
+
+from open_notebook.database.repository import parse_record_ids
+
+
+def legacy_parse_record_ids(obj: Any) -> Any:
+    """The original decoder: rebuilds every dict and list it walks."""
+    if isinstance(obj, dict):
+        return {k: legacy_parse_record_ids(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [legacy_parse_record_ids(item) for item in obj]
+    elif isinstance(obj, RecordID):
+        return str(obj)
+    return obj
+
+
+def make_embedding_rows(count: int, dimensions: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": RecordID("source_embedding", idx),
+            "source": RecordID("source", idx % 10),
+            "order": idx,
+            "content": "lorem ipsum " * 100,
+            "embedding": [float(i % 7) / 7 for i in range(dimensions)],
+        }
+        for idx in range(count)
+    ]
+
+
+def make_source_rows(count: int, text_size: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": RecordID("source", idx),
+            "title": f"Source {idx}",
+            "topics": ["a", "b"],
+            "asset": {"file_path": None, "url": "https://example.com"},
+            "command": RecordID("command", idx),
+            "full_text": "x" * text_size,
+        }
+        for idx in range(count)
+    ]
+
+
+def best_of(
+    func: Callable[[Any], Any], make_input: Callable[[], Any], runs: int
+) -> float:
+    timings = []
+    for _ in range(runs):
+        # Decoding mutates rows in place, so every run gets fresh ones
+        data = make_input()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            func(data)
+            timings.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--embedding-rows", type=int, default=1000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--source-rows", type=int, default=200)
+    parser.add_argument("--text-size", type=int, default=2_000_000)
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    cases = {
+        f"{args.embedding_rows} embedding rows": lambda: make_embedding_rows(
+            args.embedding_rows, args.dimension
+        ),
+        f"{args.source_rows} source rows": lambda: make_source_rows(
+            args.source_rows, args.text_size
+        ),
+    }
+    print(f"\n{'result set':<22} {'legacy ms':>10} {'current ms':>11} {'speed-up':>9}")
+    for name, make_input in cases.items():
+        legacy = best_of(legacy_parse_record_ids, make_input, args.runs)
+        current = best_of(parse_record_ids, make_input, args.runs)
+        print(
+            f"{name:<22} {legacy * 1000:>10.2f} {current * 1000:>11.2f} "
+            f"{legacy / current:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
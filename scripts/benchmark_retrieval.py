@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Benchmark ingest, chunking, embedding and search on a synthetic corpus.
+
+This script:
+1. Starts an in-memory SurrealDB and applies all migrations
+2. Generates a synthetic corpus of sources sized to the requested chunk count
+3. Replaces the embedding provider with a deterministic local stand-in, so no
+   network access or API key is needed
+4. Measures chunk_text, repo_insert and embed_source_command throughput, then
+   text_search and vector_search (exact and HNSW) latency percentiles
+
+Run it for each corpus size (e.g. --chunks 10000 100000 1000000) and keep the
+--json output to compare runs. Absolute numbers depend on the machine; compare
+runs made on the same hardware.
+
+Full-text (BM25) indexing of the chunks dominates ingest time and grows with the
+corpus. For the largest corpora, --url surrealkv://<path> keeps the database on
+disk instead of in memory, and --no-text-index drops the full-text indexes to
+measure the embedding and vector search paths alone.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, Tuple
+from unittest.mock import patch
+
+import numpy as np
+from loguru import logger
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from surrealdb import AsyncSurreal  # noqa: E402
+
+from commands.embedding_commands import (  # noqa: E402
+    EmbedSourceInput,
+    embed_source_command,
+)
+from open_notebook.ai.models import model_manager  # noqa: E402
+from open_notebook.database import vector_index  # noqa: E402
+from open_notebook.database.async_migrate import AsyncMigrationManager  # noqa: E402
+from open_notebook.database.repository import repo_insert  # noqa: E402
+from open_notebook.domain.notebook import text_search, vector_search  # noqa: E402
+from open_notebook.utils.chunking import CHUNK_OVERLAP, CHUNK_SIZE  # noqa: E402
+from open_notebook.utils.chunking import chunk_text  # noqa: E402
+from open_notebook.utils.embedding_cache import (  # noqa: E402
+    get_query_embedding_cache,
+)
+
+VOCABULARY_SIZE = 20000
+INSERT_BATCH_ROWS = 100
+# Sources between progress messages while embedding
+PROGRESS_SOURCES = 500
+# Ranks of the vocabulary that queries are drawn from: common enough to match
+# many chunks, rare enough to rank them
+QUERY_WORD_RANKS = (50, 2000)
+
+
+class HashEmbedder:
+    """
+    Deterministic offline embedding model: signed feature hashing of words.
+
+    Texts sharing words get similar vectors, so vector search returns
+    meaningful neighbours while costing only local CPU time.
+    """
+
+    model_name = "benchmark-hash"
+
+    def __init__(self, dimension: int) -> None:
+        self.dimension = dimension
+        self._buckets: Dict[str, Tuple[int, float]] = {}
+
+    def _bucket(self, word: str) -> Tuple[int, float]:
+        bucket = self._buckets.get(word)
+        if bucket is None:
+            digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            bucket = (value % self.dimension, 1.0 if value >> 63 else -1.0)
+            self._buckets[word] = bucket
+        return bucket
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            buckets = [self._bucket(word) for word in text.lower().split()]
+            if buckets:
+                columns, signs = zip(*buckets)
+                np.add.at(vectors[row], list(columns), signs)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.where(norms > 0, norms, 1.0)).tolist()
+
+    async def aembed(self, texts: Sequence[str]) -> List[List[float]]:
+        return self.embed(texts)
+
+
+def make_vocabulary(rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """Synthetic words and their Zipf-like frequencies, most frequent first."""
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    lengths = rng.integers(3, 10, VOCABULARY_SIZE)
+    words = {"".join(rng.choice(letters, length)) for length in lengths}
+    vocabulary = np.array(sorted(words))
+    rng.shuffle(vocabulary)
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    return vocabulary, weights / weights.sum()
+
+
+def make_document(
+    rng: np.random.Generator, vocabulary: np.ndarray, weights: np.ndarray, size: int
+) -> str:
+    """Paragraphs of sentences totalling about `size` characters."""
+    words = rng.choice(vocabulary, size // 6, p=weights)
+    sentences = [
+        " ".join(words[i : i + 12]).capitalize() + "."
+        for i in range(0, len(words), 12)
+    ]
+    return "\n\n".join(
+        " ".join(sentences[i : i + 6]) for i in range(0, len(sentences), 6)
+    )
+
+
+def make_queries(
+    rng: np.random.Generator, vocabulary: np.ndarray, count: int
+) -> List[str]:
+    low, high = QUERY_WORD_RANKS
+    pool = vocabulary[low : min(high, len(vocabulary))]
+    return [" ".join(rng.choice(pool, 2, replace=False)) for _ in range(count)]
+
+
+@asynccontextmanager
+async def embedded_database(url: str, text_index: bool):
+    """Route all repository calls to a fresh embedded SurrealDB."""
+    connection = AsyncSurreal(url)
+    await connection.connect()
+    # A new database per run, in case `url` points at an existing store
+    await connection.use("benchmark", f"run_{time.time_ns()}")
+
+    @asynccontextmanager
+    async def memory_db_connection():
+        yield connection
+
+    try:
+        with (
+            patch(
+                "open_notebook.database.repository.db_connection",
+                memory_db_connection,
+            ),
+            patch(
+                "open_notebook.database.async_migrate.db_connection",
+                memory_db_connection,
+            ),
+        ):
+            await AsyncMigrationManager().run_migration_up()
+            if not text_index:
+                await connection.query(
+                    "REMOVE INDEX idx_source_full_text ON source;"
+                    "REMOVE INDEX idx_source_embed_chunk ON source_embedding;"
+                )
+            yield connection
+            # The embedded engine aborts when closed with HNSW indexes defined
+            await vector_index.drop_vector_indexes()
+            vector_index._forget_index_state()
+    finally:
+        await connection.close()
+
+
+def offline_embeddings(embedder: HashEmbedder):
+    """Serve every embedding request from `embedder`."""
+
+    async def get_embedding_model():
+        return embedder
+
+    async def get_defaults():
+        return SimpleNamespace(default_embedding_model="model:benchmark-hash")
+
+    return (
+        patch.object(model_manager, "get_embedding_model", get_embedding_model),
+        patch.object(model_manager, "get_defaults", get_defaults),
+    )
+
+
+def throughput(count: int, size: int, seconds: float, unit: str) -> Dict[str, float]:
+    return {
+        f"{unit}_per_s": round(count / seconds, 1),
+        "mb_per_s": round(size / 1e6 / seconds, 2),
+        "seconds": round(seconds, 3),
+    }
+
+
+async def latencies(
+    search: Callable[[str], Awaitable[Any]], queries: List[str]
+) -> Dict[str, float]:
+    await search(queries[0])  # warm up
+    timings = []
+    for query in queries:
+        # Measure the search itself, including the (local) query embedding
+        get_query_embedding_cache().clear()
+        start = time.perf_counter()
+        await search(query)
+        timings.append(time.perf_counter() - start)
+    p50, p99 = np.percentile(timings, [50, 99]) * 1000
+    return {"p50_ms": round(float(p50), 2), "p99_ms": round(float(p99), 2)}
+
+
+async def run_benchmark(chunks: int, args: argparse.Namespace) -> Dict[str, Any]:
+    rng = np.random.default_rng(args.seed)
+    vocabulary, weights = make_vocabulary(rng)
+    source_count = max(1, chunks // args.chunks_per_source)
+    document_size = args.chunks_per_source * (CHUNK_SIZE - CHUNK_OVERLAP)
+    logger.info(f"Generating {source_count} sources of ~{document_size} characters")
+    documents = [
+        make_document(rng, vocabulary, weights, document_size)
+        for _ in range(source_count)
+    ]
+    queries = make_queries(rng, vocabulary, args.queries)
+    corpus_bytes = sum(len(document) for document in documents)
+    result: Dict[str, Any] = {"target_chunks": chunks, "sources": source_count}
+
+    start = time.perf_counter()
+    chunk_count = sum(len(chunk_text(document)) for document in documents)
+    result["chunk_text"] = throughput(
+        chunk_count, corpus_bytes, time.perf_counter() - start, "chunks"
+    )
+    result["chunks"] = chunk_count
+
+    embedder = HashEmbedder(args.dimension)
+    patches = offline_embeddings(embedder)
+    async with embedded_database(args.url, args.text_index):
+        with patches[0], patches[1]:
+            rows = [
+                {"title": f"Source {i}", "full_text": document}
+                for i, document in enumerate(documents)
+            ]
+            logger.info(f"Inserting {len(rows)} sources")
+            source_ids = []
+            start = time.perf_counter()
+            for i in range(0, len(rows), INSERT_BATCH_ROWS):
+                inserted = await repo_insert("source", rows[i : i + INSERT_BATCH_ROWS])
+                source_ids.extend(str(row["id"]) for row in inserted)
+            result["repo_insert"] = throughput(
+                len(rows), corpus_bytes, time.perf_counter() - start, "rows"
+            )
+
+            logger.info(f"Embedding {source_count} sources ({chunk_count} chunks)")
+            start = time.perf_counter()
+            for done, source_id in enumerate(source_ids, start=1):
+                output = await embed_source_command(
+                    EmbedSourceInput(source_id=source_id)
+                )
+                if not output.success:
+                    raise RuntimeError(output.error_message)
+                if done % PROGRESS_SOURCES == 0:
+                    logger.info(f"Embedded {done}/{source_count} sources")
+            result["embed_source_command"] = throughput(
+                chunk_count, corpus_bytes, time.perf_counter() - start, "chunks"
+            )
+
+            logger.info(f"Running {len(queries)} queries per search")
+            if args.text_index:
+                result["text_search"] = await latencies(
+                    lambda q: text_search(q, 10), queries
+                )
+            result["vector_search_exact"] = await latencies(
+                lambda q: vector_search(q, 10, minimum_score=0.0, exact=True), queries
+            )
+            dimension = await vector_index.infer_embedding_dimension()
+            if dimension and await vector_index.wait_for_vector_indexes(dimension):
+                result["vector_search_hnsw"] = await latencies(
+                    lambda q: vector_search(q, 10, minimum_score=0.0), queries
+                )
+    return result
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    print()
+    print(
+        f"{'chunks':>9} {'measurement':<22} {'throughput':>22} "
+        f"{'p50 ms':>9} {'p99 ms':>9}"
+    )
+    for result in results:
+        for name in (
+            "chunk_text",
+            "repo_insert",
+            "embed_source_command",
+            "text_search",
+            "vector_search_exact",
+            "vector_search_hnsw",
+        ):
+            measured = result.get(name)
+            if measured is None:
+                continue
+            if "p50_ms" in measured:
+                rate = ""
+                p50, p99 = f"{measured['p50_ms']:.2f}", f"{measured['p99_ms']:.2f}"
+            else:
+                unit = next(key for key in measured if key.endswith("_per_s"))
+                rate = f"{measured[unit]:,.0f} {unit.replace('_per_s', '/s')}"
+                p50 = p99 = ""
+            print(f"{result['chunks']:>9} {name:<22} {rate:>22} {p50:>9} {p99:>9}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--chunks",
+        type=int,
+        nargs="+",
+        default=[10000],
+        help="Corpus sizes in chunks, e.g. 10000 100000 1000000",
+    )
+    parser.add_argument("--chunks-per-source", type=int, default=20)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--url",
+        default="mem://",
+        help="Embedded database URL, e.g. surrealkv:///tmp/benchmark (default: mem://)",
+    )
+    parser.add_argument(
+        "--no-text-index",
+        dest="text_index",
+        action="store_false",
+        help="Drop the full-text indexes (skips text_search)",
+    )
+    parser.add_argument("--json", type=Path, help="Also write the results here")
+    args = parser.parse_args()
+
+    # Migrations are read relative to the project root
+    os.chdir(PROJECT_ROOT)
+    logger.remove()
+    logger.add(sys.stderr, level="INFO", filter=lambda r: r["name"] == "__main__")
+
+    results = [asyncio.run(run_benchmark(chunks, args)) for chunks in args.chunks]
+    print_report(results)
+    if args.json:
+        report = {
+            "dimension": args.dimension,
+            "url": args.url,
+            "text_index": args.text_index,
+            "results": results,
+        }
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
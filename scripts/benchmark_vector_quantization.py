@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark quantized NumPy vector index search: recall@k versus latency.
+
+This script:
+1. Generates a synthetic clustered corpus and queries that resemble it
+2. Builds one index per quantization (none, int8, binary) in a temp folder
+3. Times searches at several rescore factors and reports recall@k against
+   exact float32 search, plus the bytes scanned per search
+"""
+
+import argparse
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from open_notebook.database.numpy_index import NumpyVectorIndex
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+BUILD_BATCH_ROWS = 10000
+
+
+def make_corpus(
+    rows: int, dimension: int, clusters: int, queries: int, seed: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Clustered embeddings, and queries drawn near stored rows."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension))
+    vectors = centers[rng.integers(0, clusters, rows)]
+    vectors += rng.normal(size=(rows, dimension))
+    picks = vectors[rng.integers(0, rows, queries)]
+    return vectors, picks + rng.normal(size=(queries, dimension))
+
+
+def build_index(
+    folder: Path, quantization: str, vectors: np.ndarray
+) -> NumpyVectorIndex:
+    index = NumpyVectorIndex(str(folder / quantization), quantization)
+    for start in range(0, len(vectors), BUILD_BATCH_ROWS):
+        batch = vectors[start : start + BUILD_BATCH_ROWS]
+        ids = [f"note:{row}" for row in range(start, start + len(batch))]
+        index.replace_groups([(i, [i], [v]) for i, v in zip(ids, batch)])
+    index.mark_complete()
+    return index
+
+
+def run_queries(
+    index: NumpyVectorIndex, queries: np.ndarray, k: int, rescore: int
+) -> Dict[str, Any]:
+    # Warm up the memory maps so the first query is not an outlier
+    index.search(queries[0], k=k, tables=["note"], rescore=rescore)
+    latencies: List[float] = []
+    results: List[List[str]] = []
+    for query in queries:
+        start = time.perf_counter()
+        hits = index.search(query, k=k, tables=["note"], rescore=rescore)
+        latencies.append(time.perf_counter() - start)
+        results.append([record_id for record_id, _ in hits])
+    return {"latencies": latencies, "results": results}
+
+
+def recall(expected: Sequence[List[str]], found: Sequence[List[str]]) -> float:
+    matches = sum(len(set(e) & set(f)) for e, f in zip(expected, found))
+    return matches / max(1, sum(len(e) for e in expected))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    vectors, queries = make_corpus(
+        args.rows, args.dimension, args.clusters, args.queries, args.seed
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        logger.info(f"Building indexes over {args.rows} x {args.dimension} vectors")
+        indexes = {
+            quantization: build_index(folder, quantization, vectors)
+            for quantization in ("none", "int8", "binary")
+        }
+
+        baseline = run_queries(indexes["none"], queries, args.k, 1)
+        rows = [("none", "-", baseline)]
+        for quantization in ("int8", "binary"):
+            for rescore in args.rescore:
+                index = indexes[quantization]
+                measured = run_queries(index, queries, args.k, rescore)
+                rows.append((quantization, str(rescore), measured))
+
+        code_bytes = {
+            "none": args.dimension * 4,
+            "int8": args.dimension,
+            "binary": (args.dimension + 7) // 8,
+        }
+        print(
+            f"\nrecall@{args.k} vs exact float32 search "
+            f"({args.rows} rows, {args.dimension} dimensions, "
+            f"{args.queries} queries)\n"
+        )
+        print(
+            f"{'quantization':<13} {'rescore':>7} {'recall':>7} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'MB scanned':>11}"
+        )
+        for quantization, rescore, measured in rows:
+            latencies = sorted(measured["latencies"])
+            p50 = statistics.median(latencies) * 1000
+            p95 = latencies[int(0.95 * (len(latencies) - 1))] * 1000
+            scanned = args.rows * code_bytes[quantization] / 1e6
+            print(
+                f"{quantization:<13} {rescore:>7} "
+                f"{recall(baseline['results'], measured['results']):>7.3f} "
+                f"{p50:>8.2f} {p95:>8.2f} {scanned:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
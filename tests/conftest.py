@@ -29,3 +29,24 @@ else:
 # Add the project root to the Python path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def clear_record_cache():
+    """Keep cached records from leaking between tests that mock the database."""
+    from open_notebook.database.record_cache import get_record_cache
+    from open_notebook.utils.embedding_cache import get_query_embedding_cache
+
+    get_record_cache().clear()
+    get_query_embedding_cache().clear()
+    yield
+    get_record_cache().clear()
+    get_query_embedding_cache().clear()
+
+
+@pytest.fixture(autouse=True)
+def disable_embedding_store(monkeypatch):
+    """Keep mocked embedding calls off the database-backed embedding cache."""
+    monkeypatch.setenv("EMBEDDING_CACHE_ENABLED", "false")
@@ -13,6 +13,7 @@ from open_notebook.utils.chunking import (
     detect_content_type,
     detect_content_type_from_extension,
     detect_content_type_from_heuristics,
+    find_segment_boundary,
 )
 
 # ============================================================================
@@ -292,5 +293,29 @@ Content for section 2.
             assert len(chunk) <= CHUNK_SIZE + 300
 
 
+# ============================================================================
+# TEST SUITE 5: Segment Boundaries
+# ============================================================================
+
+
+class TestFindSegmentBoundary:
+    """Test suite for cutting streamed text before chunking."""
+
+    def test_prefers_paragraph_break(self):
+        text = "one line\nsecond line\n\nlast"
+        assert text[: find_segment_boundary(text)] == "one line\nsecond line\n\n"
+
+    def test_falls_back_to_line_break_then_space(self):
+        assert find_segment_boundary("some words here\nlast") == 16
+        assert find_segment_boundary("aaaaaaaa bb cc") == 12
+
+    def test_ignores_breaks_in_first_half(self):
+        text = "a\n\n" + "x" * 20 + " tail"
+        assert text[: find_segment_boundary(text)] == "a\n\n" + "x" * 20 + " "
+
+    def test_without_break_uses_whole_text(self):
+        assert find_segment_boundary("x" * 50) == 50
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
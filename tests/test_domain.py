@@ -15,7 +15,14 @@ from pydantic import ValidationError
 from open_notebook.ai.models import ModelManager
 from open_notebook.domain.base import RecordModel
 from open_notebook.domain.content_settings import ContentSettings
-from open_notebook.domain.notebook import Asset, Note, Notebook, Source
+from open_notebook.domain.notebook import (
+    Asset,
+    Note,
+    Notebook,
+    Source,
+    hybrid_search,
+    reciprocal_rank_fusion,
+)
 from open_notebook.domain.transformation import Transformation
 from open_notebook.exceptions import InvalidInputError
 from open_notebook.podcasts.models import EpisodeProfile, SpeakerProfile
@@ -99,6 +106,32 @@ class TestNotebookDomain:
         notebook_archived = Notebook(name="Test", description="Test", archived=True)
         assert notebook_archived.archived is True
 
+    @pytest.mark.asyncio
+    async def test_delete_cleans_up_notes(self):
+        """Notes deleted with the notebook leave the record cache and index."""
+        from open_notebook.database.record_cache import get_record_cache
+
+        notebook = Notebook(id="notebook:1", name="Test", description="Test")
+        notes = [Note(id="note:a", content="a"), Note(id="note:b", content="b")]
+        get_record_cache().put("note:a", {"id": "note:a", "content": "a"}, 60)
+        with (
+            patch.object(Notebook, "get_notes", AsyncMock(return_value=notes)),
+            patch("open_notebook.domain.notebook.repo_batch", AsyncMock()),
+            patch(
+                "open_notebook.domain.notebook.repo_query",
+                AsyncMock(return_value=[{"count": 0}]),
+            ),
+            patch("open_notebook.domain.base.repo_delete", AsyncMock()),
+            patch(
+                "open_notebook.domain.notebook.remove_from_numpy_index", AsyncMock()
+            ) as remove,
+        ):
+            result = await notebook.delete()
+
+        assert result["deleted_notes"] == 2
+        remove.assert_awaited_once_with(["note:a", "note:b"])
+        assert get_record_cache().get("note:a") is None
+
 
 # ============================================================================
 # TEST SUITE 4: Source Domain
@@ -123,6 +156,22 @@ class TestSourceDomain:
         save_data = source3._prepare_save_data()
         assert "command" in save_data
 
+    @pytest.mark.asyncio
+    async def test_uncached_get_reads_past_the_record_cache(self):
+        """Commands see edits made by another process within the cache TTL."""
+        from open_notebook.database.record_cache import get_record_cache
+
+        get_record_cache().put("source:1", {"id": "source:1", "title": "Old"}, 60)
+        with patch(
+            "open_notebook.domain.base.repo_query",
+            AsyncMock(return_value=[{"id": "source:1", "title": "New"}]),
+        ):
+            cached = await Source.get("source:1")
+            fresh = await Source.get("source:1", cached=False)
+
+        assert cached.title == "Old"
+        assert fresh.title == "New"
+
     @pytest.mark.asyncio
     async def test_source_delete_cleans_up_file(self):
         """Test that deleting a source removes the associated file."""
@@ -394,5 +443,109 @@ class TestEpisodeProfile:
         assert profile.num_segments == 5
 
 
+
+# ============================================================================
+# TEST SUITE 10: Hybrid Search
+# ============================================================================
+
+
+TEXT_RESULTS = [
+    # Not sorted: grouped SurrealQL results are ranked again by score
+    {"id": "note:b", "parent_id": "note:b", "title": "B", "relevance": 1.5},
+    {"id": "source:a", "parent_id": "source:a", "title": "A", "relevance": 3.0},
+]
+VECTOR_RESULTS = [
+    {
+        "id": "note:c",
+        "parent_id": "note:c",
+        "title": "C",
+        "similarity": 0.9,
+        "matches": ["c"],
+    },
+    {
+        "id": "source:a",
+        "parent_id": "source:a",
+        "title": "A",
+        "similarity": 0.8,
+        "matches": ["a"],
+    },
+]
+
+
+class TestHybridSearch:
+    """Test suite for reciprocal rank fusion of text and vector search."""
+
+    def test_results_found_by_both_searches_rank_first(self):
+        results = reciprocal_rank_fusion(
+            [(TEXT_RESULTS, "relevance", 1.0), (VECTOR_RESULTS, "similarity", 1.0)],
+            limit=10,
+        )
+
+        assert [r["id"] for r in results] == ["source:a", "note:c", "note:b"]
+        assert results[0]["score"] == pytest.approx(1 / 61 + 1 / 62)
+        # Fields of both searches are kept
+        assert results[0]["relevance"] == 3.0
+        assert results[0]["matches"] == ["a"]
+
+    def test_weights_and_limit(self):
+        results = reciprocal_rank_fusion(
+            [(TEXT_RESULTS, "relevance", 3.0), (VECTOR_RESULTS, "similarity", 1.0)],
+            limit=2,
+        )
+        assert [r["id"] for r in results] == ["source:a", "note:b"]
+
+        vector_only = reciprocal_rank_fusion(
+            [(TEXT_RESULTS, "relevance", 0.0), (VECTOR_RESULTS, "similarity", 1.0)],
+            limit=10,
+        )
+        assert [r["id"] for r in vector_only] == ["note:c", "source:a"]
+
+    @pytest.mark.asyncio
+    async def test_hybrid_search_runs_both_searches(self):
+        with (
+            patch(
+                "open_notebook.domain.notebook.text_search",
+                new_callable=AsyncMock,
+                return_value=TEXT_RESULTS,
+            ) as text_search,
+            patch(
+                "open_notebook.domain.notebook.vector_search",
+                new_callable=AsyncMock,
+                return_value=VECTOR_RESULTS,
+            ) as vector_search,
+        ):
+            results = await hybrid_search("query", 5, minimum_score=0.3)
+
+        scope = {"notebook_id": None, "user_id": None}
+        text_search.assert_awaited_once_with("query", 5, True, True, **scope)
+        shaping = {"max_chunks_per_parent": None, "snippet_chars": None}
+        vector_search.assert_awaited_once_with(
+            "query", 5, True, True, 0.3, **scope, **shaping
+        )
+        assert results[0]["id"] == "source:a"
+
+    @pytest.mark.asyncio
+    async def test_zero_weight_skips_search(self):
+        with (
+            patch(
+                "open_notebook.domain.notebook.text_search",
+                new_callable=AsyncMock,
+                return_value=TEXT_RESULTS,
+            ),
+            patch(
+                "open_notebook.domain.notebook.vector_search", new_callable=AsyncMock
+            ) as vector_search,
+        ):
+            results = await hybrid_search("query", 5, vector_weight=0)
+
+        vector_search.assert_not_called()
+        assert [r["id"] for r in results] == ["source:a", "note:b"]
+
+    @pytest.mark.asyncio
+    async def test_empty_keyword_rejected(self):
+        with pytest.raises(InvalidInputError):
+            await hybrid_search("", 5)
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
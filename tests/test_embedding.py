@@ -4,13 +4,47 @@ Unit tests for the open_notebook.utils.embedding module.
 Tests embedding generation and mean pooling functionality.
 """
 
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
 import pytest
 
+from open_notebook.ai.rate_scheduler import (
+    BACKGROUND,
+    INTERACTIVE,
+    ModelRateLimiter,
+    RateBucket,
+    RateBudget,
+    RateLimitTimeout,
+    parse_rate_limits,
+    rate_limit_stats,
+)
 from open_notebook.utils.embedding import (
     generate_embedding,
     generate_embeddings,
+    generate_query_embedding,
+    generate_query_embeddings,
     mean_pool_embeddings,
 )
+from open_notebook.utils.embedding_batches import (
+    GROW_AFTER_SUCCESSES,
+    AdaptiveBatchSize,
+    classify_error,
+    embed_in_batches,
+    split_batches,
+)
+from open_notebook.utils.embedding_cache import (
+    QueryEmbeddingCache,
+    get_query_embedding_cache,
+    normalize_query_text,
+)
+from open_notebook.utils.embedding_microbatch import (
+    EmbeddingBatcher,
+    generate_embedding_batched,
+)
 
 # ============================================================================
 # TEST SUITE 1: Mean Pooling
@@ -190,9 +224,9 @@ class TestGenerateEmbedding:
         mock_model = MagicMock()
         # Return multiple embeddings (one per chunk)
         mock_model.aembed = AsyncMock(
-            return_value=[
-                [1.0, 0.0, 0.0],
-                [0.0, 1.0, 0.0],
+            side_effect=lambda chunks: [
+                [1.0, 0.0, 0.0] if idx % 2 == 0 else [0.0, 1.0, 0.0]
+                for idx in range(len(chunks))
             ]
         )
 
@@ -229,5 +263,542 @@ class TestGenerateEmbedding:
             assert len(result) == 3
 
 
+
+# ============================================================================
+# TEST SUITE 4: Query Embedding Cache
+# ============================================================================
+
+
+def mock_embedding_setup(model_id="model:embed"):
+    """Patch the default embedding model; returns the mocked provider model."""
+    mock_model = MagicMock()
+    mock_model.aembed = AsyncMock(return_value=[[0.1, 0.2, 0.3]])
+    defaults = SimpleNamespace(default_embedding_model=model_id)
+    return mock_model, [
+        patch(
+            "open_notebook.ai.models.model_manager.get_defaults",
+            new_callable=AsyncMock,
+            return_value=defaults,
+        ),
+        patch(
+            "open_notebook.ai.models.model_manager.get_embedding_model",
+            new_callable=AsyncMock,
+            return_value=mock_model,
+        ),
+    ]
+
+
+class TestQueryEmbeddingCache:
+    """Test suite for cached search query embeddings."""
+
+    def test_normalize_query_text(self):
+        assert normalize_query_text("  what   is\tRAG?\n") == "what is RAG?"
+
+    @pytest.mark.asyncio
+    async def test_repeated_query_skips_provider(self):
+        mock_model, patches = mock_embedding_setup()
+        with patches[0], patches[1]:
+            first = await generate_query_embedding("What is RAG?")
+            second = await generate_query_embedding("  What is   RAG? ")
+
+        assert first == second == [0.1, 0.2, 0.3]
+        mock_model.aembed.assert_called_once_with(["What is RAG?"])
+        assert get_query_embedding_cache().stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_model_change_invalidates(self):
+        mock_model, patches = mock_embedding_setup("model:a")
+        with patches[0], patches[1]:
+            await generate_query_embedding("query")
+        _, patches = mock_embedding_setup("model:b")
+        with patches[0], patch(
+            "open_notebook.ai.models.model_manager.get_embedding_model",
+            new_callable=AsyncMock,
+            return_value=mock_model,
+        ):
+            await generate_query_embedding("query")
+
+        assert mock_model.aembed.call_count == 2
+        assert get_query_embedding_cache().stats()["entries"] == 1
+
+    @pytest.mark.asyncio
+    async def test_no_model_raises(self):
+        _, patches = mock_embedding_setup(None)
+        with patches[0]:
+            with pytest.raises(ValueError, match="No embedding model configured"):
+                await generate_query_embedding("query")
+
+    def test_entries_expire(self):
+        cache = QueryEmbeddingCache(max_entries=10, ttl=60)
+        with patch(
+            "open_notebook.utils.embedding_cache.time.monotonic", return_value=100.0
+        ):
+            cache.put("m", "query", [1.0])
+            assert cache.get("m", "query") == [1.0]
+        with patch(
+            "open_notebook.utils.embedding_cache.time.monotonic", return_value=161.0
+        ):
+            assert cache.get("m", "query") is None
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = QueryEmbeddingCache(max_entries=2)
+        cache.put("m", "a", [1.0])
+        cache.put("m", "b", [2.0])
+        cache.get("m", "a")
+        cache.put("m", "c", [3.0])
+
+        assert cache.get("m", "b") is None
+        assert cache.get("m", "a") == [1.0]
+        assert cache.get("m", "c") == [3.0]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_queries_share_one_call(self):
+        cache = QueryEmbeddingCache()
+        calls = []
+
+        async def create(text):
+            calls.append(text)
+            await asyncio.sleep(0.01)
+            return [1.0, 2.0]
+
+        results = await asyncio.gather(
+            *(cache.get_or_create("m", "same query", create) for _ in range(5))
+        )
+        assert calls == ["same query"]
+        assert all(result == [1.0, 2.0] for result in results)
+
+    @pytest.mark.asyncio
+    async def test_failures_are_not_cached(self):
+        cache = QueryEmbeddingCache()
+        create = AsyncMock(side_effect=[RuntimeError("provider down"), [1.0]])
+
+        with pytest.raises(RuntimeError):
+            await cache.get_or_create("m", "query", create)
+        assert await cache.get_or_create("m", "query", create) == [1.0]
+        assert create.call_count == 2
+
+
+    @pytest.mark.asyncio
+    async def test_batch_embeds_missing_queries_in_one_call(self):
+        mock_model, patches = mock_embedding_setup()
+        mock_model.aembed = AsyncMock(return_value=[[1.0, 0.0], [0.0, 1.0]])
+        with patches[0], patches[1]:
+            cache = get_query_embedding_cache()
+            cache.use_model("model:embed")
+            cache.put("model:embed", "cached", [0.5, 0.5])
+            embeddings = await generate_query_embeddings(
+                ["first", "cached", " first ", "second"]
+            )
+
+        mock_model.aembed.assert_called_once_with(["first", "second"])
+        assert embeddings == [[1.0, 0.0], [0.5, 0.5], [1.0, 0.0], [0.0, 1.0]]
+        with patches[0], patches[1]:
+            assert await generate_query_embedding("second") == [0.0, 1.0]
+        assert mock_model.aembed.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_batch_rejects_empty_query(self):
+        with pytest.raises(ValueError, match="empty text"):
+            await generate_query_embeddings(["query", " "])
+
+
+# ============================================================================
+# TEST SUITE 5: Adaptive Batching
+# ============================================================================
+
+
+class BatchingModel:
+    """Embedding model that fails selected requests and tracks concurrency."""
+
+    def __init__(self, provider, failures=None):
+        self.provider = provider
+        self.failures = failures or {}
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def aembed(self, texts):
+        self.calls.append(list(texts))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            error = self.failures.pop(tuple(texts), None)
+            if error:
+                raise error
+            return [[float(text)] for text in texts]
+        finally:
+            self.in_flight -= 1
+
+
+class TestAdaptiveBatching:
+    """Test suite for splitting, bounding and retrying embedding requests."""
+
+    @pytest.fixture(autouse=True)
+    def no_backoff(self, monkeypatch):
+        monkeypatch.setattr(
+            "open_notebook.utils.embedding_batches.BACKOFF_BASE_SECONDS", 0.0
+        )
+
+    def test_split_by_items_and_tokens(self):
+        texts = ["a" * 30, "b" * 30, "c" * 30, "d" * 300, "e"]
+
+        assert split_batches(texts, max_items=2) == [
+            (0, texts[0:2]),
+            (2, texts[2:4]),
+            (4, texts[4:]),
+        ]
+        # 11 estimated tokens per short text, 101 for the long one
+        assert split_batches(texts, max_items=10, max_tokens=25) == [
+            (0, texts[0:2]),
+            (2, texts[2:3]),
+            (3, texts[3:4]),
+            (4, texts[4:]),
+        ]
+
+    def test_classify_errors(self):
+        assert classify_error(RuntimeError("HTTP 429: slow down")) == "rate_limit"
+        assert classify_error(RuntimeError("Rate limit reached")) == "rate_limit"
+        assert (
+            classify_error(RuntimeError("Request too large for model"))
+            == "too_large"
+        )
+        assert classify_error(TimeoutError()) == "transient"
+        assert classify_error(RuntimeError("Invalid API key")) == "permanent"
+
+    def test_classify_errors_by_status_code(self):
+        def http_error(status, message):
+            error = RuntimeError(message)
+            error.status_code = status
+            return error
+
+        # The status code wins over numbers or phrases in the message
+        assert classify_error(http_error(401, "429 keys revoked")) == "permanent"
+        assert classify_error(http_error(429, "slow down")) == "rate_limit"
+        assert classify_error(http_error(503, "rate limit")) == "transient"
+        assert classify_error(http_error(413, "payload")) == "too_large"
+        assert (
+            classify_error(http_error(400, "maximum context length is 8192"))
+            == "too_large"
+        )
+        assert classify_error(http_error(400, "invalid model")) == "permanent"
+
+    def test_status_codes_in_messages_are_whole_numbers(self):
+        assert (
+            classify_error(RuntimeError("input has 1500 tokens, model 4290"))
+            == "permanent"
+        )
+        assert classify_error(RuntimeError("Error code: 502")) == "transient"
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_batch_is_halved_and_retried(self, monkeypatch):
+        monkeypatch.setenv("EMBEDDING_BATCH_MAX_ITEMS", "4")
+        texts = [str(i) for i in range(8)]
+        model = BatchingModel(
+            "halving", {tuple(texts[4:]): RuntimeError("429 Too Many Requests")}
+        )
+        stored = []
+
+        async def on_batch(batch, embeddings):
+            stored.append(batch)
+
+        embeddings = await embed_in_batches(model, texts, on_batch)
+
+        assert embeddings == [[float(i)] for i in range(8)]
+        assert sorted(model.calls) == sorted(
+            [texts[:4], texts[4:], texts[4:6], texts[6:]]
+        )
+        assert sorted(stored) == sorted([texts[:4], texts[4:6], texts[6:]])
+
+    @pytest.mark.asyncio
+    async def test_later_batches_use_the_reduced_size(self, monkeypatch):
+        monkeypatch.setenv("EMBEDDING_BATCH_MAX_ITEMS", "4")
+        monkeypatch.setenv("EMBEDDING_MAX_CONCURRENCY", "1")
+        texts = [str(i) for i in range(12)]
+        # Every request of more than 2 texts would be rate limited
+        model = BatchingModel(
+            "shrinking",
+            {
+                tuple(texts[start : start + 4]): RuntimeError("429 Too Many Requests")
+                for start in range(0, 12, 4)
+            },
+        )
+
+        embeddings = await embed_in_batches(model, texts)
+
+        assert embeddings == [[float(i)] for i in range(12)]
+        assert [len(call) for call in model.calls] == [4, 2, 2, 2, 2, 2, 2]
+
+    def test_batch_size_grows_back_after_successes(self):
+        batch_size = AdaptiveBatchSize(16)
+        batch_size.shrink(4)
+        batch_size.grow()
+        batch_size.shrink(8)  # Larger than the current size: no change
+
+        for _ in range(GROW_AFTER_SUCCESSES - 1):
+            batch_size.grow()
+        assert batch_size.current == 4
+        batch_size.grow()
+        assert batch_size.current == 6
+        for _ in range(GROW_AFTER_SUCCESSES * 10):
+            batch_size.grow()
+        assert batch_size.current == 16
+
+    @pytest.mark.asyncio
+    async def test_transient_failure_retries_only_that_batch(self, monkeypatch):
+        monkeypatch.setenv("EMBEDDING_BATCH_MAX_ITEMS", "2")
+        texts = [str(i) for i in range(4)]
+        model = BatchingModel("transient", {("2", "3"): TimeoutError()})
+
+        embeddings = await embed_in_batches(model, texts)
+
+        assert embeddings == [[float(i)] for i in range(4)]
+        assert sorted(model.calls) == [["0", "1"], ["2", "3"], ["2", "3"]]
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded_per_provider(self, monkeypatch):
+        monkeypatch.setenv("EMBEDDING_BATCH_MAX_ITEMS", "1")
+        monkeypatch.setenv("EMBEDDING_MAX_CONCURRENCY", "2")
+        model = BatchingModel("bounded")
+
+        await embed_in_batches(model, [str(i) for i in range(6)])
+
+        assert len(model.calls) == 6
+        assert model.max_in_flight == 2
+
+    @pytest.mark.asyncio
+    async def test_permanent_error_is_not_retried(self, monkeypatch):
+        monkeypatch.setenv("EMBEDDING_BATCH_MAX_ITEMS", "1")
+        model = BatchingModel("permanent", {("1",): RuntimeError("Invalid API key")})
+
+        with pytest.raises(RuntimeError, match="Invalid API key"):
+            await embed_in_batches(model, ["0", "1", "2"])
+        assert model.calls.count(["1"]) == 1
+
+
+# ============================================================================
+# TEST SUITE 6: Embedding Micro-Batcher
+# ============================================================================
+
+
+def counting_generate_embeddings(calls):
+    async def generate(texts, command_id=None, cache=True):
+        calls.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    return generate
+
+
+class TestEmbeddingMicroBatcher:
+    """Test suite for coalescing concurrent single-text embedding requests."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_call(self):
+        calls = []
+        batcher = EmbeddingBatcher(max_items=64, max_wait=0.01)
+        with patch(
+            "open_notebook.utils.embedding_microbatch.generate_embeddings",
+            counting_generate_embeddings(calls),
+        ):
+            texts = ["a" * n for n in range(1, 11)]
+            embeddings = await asyncio.gather(*(batcher.embed(t) for t in texts))
+
+        assert calls == [texts]
+        assert embeddings == [[float(n)] for n in range(1, 11)]
+        assert batcher.stats() == {"batches": 1, "texts": 10, "pending": 0}
+
+    @pytest.mark.asyncio
+    async def test_full_batch_is_sent_without_waiting(self):
+        calls = []
+        batcher = EmbeddingBatcher(max_items=3, max_wait=60)
+        with patch(
+            "open_notebook.utils.embedding_microbatch.generate_embeddings",
+            counting_generate_embeddings(calls),
+        ):
+            await asyncio.wait_for(
+                asyncio.gather(*(batcher.embed(str(n)) for n in range(6))), 1
+            )
+
+        assert calls == [["0", "1", "2"], ["3", "4", "5"]]
+
+    @pytest.mark.asyncio
+    async def test_failure_reaches_every_caller(self):
+        batcher = EmbeddingBatcher(max_items=64, max_wait=0.01)
+        with patch(
+            "open_notebook.utils.embedding_microbatch.generate_embeddings",
+            AsyncMock(side_effect=RuntimeError("provider down")),
+        ):
+            results = await asyncio.gather(
+                batcher.embed("a"), batcher.embed("b"), return_exceptions=True
+            )
+
+        assert [str(result) for result in results] == ["provider down"] * 2
+
+    @pytest.mark.asyncio
+    async def test_long_text_and_disabled_batching_bypass_batcher(self, monkeypatch):
+        direct = AsyncMock(return_value=[1.0])
+        with (
+            patch(
+                "open_notebook.utils.embedding_microbatch.generate_embedding", direct
+            ),
+            patch(
+                "open_notebook.utils.embedding_microbatch.get_embedding_batcher"
+            ) as get_batcher,
+        ):
+            assert await generate_embedding_batched("x" * 5000) == [1.0]
+            monkeypatch.setenv("EMBEDDING_MICROBATCH_WAIT_MS", "0")
+            assert await generate_embedding_batched("short") == [1.0]
+
+        assert direct.await_count == 2
+        get_batcher.assert_not_called()
+
+
+# ============================================================================
+# TEST SUITE 7: Provider Rate Scheduler
+# ============================================================================
+
+
+def drained_bucket(tpm=6000):
+    """A bucket refilling 100 tokens per second at 6000 TPM, emptied."""
+    bucket = RateBucket("test:default", RateBudget(tpm=tpm))
+    bucket.acquire(tpm)
+    return bucket
+
+
+class TestRateScheduler:
+    """Test suite for the shared per-provider rate budgets."""
+
+    def test_parse_rate_limits(self):
+        budgets = parse_rate_limits("openai=60/1000, open_router=300,bad,*=/500")
+
+        assert budgets == {
+            "openai": RateBudget(rpm=60, tpm=1000),
+            "open-router": RateBudget(rpm=300),
+            "*": RateBudget(tpm=500),
+        }
+
+    @pytest.mark.asyncio
+    async def test_calls_wait_for_their_tokens(self):
+        bucket = drained_bucket()
+
+        started = time.monotonic()
+        assert await bucket.aacquire(20)
+
+        assert time.monotonic() - started >= 0.15
+        # Costs above the whole budget are clamped instead of waiting forever
+        assert bucket._cost(10_000) == 6000
+
+    @pytest.mark.asyncio
+    async def test_interactive_calls_go_first(self):
+        bucket = drained_bucket()
+        order = []
+
+        async def call(name, priority):
+            await bucket.aacquire(10, priority)
+            order.append(name)
+
+        background = asyncio.create_task(call("embedding", BACKGROUND))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(call("chat", INTERACTIVE))
+        await asyncio.sleep(0)
+
+        assert bucket.stats()["queue_depth"] == {"interactive": 1, "background": 1}
+        await asyncio.gather(background, interactive)
+        assert order == ["chat", "embedding"]
+        stats = bucket.stats()
+        assert stats["queue_depth"] == {"interactive": 0, "background": 0}
+        assert stats["max_queue_depth"] == 2
+        assert stats["delayed"] == 2
+
+    @pytest.mark.asyncio
+    async def test_deadline_and_non_blocking_calls(self):
+        bucket = drained_bucket()
+
+        with pytest.raises(RateLimitTimeout):
+            await bucket.aacquire(100, deadline=0.05)
+        assert bucket.acquire(100, blocking=False) is False
+
+        stats = bucket.stats()
+        assert stats["timed_out"] == 1
+        assert stats["queue_depth"] == {"interactive": 0, "background": 0}
+        # The abandoned calls do not hold up the next one
+        assert await bucket.aacquire(1, deadline=1)
+
+    def test_sync_and_async_callers_share_a_bucket(self):
+        bucket = drained_bucket()
+        granted = []
+        thread = threading.Thread(
+            target=lambda: granted.append(bucket.acquire(10, INTERACTIVE))
+        )
+        thread.start()
+        assert asyncio.run(bucket.aacquire(10, BACKGROUND))
+        thread.join()
+
+        assert granted == [True]
+        assert bucket.stats()["granted"] == 3
+
+    @pytest.mark.asyncio
+    async def test_embedding_requests_take_the_provider_budget(self, monkeypatch):
+        monkeypatch.setenv("MODEL_RATE_LIMITS", "budgeted=60/100000")
+        monkeypatch.setenv("EMBEDDING_BATCH_MAX_ITEMS", "2")
+        model = BatchingModel("budgeted")
+
+        await embed_in_batches(model, [str(i) for i in range(6)])
+
+        stats = next(
+            bucket
+            for bucket in rate_limit_stats()
+            if bucket["key"] == "budgeted:default"
+        )
+        assert stats["granted"] == 3
+        assert stats["available_requests"] < 58
+
+    @pytest.mark.asyncio
+    async def test_chat_models_get_an_interactive_rate_limiter(self, monkeypatch):
+        from esperanto import AIFactory
+
+        from open_notebook.ai.provision import provision_langchain_model
+
+        monkeypatch.setenv("MODEL_RATE_LIMITS", "openai=500/200000")
+        model = AIFactory.create_language(
+            model_name="gpt-4o-mini", provider="openai", config={"api_key": "sk-x"}
+        )
+        with (
+            patch(
+                "open_notebook.ai.provision.model_manager.get_default_model",
+                AsyncMock(return_value=model),
+            ),
+            patch("open_notebook.ai.provision.token_count", return_value=5),
+        ):
+            chat = await provision_langchain_model("hello", None, "chat", max_tokens=50)
+            transformation = await provision_langchain_model(
+                "hello", None, "transformation"
+            )
+
+        assert chat.rate_limiter.priority == INTERACTIVE
+        assert chat.rate_limiter.max_tokens == 50
+        assert chat.rate_limiter in chat.callbacks
+        assert transformation.rate_limiter.priority == BACKGROUND
+        assert chat.rate_limiter.bucket is transformation.rate_limiter.bucket
+        assert chat.rate_limiter.bucket.key.startswith("openai:")
+
+    @pytest.mark.asyncio
+    async def test_chat_calls_are_charged_their_own_prompt(self):
+        from langchain_core.language_models import FakeListChatModel
+
+        bucket = RateBucket("chat", RateBudget(rpm=100))
+        limiter = ModelRateLimiter(bucket, INTERACTIVE, len, max_tokens=50)
+        chat = FakeListChatModel(
+            responses=["ok", "ok"], rate_limiter=limiter, callbacks=[limiter]
+        )
+
+        with patch.object(bucket, "aacquire", wraps=bucket.aacquire) as aacquire:
+            await chat.ainvoke("hi")
+            await chat.ainvoke("hello there")
+
+        # "Human: hi" and "Human: hello there", plus max_tokens each
+        assert [call.args[0] for call in aacquire.call_args_list] == [59, 68]
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,646 @@
+"""
+Unit tests for the embedding commands and the embedding cache they write through.
+
+Runs source embedding against an embedded in-memory SurrealDB with a fake
+embedding model, so no provider or server is needed.
+"""
+
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from surreal_commands.core.types import ExecutionContext
+from surrealdb import AsyncSurreal
+
+from commands.embedding_commands import (
+    EmbedSourceInput,
+    RebuildEmbeddingsInput,
+    align_chunks,
+    embed_source_command,
+    rebuild_embeddings_command,
+)
+from commands.embedding_commands import repo_batch as embedding_repo_batch
+from commands.embedding_commands import repo_query as embedding_repo_query
+from open_notebook.database.async_migrate import AsyncMigration
+from open_notebook.domain.notebook import Source
+from open_notebook.utils import embedding_store
+from open_notebook.utils.embedding import generate_embeddings
+from open_notebook.utils.embedding_store import (
+    embedding_model_key,
+    prune_embedding_cache,
+)
+from open_notebook.utils.rebuild_checkpoint import RebuildCheckpoint, load_checkpoint
+
+
+@asynccontextmanager
+async def memory_database():
+    """Route repository calls to an embedded in-memory SurrealDB."""
+    connection = AsyncSurreal("mem://")
+    await connection.connect()
+    await connection.use("test", "test")
+
+    @asynccontextmanager
+    async def memory_db_connection():
+        yield connection
+
+    try:
+        with patch(
+            "open_notebook.database.repository.db_connection", memory_db_connection
+        ):
+            yield connection
+    finally:
+        await connection.close()
+
+
+def fake_embedding_model(model_name="embed-small"):
+    """Embeds each text as [len(text), 1.0] and records what it was sent."""
+    model = SimpleNamespace(provider="fake", model_name=model_name, calls=[])
+
+    async def aembed(texts):
+        model.calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+    model.aembed = aembed
+    return model
+
+
+# ============================================================================
+# TEST SUITE 1: Embedding Cache
+# ============================================================================
+
+
+class TestEmbeddingCache:
+    """Test suite for the persistent, content-addressed embedding cache."""
+
+    @pytest.fixture(autouse=True)
+    def enable_embedding_store(self, monkeypatch):
+        monkeypatch.setenv("EMBEDDING_CACHE_ENABLED", "true")
+
+    @asynccontextmanager
+    async def cached_embeddings(self, model):
+        async with memory_database() as db:
+            migration = AsyncMigration.from_file(
+                "open_notebook/database/migrations/17.surrealql"
+            )
+            await db.query(migration.sql)
+            with patch(
+                "open_notebook.ai.models.model_manager.get_embedding_model",
+                new=AsyncMock(return_value=model),
+            ):
+                yield db
+
+    @pytest.mark.asyncio
+    async def test_only_new_texts_are_embedded(self):
+        """Repeated and duplicate texts skip the provider."""
+        model = fake_embedding_model()
+        async with self.cached_embeddings(model) as db:
+            first = await generate_embeddings(["a", "bb", "a"])
+            second = await generate_embeddings(["bb", "ccc", "a"])
+            stored = await db.query("SELECT model FROM embedding_cache")
+
+        assert first == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+        assert second == [[2.0, 1.0], [3.0, 1.0], [1.0, 1.0]]
+        assert model.calls == [["a", "bb"], ["ccc"]]
+        assert [row["model"] for row in stored] == ["fake/embed-small"] * 3
+
+    @pytest.mark.asyncio
+    async def test_cache_is_per_model(self):
+        """Another embedding model does not reuse the stored vectors."""
+        small, large = fake_embedding_model(), fake_embedding_model("embed-large")
+        async with self.cached_embeddings(small):
+            await generate_embeddings(["a"])
+            with patch(
+                "open_notebook.ai.models.model_manager.get_embedding_model",
+                new=AsyncMock(return_value=large),
+            ):
+                await generate_embeddings(["a"])
+            await generate_embeddings(["a"])
+
+        assert small.calls == [["a"]]
+        assert large.calls == [["a"]]
+
+    def test_model_key_includes_dimensions_and_endpoint(self):
+        model = fake_embedding_model()
+        assert embedding_model_key(model) == "fake/embed-small"
+
+        model.output_dimensions = 256
+        model.base_url = "http://gpu-1:8080/v1/"
+        assert embedding_model_key(model) == (
+            "fake/embed-small@256d|http://gpu-1:8080/v1"
+        )
+        azure = SimpleNamespace(
+            provider="azure",
+            model_name="embed",
+            azure_endpoint="https://a.openai.azure.com",
+            deployment_name="embed-eu",
+            _config={"dimensions": 512},
+        )
+        assert embedding_model_key(azure) == (
+            "azure/embed@512d|https://a.openai.azure.com|embed-eu"
+        )
+
+    @pytest.mark.asyncio
+    async def test_oldest_entries_are_pruned(self, monkeypatch):
+        monkeypatch.setenv("EMBEDDING_CACHE_MAX_ENTRIES", "2")
+        # Writes leave pruning to the forced call below
+        monkeypatch.setattr(embedding_store, "_pruned_at", time.monotonic())
+        model = fake_embedding_model()
+        async with self.cached_embeddings(model) as db:
+            for text in ("a", "bb", "ccc"):
+                await generate_embeddings([text])
+            assert await prune_embedding_cache(force=True) == 1
+            stored = await db.query("SELECT VALUE embedding FROM embedding_cache")
+
+        assert sorted(stored) == [[2.0, 1.0], [3.0, 1.0]]
+
+    @pytest.mark.asyncio
+    async def test_table_is_counted_only_near_the_cap(self, monkeypatch):
+        monkeypatch.setenv("EMBEDDING_CACHE_MAX_ENTRIES", "2")
+        monkeypatch.setenv("EMBEDDING_CACHE_PRUNE_INTERVAL", "0")
+        monkeypatch.setattr(embedding_store, "_approx_entries", None)
+        model = fake_embedding_model()
+        async with self.cached_embeddings(model) as db:
+            with patch(
+                "open_notebook.utils.embedding_store.repo_query",
+                wraps=embedding_store.repo_query,
+            ) as spy:
+                for text in ("a", "bb", "ccc"):
+                    await generate_embeddings([text])
+            stored = await db.query("SELECT VALUE embedding FROM embedding_cache")
+
+        counts = [call for call in spy.call_args_list if "count()" in call.args[0]]
+        # Once to learn the size, then again only once the cap may be passed
+        assert len(counts) == 2
+        assert sorted(stored) == [[2.0, 1.0], [3.0, 1.0]]
+
+    @pytest.mark.asyncio
+    async def test_cache_can_be_bypassed(self, monkeypatch):
+        """cache=False and EMBEDDING_CACHE_ENABLED=false embed every text."""
+        model = fake_embedding_model()
+        async with self.cached_embeddings(model) as db:
+            await generate_embeddings(["a"], cache=False)
+            monkeypatch.setenv("EMBEDDING_CACHE_ENABLED", "false")
+            await generate_embeddings(["a", "a"])
+            stored = await db.query("SELECT * FROM embedding_cache")
+
+        assert model.calls == [["a"], ["a", "a"]]
+        assert stored == []
+
+
+# ============================================================================
+# TEST SUITE 2: Incremental Source Embedding
+# ============================================================================
+
+
+def stored_chunk(record_id, order, content, model="fake/embed-small"):
+    return {"id": record_id, "order": order, "content": content, "model": model}
+
+
+class TestIncrementalSourceEmbedding:
+    """Test suite for re-embedding only the changed chunks of a source."""
+
+    def test_align_keeps_unchanged_and_moved_chunks(self):
+        existing = [
+            stored_chunk("source_embedding:a", 0, "a"),
+            stored_chunk("source_embedding:b", 1, "b"),
+            stored_chunk("source_embedding:c", 2, "c"),
+            stored_chunk("source_embedding:d", 3, "d"),
+        ]
+
+        kept, stale = align_chunks(existing, ["a", "x", "c", "b"], "fake/embed-small")
+
+        assert {idx: row["id"] for idx, row in kept.items()} == {
+            0: "source_embedding:a",
+            2: "source_embedding:c",
+            3: "source_embedding:b",
+        }
+        assert stale == ["source_embedding:d"]
+
+    def test_align_prefers_same_position_for_duplicates(self):
+        existing = [
+            stored_chunk("source_embedding:a", 0, "same"),
+            stored_chunk("source_embedding:b", 1, "same"),
+        ]
+
+        kept, stale = align_chunks(existing, ["new", "same"], "fake/embed-small")
+
+        assert {idx: row["id"] for idx, row in kept.items()} == {
+            1: "source_embedding:b"
+        }
+        assert stale == ["source_embedding:a"]
+
+    def test_align_ignores_other_models(self):
+        existing = [
+            stored_chunk("source_embedding:a", 0, "a", model="fake/embed-large"),
+            stored_chunk("source_embedding:b", 1, "b", model=None),
+        ]
+
+        kept, stale = align_chunks(existing, ["a", "b"], "fake/embed-small")
+
+        assert kept == {}
+        assert stale == ["source_embedding:a", "source_embedding:b"]
+
+    @pytest.mark.asyncio
+    async def test_incremental_run_rewrites_only_changed_chunks(self):
+        model = fake_embedding_model()
+        async with memory_database() as db:
+            for version in (1, 18, 20):
+                migration = AsyncMigration.from_file(
+                    f"open_notebook/database/migrations/{version}.surrealql"
+                )
+                await db.query(migration.sql)
+            await db.query("CREATE source:s SET full_text = 'text'")
+
+            async def embed(chunks, incremental):
+                with (
+                    patch(
+                        "commands.embedding_commands.chunk_text",
+                        return_value=chunks,
+                    ),
+                    patch(
+                        "commands.embedding_commands.prepare_vector_indexes",
+                        new=AsyncMock(),
+                    ),
+                    patch(
+                        "open_notebook.ai.models.model_manager.get_embedding_model",
+                        new=AsyncMock(return_value=model),
+                    ),
+                ):
+                    return await embed_source_command(
+                        EmbedSourceInput(source_id="source:s", incremental=incremental)
+                    )
+
+            async def stored():
+                return await db.query(
+                    "SELECT id, order, content, model FROM source_embedding "
+                    "ORDER BY order"
+                )
+
+            await embed(["a", "bb", "ccc"], incremental=False)
+            before = {row["content"]: row["id"] for row in await stored()}
+
+            output = await embed(["a", "dddd", "ccc", "bb"], incremental=True)
+            after = await stored()
+
+        assert output.success
+        assert (output.chunks_created, output.chunks_reused) == (4, 3)
+        assert model.calls == [["a", "bb", "ccc"], ["dddd"]]
+        assert [row["content"] for row in after] == ["a", "dddd", "ccc", "bb"]
+        assert {row["model"] for row in after} == {"fake/embed-small"}
+        for row in after:
+            if row["content"] in before:
+                assert row["id"] == before[row["content"]]
+
+
+# ============================================================================
+# TEST SUITE 3: Checkpointed Embedding Rebuild
+# ============================================================================
+
+
+def rebuild_input(command_id, **kwargs):
+    return RebuildEmbeddingsInput(
+        mode="all",
+        execution_context=ExecutionContext(
+            command_id=command_id,
+            execution_started_at=datetime.now(timezone.utc),
+            app_name="open_notebook",
+            command_name="rebuild_embeddings",
+        ),
+        **kwargs,
+    )
+
+
+class TestEmbeddingRebuild:
+    """Test suite for the windowed, resumable embedding rebuild."""
+
+    @pytest.fixture(autouse=True)
+    def small_windows(self, monkeypatch):
+        monkeypatch.setenv("EMBEDDING_REBUILD_WINDOW_SIZE", "2")
+
+    @asynccontextmanager
+    async def rebuild_database(self, model):
+        async with memory_database() as db:
+            for version in (1, 18, 19, 20):
+                migration = AsyncMigration.from_file(
+                    f"open_notebook/database/migrations/{version}.surrealql"
+                )
+                await db.query(migration.sql)
+            await db.query(
+                """
+                FOR $key IN ['a', 'b', 'c'] {
+                    CREATE type::thing('source', $key) SET full_text = $key + ' text';
+                };
+                CREATE note:n SET content = 'note text', embedding = [];
+                CREATE source:empty SET full_text = '';
+                """
+            )
+            with (
+                patch(
+                    "commands.embedding_commands.chunk_text",
+                    side_effect=lambda text, **kwargs: text.split(),
+                ),
+                patch(
+                    "commands.embedding_commands.prepare_vector_indexes",
+                    new=AsyncMock(),
+                ),
+                patch(
+                    "open_notebook.ai.models.model_manager.get_embedding_model",
+                    new=AsyncMock(return_value=model),
+                ),
+            ):
+                yield db
+
+    @pytest.mark.asyncio
+    async def test_rebuild_embeds_windows_in_shared_requests(self):
+        """Chunks of a whole window go to the provider together."""
+        model = fake_embedding_model()
+        async with self.rebuild_database(model) as db:
+            output = await rebuild_embeddings_command(rebuild_input("command:r1"))
+            chunks = await db.query("SELECT content FROM source_embedding")
+            note = await db.query("SELECT embedding FROM note:n")
+            checkpoint = await load_checkpoint("command:r1")
+
+        assert output.success
+        assert (output.total_items, output.processed_items) == (4, 4)
+        assert (output.sources_processed, output.notes_processed) == (3, 1)
+        assert model.calls == [
+            ["a", "text", "b", "text"],
+            ["c", "text"],
+            ["note text"],
+        ]
+        contents = sorted(row["content"] for row in chunks)
+        assert contents == ["a", "b", "c", "text", "text", "text"]
+        assert note[0]["embedding"] == [9.0, 1.0]
+        assert checkpoint.status == "completed"
+        assert (checkpoint.phase, checkpoint.cursor) == ("note", "note:n")
+
+    @pytest.mark.asyncio
+    async def test_interrupted_rebuild_resumes_after_last_window(self):
+        """A new rebuild of the same scope skips the windows already done."""
+        model = fake_embedding_model()
+        embed = model.aembed
+
+        async def fail_on_c(texts):
+            if "c" in texts:
+                raise RuntimeError("connection reset")
+            return await embed(texts)
+
+        async with self.rebuild_database(model):
+            model.aembed = fail_on_c
+            with (
+                patch(
+                    "open_notebook.utils.embedding_batches.backoff_delay",
+                    return_value=0,
+                ),
+                pytest.raises(RuntimeError),
+            ):
+                await rebuild_embeddings_command(rebuild_input("command:r1"))
+            interrupted = await load_checkpoint("command:r1")
+
+            model.aembed = embed
+            output = await rebuild_embeddings_command(rebuild_input("command:r2"))
+            previous = await load_checkpoint("command:r1")
+
+        assert interrupted.status == "failed"
+        assert (interrupted.processed, interrupted.cursor) == (2, "source:b")
+        assert output.success and output.resumed
+        assert model.calls[-2:] == [["c", "text"], ["note text"]]
+        assert (output.total_items, output.processed_items) == (4, 4)
+        assert output.sources_processed == 3
+        assert previous.status == "resumed"
+
+    @pytest.mark.asyncio
+    async def test_huge_sources_are_streamed(self, monkeypatch):
+        """A rebuild never loads the text of a source over the stream threshold."""
+        monkeypatch.setenv("EMBEDDING_STREAM_MIN_CHARS", "10")
+        model = fake_embedding_model()
+        async with self.rebuild_database(model) as db:
+            await db.query("CREATE source:d SET full_text = 'd text and more words'")
+            with patch(
+                "commands.embedding_commands.repo_query",
+                wraps=embedding_repo_query,
+            ) as spy:
+                output = await rebuild_embeddings_command(
+                    rebuild_input("command:r1", include_notes=False)
+                )
+            chunks = await db.query(
+                "SELECT VALUE content FROM source_embedding WHERE source = source:d"
+            )
+
+        assert output.success
+        assert output.sources_processed == 4
+        assert ["d", "text", "and", "more", "words"] in model.calls
+        assert sorted(chunks) == sorted(["d", "text", "and", "more", "words"])
+        loaded = [
+            str(record_id)
+            for call in spy.call_args_list
+            if call.args[0].endswith("FROM $ids")
+            for record_id in call.args[1]["ids"]
+        ]
+        assert sorted(loaded) == ["source:a", "source:b", "source:c"]
+
+    def test_throughput_and_eta(self):
+        started = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        checkpoint = RebuildCheckpoint(
+            scope="all:note",
+            total=100,
+            processed=40,
+            run_processed=30,
+            run_started=started,
+            updated=started + timedelta(seconds=10),
+        )
+
+        assert checkpoint.throughput() == (3.0, 20.0)
+        assert RebuildCheckpoint(scope="all:note").throughput() == (None, None)
+
+
+# ============================================================================
+# TEST SUITE 4: Streaming Source Embedding
+# ============================================================================
+
+
+class TestStreamingSourceEmbedding:
+    """Test suite for embedding huge sources window by window."""
+
+    @pytest.fixture(autouse=True)
+    def small_stream(self, monkeypatch):
+        monkeypatch.setenv("EMBEDDING_STREAM_MIN_CHARS", "20")
+        monkeypatch.setenv("EMBEDDING_STREAM_WINDOW_CHUNKS", "2")
+        monkeypatch.setattr("commands.embedding_commands.STREAM_SEGMENT_CHARS", 16)
+
+    @asynccontextmanager
+    async def streamed_source(self, model, text):
+        async with memory_database() as db:
+            for version in (1, 18, 20):
+                migration = AsyncMigration.from_file(
+                    f"open_notebook/database/migrations/{version}.surrealql"
+                )
+                await db.query(migration.sql)
+            await db.query(
+                "CREATE source:big SET full_text = $text; "
+                "CREATE source_embedding SET source = source:big, order = 0, "
+                "content = 'old', embedding = [1.0, 1.0]",
+                {"text": text},
+            )
+            with (
+                patch(
+                    "commands.embedding_commands.chunk_text",
+                    side_effect=lambda text, **kwargs: text.split(),
+                ),
+                patch(
+                    "commands.embedding_commands.prepare_vector_indexes",
+                    new=AsyncMock(),
+                ),
+                patch(
+                    "open_notebook.ai.models.model_manager.get_embedding_model",
+                    new=AsyncMock(return_value=model),
+                ),
+                patch(
+                    "commands.embedding_commands.Source.get",
+                    new=AsyncMock(side_effect=AssertionError("loaded whole")),
+                ),
+            ):
+                yield db
+
+    @pytest.mark.asyncio
+    async def test_huge_source_is_embedded_in_windows(self):
+        """Chunks are read, embedded and inserted a window at a time."""
+        model = fake_embedding_model()
+        text = "alpha beta\n\ngamma delta\nepsilon zeta eta"
+        async with self.streamed_source(model, text) as db:
+            output = await embed_source_command(
+                EmbedSourceInput(source_id="source:big")
+            )
+            stored = await db.query(
+                "SELECT order, content FROM source_embedding WHERE source = source:big"
+            )
+
+        assert output.success and output.streamed
+        assert output.chunks_created == 7
+        assert all(len(call) <= 2 for call in model.calls)
+        assert [chunk for call in model.calls for chunk in call] == text.split()
+        stored.sort(key=lambda row: row["order"])
+        assert [row["content"] for row in stored] == text.split()
+
+    @pytest.mark.asyncio
+    async def test_retry_continues_after_stored_windows(self):
+        """A failed run keeps the old chunks live; the retry embeds the rest."""
+        model = fake_embedding_model()
+        embed = model.aembed
+
+        async def fail_on_gamma(texts):
+            if "gamma" in texts:
+                raise RuntimeError("invalid input")
+            return await embed(texts)
+
+        model.aembed = fail_on_gamma
+        text = "alpha beta gamma delta epsilon"
+        async with self.streamed_source(model, text) as db:
+            with pytest.raises(RuntimeError, match="invalid input"):
+                await embed_source_command(EmbedSourceInput(source_id="source:big"))
+            live = await db.query("SELECT VALUE content FROM source_embedding")
+            staged = await db.query(
+                "SELECT VALUE content FROM source_embedding_staging"
+            )
+
+            model.aembed = embed
+            output = await embed_source_command(
+                EmbedSourceInput(source_id="source:big")
+            )
+            stored = await db.query("SELECT order, content FROM source_embedding")
+            leftover = await db.query("SELECT * FROM source_embedding_staging")
+
+        assert live == ["old"]
+        assert sorted(staged) == ["alpha", "beta"]
+        assert (output.chunks_created, output.chunks_reused) == (5, 2)
+        assert model.calls == [["alpha", "beta"], ["gamma", "delta"], ["epsilon"]]
+        stored.sort(key=lambda row: row["order"])
+        assert [row["content"] for row in stored] == text.split()
+        assert leftover == []
+
+    @pytest.mark.asyncio
+    async def test_small_source_is_staged_in_windows(self, monkeypatch):
+        """Sources below the threshold are staged, resumed and published too."""
+        monkeypatch.setenv("EMBEDDING_STREAM_MIN_CHARS", "0")
+        model = fake_embedding_model()
+        embed = model.aembed
+
+        async def fail_on_gamma(texts):
+            if "gamma" in texts:
+                raise RuntimeError("invalid input")
+            return await embed(texts)
+
+        model.aembed = fail_on_gamma
+        text = "alpha beta gamma delta epsilon"
+        async with self.streamed_source(model, text) as db:
+            with (
+                patch(
+                    "commands.embedding_commands.Source.get",
+                    new=AsyncMock(return_value=Source(title="big", full_text=text)),
+                ),
+                patch(
+                    "commands.embedding_commands.repo_batch",
+                    wraps=embedding_repo_batch,
+                ) as spy,
+            ):
+                with pytest.raises(RuntimeError, match="invalid input"):
+                    await embed_source_command(
+                        EmbedSourceInput(source_id="source:big")
+                    )
+                live = await db.query("SELECT VALUE content FROM source_embedding")
+
+                model.aembed = embed
+                output = await embed_source_command(
+                    EmbedSourceInput(source_id="source:big")
+                )
+            stored = await db.query("SELECT order, content FROM source_embedding")
+            leftover = await db.query("SELECT * FROM source_embedding_staging")
+
+        assert live == ["old"]
+        assert output.success and not output.streamed
+        assert model.calls == [["alpha", "beta"], ["gamma", "delta"], ["epsilon"]]
+        stored.sort(key=lambda row: row["order"])
+        assert [row["content"] for row in stored] == text.split()
+        assert leftover == []
+        # Published a window per transaction
+        published = [
+            call.args[0]
+            for call in spy.call_args_list
+            if call.kwargs.get("transaction")
+        ]
+        assert [len(statements[0][1]["staged"]) for statements in published] == [
+            2,
+            2,
+            1,
+        ]
+
+    @pytest.mark.asyncio
+    async def test_numpy_index_is_updated_per_window(self, monkeypatch):
+        """Vectors reach the NumPy index a window at a time, never all at once."""
+        monkeypatch.setenv("VECTOR_SEARCH_BACKEND", "numpy")
+        model = fake_embedding_model()
+        text = "alpha beta gamma delta epsilon"
+        update, remove = AsyncMock(), AsyncMock()
+        async with self.streamed_source(model, text):
+            with (
+                patch("commands.embedding_commands.update_numpy_index", new=update),
+                patch(
+                    "commands.embedding_commands.remove_rows_from_numpy_index",
+                    new=remove,
+                ),
+            ):
+                await embed_source_command(EmbedSourceInput(source_id="source:big"))
+
+        windows = [call.args for call in update.call_args_list]
+        assert [len(ids) for _, ids, _ in windows] == [2, 2, 1]
+        assert all(call.kwargs == {"append": True} for call in update.call_args_list)
+        assert {group for group, *_ in windows} == {"source:big"}
+        assert [v[0] for _, _, vectors in windows for v in vectors] == [
+            float(len(word)) for word in text.split()
+        ]
+        # The old chunk leaves the index once the new ones are in
+        removed = [rid for call in remove.call_args_list for rid in call.args[1]]
+        assert len(removed) == 1
@@ -6,9 +6,11 @@ without heavy mocking of the actual processing logic.
 """
 
 from datetime import datetime
+from unittest.mock import AsyncMock, patch
 
 import pytest
 
+from open_notebook.graphs.ask import Search, Strategy, run_searches, trigger_queries
 from open_notebook.graphs.prompt import PatternChainState, graph
 from open_notebook.graphs.tools import get_current_timestamp
 from open_notebook.graphs.transformation import (
@@ -151,5 +153,52 @@ class TestTransformationGraph:
         assert hasattr(transformation_graph, "ainvoke")
 
 
+
+# ============================================================================
+# TEST SUITE 4: Ask Graph
+# ============================================================================
+
+
+class TestAskGraph:
+    """Test suite for the ask graph's search fan-out."""
+
+    @pytest.mark.asyncio
+    async def test_strategy_searches_run_in_one_batch(self):
+        strategy = Strategy(
+            reasoning="",
+            searches=[
+                Search(term="alpha", instructions="a"),
+                Search(term="beta", instructions="b"),
+            ],
+        )
+        state = {"question": "q", "strategy": strategy}
+        with patch(
+            "open_notebook.graphs.ask.batch_vector_search",
+            new_callable=AsyncMock,
+            return_value=[[{"id": "note:a"}], []],
+        ) as batch:
+            update = await run_searches(state, {"configurable": {}})
+
+        batch.assert_awaited_once_with(["alpha", "beta"], 10, True, True)
+        sends = await trigger_queries({**state, **update}, {})
+        assert [send.arg["results"] for send in sends] == [[{"id": "note:a"}], []]
+
+    @pytest.mark.asyncio
+    async def test_hybrid_searches_run_per_branch(self):
+        strategy = Strategy(
+            reasoning="", searches=[Search(term="alpha", instructions="")]
+        )
+        state = {"question": "q", "strategy": strategy}
+        config = {"configurable": {"search_type": "hybrid"}}
+        with patch(
+            "open_notebook.graphs.ask.batch_vector_search", new_callable=AsyncMock
+        ) as batch:
+            update = await run_searches(state, config)
+
+        batch.assert_not_awaited()
+        sends = await trigger_queries({**state, **update}, config)
+        assert "results" not in sends[0].arg
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,1344 @@
+"""
+Unit tests for the open_notebook.database package.
+
+Covers the connection pool, repository helpers and result decoding without a
+running SurrealDB.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from surrealdb import AsyncSurreal, RecordID
+
+from open_notebook.database import numpy_index, vector_index
+from open_notebook.database.async_migrate import AsyncMigration
+from open_notebook.database.loader import get_current_loader, record_loader
+from open_notebook.database.numpy_index import NumpyVectorIndex
+from open_notebook.database.pool import ConnectionPool
+from open_notebook.database.query_stats import (
+    QueryStats,
+    estimate_payload_size,
+    normalize_query,
+)
+from open_notebook.database.record_cache import RecordCache
+from open_notebook.database.repository import (
+    _build_batch_query,
+    get_connection_pool,
+    parse_record_ids,
+    repo_batch,
+    repo_query,
+    repo_stream,
+    run_and_close_pool,
+)
+from open_notebook.database.write_coordinator import WriteCoordinator
+from open_notebook.domain.notebook import repo_batch as notebook_repo_batch
+from open_notebook.domain.notebook import repo_query as notebook_repo_query
+from open_notebook.domain.notebook import (
+    batch_vector_search,
+    text_search,
+    vector_search,
+)
+
+
+class FakeConnection:
+    """Minimal stand-in for an AsyncSurreal connection."""
+
+    def __init__(self, healthy: bool = True):
+        self.healthy = healthy
+        self.closed = False
+        self.queries = []
+
+    async def query(self, query, vars=None):
+        self.queries.append(query)
+        if not self.healthy:
+            raise ConnectionError("socket closed")
+        return [{"ok": True}]
+
+    async def close(self):
+        self.closed = True
+
+
+def make_factory(created):
+    async def factory():
+        connection = FakeConnection()
+        created.append(connection)
+        return connection
+
+    return factory
+
+
+# ============================================================================
+# TEST SUITE 1: Connection Pool
+# ============================================================================
+
+
+class TestConnectionPool:
+    """Test suite for the async connection pool."""
+
+    @pytest.mark.asyncio
+    async def test_connection_is_reused(self):
+        """Sequential checkouts reuse the same connection."""
+        created = []
+        pool = ConnectionPool(make_factory(created), max_size=2)
+
+        async with pool.connection() as first:
+            pass
+        async with pool.connection() as second:
+            pass
+
+        assert first is second
+        assert len(created) == 1
+        assert pool.stats()["idle"] == 1
+
+    @pytest.mark.asyncio
+    async def test_backpressure_when_exhausted(self):
+        """Callers wait for a free connection instead of opening more."""
+        created = []
+        pool = ConnectionPool(make_factory(created), max_size=1, acquire_timeout=1)
+
+        held = await pool.acquire()
+        waiter = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        assert pool.stats()["waiting"] == 1
+
+        await pool.release(held)
+        assert await waiter is held
+        assert len(created) == 1
+
+    @pytest.mark.asyncio
+    async def test_acquire_timeout(self):
+        """Acquire raises once the timeout elapses with no free connection."""
+        pool = ConnectionPool(make_factory([]), max_size=1, acquire_timeout=0.05)
+        await pool.acquire()
+        with pytest.raises(RuntimeError, match="Timed out"):
+            await pool.acquire()
+
+    @pytest.mark.asyncio
+    async def test_connection_error_discards_connection(self):
+        """A connection-level failure closes the connection and replaces it."""
+        created = []
+        pool = ConnectionPool(make_factory(created), max_size=1)
+
+        with pytest.raises(ConnectionError):
+            async with pool.connection():
+                raise ConnectionError("boom")
+
+        assert created[0].closed
+        async with pool.connection() as connection:
+            assert connection is created[1]
+
+    @pytest.mark.asyncio
+    async def test_connection_error_drops_idle_connections(self):
+        """Idle connections, likely broken by the same restart, are dropped."""
+        created = []
+        pool = ConnectionPool(make_factory(created), max_size=2)
+        first, second = await pool.acquire(), await pool.acquire()
+        await pool.release(first)
+        await pool.release(second)
+
+        with pytest.raises(ConnectionError):
+            async with pool.connection() as connection:
+                assert connection is second
+                raise ConnectionError("boom")
+
+        assert first.closed and second.closed
+        assert pool.stats()["idle"] == 0
+
+    @pytest.mark.asyncio
+    async def test_read_retried_on_fresh_connection(self):
+        """A broken connection does not fail an idempotent read."""
+        created = []
+        pool = ConnectionPool(make_factory(created), max_size=1)
+        async with pool.connection():
+            pass
+        created[0].healthy = False
+
+        with patch(
+            "open_notebook.database.repository.get_connection_pool",
+            return_value=pool,
+        ):
+            assert await repo_query("RETURN true", idempotent=True) == [{"ok": True}]
+
+        assert created[0].closed
+        assert created[1].queries == ["RETURN true"]
+
+    @pytest.mark.asyncio
+    async def test_write_not_retried_after_it_was_sent(self):
+        """A statement that may have run is not sent a second time."""
+        created = []
+        pool = ConnectionPool(make_factory(created), max_size=1)
+        async with pool.connection():
+            pass
+        created[0].healthy = False
+
+        with (
+            patch(
+                "open_notebook.database.repository.get_connection_pool",
+                return_value=pool,
+            ),
+            pytest.raises(ConnectionError),
+        ):
+            await repo_query("CREATE note")
+
+        assert len(created) == 1
+
+    @pytest.mark.asyncio
+    async def test_closed_idle_connection_replaced_before_use(self):
+        """A connection whose socket closed while idle is never handed out."""
+        created = []
+        pool = ConnectionPool(make_factory(created), max_size=1)
+        async with pool.connection():
+            pass
+        recv_task = asyncio.get_running_loop().create_future()
+        recv_task.set_result(None)
+        created[0].recv_task = recv_task
+
+        with patch(
+            "open_notebook.database.repository.get_connection_pool",
+            return_value=pool,
+        ):
+            assert await repo_query("CREATE note") == [{"ok": True}]
+
+        assert created[0].closed and created[0].queries == []
+        assert created[1].queries == ["CREATE note"]
+
+    def test_run_and_close_pool(self):
+        """asyncio.run() callers close the pool of their throwaway loop."""
+
+        async def use_pool():
+            return get_connection_pool()
+
+        pool = asyncio.run(run_and_close_pool(use_pool()))
+
+        with pytest.raises(RuntimeError, match="closed"):
+            asyncio.run(pool.acquire())
+
+    @pytest.mark.asyncio
+    async def test_query_error_keeps_connection(self):
+        """Server-side query errors do not discard a healthy connection."""
+        created = []
+        pool = ConnectionPool(make_factory(created), max_size=1)
+
+        with pytest.raises(RuntimeError):
+            async with pool.connection():
+                raise RuntimeError("Transaction conflict")
+
+        assert not created[0].closed
+        assert pool.stats()["idle"] == 1
+
+    @pytest.mark.asyncio
+    async def test_unhealthy_idle_connection_replaced(self):
+        """Idle connections failing the health check are reconnected."""
+        created = []
+        pool = ConnectionPool(
+            make_factory(created), max_size=1, health_check_interval=0
+        )
+
+        async with pool.connection():
+            pass
+        created[0].healthy = False
+
+        async with pool.connection() as connection:
+            assert connection is created[1]
+        assert created[0].closed
+
+    @pytest.mark.asyncio
+    async def test_close_pool(self):
+        """Closing the pool closes idle connections and rejects new checkouts."""
+        created = []
+        pool = ConnectionPool(make_factory(created), max_size=2)
+        async with pool.connection():
+            pass
+
+        await pool.close()
+        assert created[0].closed
+        with pytest.raises(RuntimeError, match="closed"):
+            await pool.acquire()
+
+
+# ============================================================================
+# TEST SUITE 2: Batched Execution
+# ============================================================================
+
+
+class RawQueryConnection:
+    """Connection stand-in that answers query_raw with a canned response."""
+
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+
+    async def query_raw(self, query, vars=None):
+        self.calls.append((query, vars))
+        return self.response
+
+
+def patch_connection(connection):
+    @asynccontextmanager
+    async def fake_db_connection():
+        yield connection
+
+    return patch(
+        "open_notebook.database.repository.db_connection", fake_db_connection
+    )
+
+
+class TestRepoBatch:
+    """Test suite for repo_batch."""
+
+    def test_build_batch_query_prefixes_vars(self):
+        """Vars with the same name in different statements do not collide."""
+        query, vars = _build_batch_query(
+            [
+                ("DELETE source_embedding WHERE source = $id;", {"id": 1}),
+                ("DELETE $id", {"id": 2}),
+                ("SELECT * FROM note WHERE $value > 0", None),
+            ],
+            transaction=False,
+        )
+        assert query == (
+            "DELETE source_embedding WHERE source = $b0_id;\n"
+            "DELETE $b1_id;\n"
+            "SELECT * FROM note WHERE $value > 0;"
+        )
+        assert vars == {"b0_id": 1, "b1_id": 2}
+
+    def test_build_batch_query_transaction(self):
+        """Transactions wrap the statements in BEGIN/COMMIT."""
+        query, _ = _build_batch_query([("DELETE $id", {"id": 1})], transaction=True)
+        assert query.startswith("BEGIN TRANSACTION;")
+        assert query.endswith("COMMIT TRANSACTION;")
+
+    @pytest.mark.asyncio
+    async def test_returns_result_per_statement(self):
+        """Each statement's result is returned in order."""
+        connection = RawQueryConnection(
+            {
+                "result": [
+                    {"status": "OK", "result": []},
+                    {"status": "OK", "result": [{"id": "note:1"}]},
+                ]
+            }
+        )
+        with patch_connection(connection):
+            results = await repo_batch(
+                [("DELETE $id", {"id": 1}), ("SELECT * FROM note", None)]
+            )
+        assert results == [[], [{"id": "note:1"}]]
+        assert len(connection.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_transaction_surfaces_cause(self):
+        """The statement that failed is reported, not the cascade errors."""
+        connection = RawQueryConnection(
+            {
+                "result": [
+                    {
+                        "status": "ERR",
+                        "result": "The query was not executed due to a failed transaction",
+                    },
+                    {"status": "ERR", "result": "Transaction conflict: resource busy"},
+                ]
+            }
+        )
+        with patch_connection(connection):
+            with pytest.raises(RuntimeError, match="Transaction conflict"):
+                await repo_batch(
+                    [("DELETE $a", {"a": 1}), ("DELETE $b", {"b": 2})],
+                    transaction=True,
+                )
+
+    @pytest.mark.asyncio
+    async def test_empty_batch(self):
+        """An empty batch does not touch the database."""
+        assert await repo_batch([]) == []
+
+
+# ============================================================================
+# TEST SUITE 3: Result Decoding
+# ============================================================================
+
+
+def legacy_parse_record_ids(obj):
+    """The original fully recursive decoder, the reference output."""
+    if isinstance(obj, dict):
+        return {k: legacy_parse_record_ids(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [legacy_parse_record_ids(item) for item in obj]
+    elif isinstance(obj, RecordID):
+        return str(obj)
+    return obj
+
+
+def make_embedding_rows(count, dimensions=1536):
+    return [
+        {
+            "id": RecordID("source_embedding", idx),
+            "source": RecordID("source", idx % 10),
+            "order": idx,
+            "content": "lorem ipsum " * 100,
+            "embedding": [float(i % 7) / 7 for i in range(dimensions)],
+        }
+        for idx in range(count)
+    ]
+
+
+def make_source_rows(count, text_size=2_000_000):
+    return [
+        {
+            "id": RecordID("source", idx),
+            "title": f"Source {idx}",
+            "topics": ["a", "b"],
+            "asset": {"file_path": None, "url": "https://example.com"},
+            "command": RecordID("command", idx),
+            "full_text": "x" * text_size,
+        }
+        for idx in range(count)
+    ]
+
+
+class TestParseRecordIds:
+    """Test suite for RecordID decoding."""
+
+    def test_nested_record_ids_converted(self):
+        """RecordIDs are converted at any depth."""
+        result = parse_record_ids(
+            [{"id": RecordID("note", 1), "refs": [{"out": RecordID("notebook", 2)}]}]
+        )
+        assert result == [{"id": "note:1", "refs": [{"out": "notebook:2"}]}]
+
+    def test_numeric_arrays_not_copied(self):
+        """Embedding arrays are returned as the same object."""
+        embedding = [0.1, 0.2, 0.3]
+        row = {"id": RecordID("note", 1), "embedding": embedding}
+        parse_record_ids([row])
+        assert row["embedding"] is embedding
+
+    def test_declared_fields_only(self):
+        """Only the declared fields are decoded when fields are given."""
+        row = {"id": RecordID("note", 1), "other": RecordID("note", 2)}
+        parse_record_ids([row], fields=["id"])
+        assert row["id"] == "note:1"
+        assert isinstance(row["other"], RecordID)
+
+    def test_matches_legacy_output(self):
+        """Output is identical to the original recursive implementation."""
+        def make_rows():
+            return make_embedding_rows(5, dimensions=8) + make_source_rows(2, 100)
+
+        assert parse_record_ids(make_rows()) == legacy_parse_record_ids(make_rows())
+
+
+# ============================================================================
+# TEST SUITE 4: Streaming Cursor
+# ============================================================================
+
+
+@asynccontextmanager
+async def memory_database():
+    """Route repository calls to an embedded in-memory SurrealDB."""
+    connection = AsyncSurreal("mem://")
+    await connection.connect()
+    await connection.use("test", "test")
+
+    @asynccontextmanager
+    async def memory_db_connection():
+        yield connection
+
+    try:
+        with patch(
+            "open_notebook.database.repository.db_connection", memory_db_connection
+        ):
+            yield connection
+    finally:
+        await connection.close()
+
+
+class TestRepoStream:
+    """Test suite for repo_stream keyset pagination."""
+
+    @pytest.mark.asyncio
+    async def test_streams_all_rows_in_pages(self):
+        """Every matching row is yielded exactly once, in id order."""
+        async with memory_database() as db:
+            await db.query(
+                "FOR $i IN $ids { CREATE type::thing('note', $i) SET n = $i % 4 };",
+                {"ids": list(range(1, 26))},
+            )
+            rows = [
+                row
+                async for row in repo_stream(
+                    "note", where="n != $skip", vars={"skip": 0}, page_size=4
+                )
+            ]
+
+        ids = [row["id"] for row in rows]
+        assert len(ids) == 19
+        assert len(set(ids)) == 19
+        assert ids == [f"note:{i}" for i in range(1, 26) if i % 4 != 0]
+
+    @pytest.mark.asyncio
+    async def test_streams_by_ordering_column(self):
+        """Paging on a non-unique column does not skip or repeat ties."""
+        async with memory_database() as db:
+            await db.query(
+                "FOR $i IN $ids { CREATE type::thing('note', $i) SET n = $i % 3 };",
+                {"ids": list(range(1, 11))},
+            )
+            rows = [
+                row
+                async for row in repo_stream(
+                    "note", fields="id, n", order_by="n", page_size=3
+                )
+            ]
+
+        assert [row["n"] for row in rows] == sorted(row["n"] for row in rows)
+        assert len({row["id"] for row in rows}) == 10
+
+    @pytest.mark.asyncio
+    async def test_resumes_after_record(self):
+        """Streaming after a record continues with the rows that follow it."""
+        async with memory_database() as db:
+            await db.query(
+                "FOR $key IN $keys { CREATE type::thing('note', $key) };",
+                {"keys": ["a", "b", "c", "d", "e"]},
+            )
+            rows = [
+                row async for row in repo_stream("note", page_size=2, after="note:b")
+            ]
+
+        assert [row["id"] for row in rows] == ["note:c", "note:d", "note:e"]
+
+    @pytest.mark.asyncio
+    async def test_invalid_page_size(self):
+        """A page size below one is rejected."""
+        with pytest.raises(ValueError):
+            async for _ in repo_stream("note", page_size=0):
+                pass
+
+
+# ============================================================================
+# TEST SUITE 5: Write Coordinator
+# ============================================================================
+
+
+class TestWriteCoordinator:
+    """Test suite for per-record write serialization and MERGE coalescing."""
+
+    @pytest.mark.asyncio
+    async def test_writes_to_same_record_do_not_overlap(self):
+        """Writes sharing a key run one at a time."""
+        coordinator = WriteCoordinator()
+        active = 0
+        max_active = 0
+
+        async def write():
+            nonlocal active, max_active
+            async with coordinator.serialize("source:1"):
+                active += 1
+                max_active = max(max_active, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(write() for _ in range(5)))
+        assert max_active == 1
+        assert coordinator.stats()["locked_keys"] == 0
+
+    @pytest.mark.asyncio
+    async def test_writes_to_different_records_run_in_parallel(self):
+        """Different keys are not serialized against each other."""
+        coordinator = WriteCoordinator()
+        active = 0
+        max_active = 0
+
+        async def write(key):
+            nonlocal active, max_active
+            async with coordinator.serialize(key):
+                active += 1
+                max_active = max(max_active, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(write(f"source:{i}") for i in range(5)))
+        assert max_active == 5
+
+    @pytest.mark.asyncio
+    async def test_pending_merges_are_coalesced(self):
+        """Updates queued behind a busy record are sent as one MERGE."""
+        coordinator = WriteCoordinator()
+        executed = []
+
+        async def execute(data):
+            executed.append(dict(data))
+            await asyncio.sleep(0.01)
+            return [data]
+
+        first = asyncio.create_task(
+            coordinator.merge("source:1", {"title": "a"}, execute)
+        )
+        await asyncio.sleep(0)
+        results = await asyncio.gather(
+            coordinator.merge("source:1", {"title": "b"}, execute),
+            coordinator.merge("source:1", {"asset": {"url": "u"}}, execute),
+            coordinator.merge("source:1", {"asset": {"file_path": "f"}}, execute),
+        )
+        await first
+
+        assert executed == [
+            {"title": "a"},
+            {"title": "b", "asset": {"url": "u", "file_path": "f"}},
+        ]
+        assert all(result is results[0] for result in results)
+        assert coordinator.coalesced == 2
+
+    @pytest.mark.asyncio
+    async def test_merge_error_reaches_every_caller(self):
+        """A failed combined MERGE raises in every caller folded into it."""
+        coordinator = WriteCoordinator()
+
+        async def slow(data):
+            await asyncio.sleep(0.01)
+            return data
+
+        async def failing(data):
+            raise RuntimeError("Transaction conflict")
+
+        first = asyncio.create_task(coordinator.merge("note:1", {"a": 1}, slow))
+        await asyncio.sleep(0)
+        results = await asyncio.gather(
+            coordinator.merge("note:1", {"b": 2}, failing),
+            coordinator.merge("note:1", {"c": 3}, failing),
+            return_exceptions=True,
+        )
+        await first
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+
+# ============================================================================
+# TEST SUITE 6: Query Statistics
+# ============================================================================
+
+
+class TestQueryStats:
+    """Test suite for per-template query latency statistics."""
+
+    def test_normalize_query_collapses_literals(self):
+        """Literals, record ids and whitespace do not split templates."""
+        first = normalize_query("UPDATE source:abc MERGE $data;")
+        second = normalize_query("UPDATE  source:⟨x-y⟩\n MERGE $data")
+        assert first == second == "UPDATE source:? MERGE $data"
+
+        assert normalize_query(
+            "SELECT * FROM note WHERE title = 'a' AND n > 10 LIMIT 5"
+        ) == normalize_query(
+            'SELECT * FROM note WHERE title = "bb" AND n > 2 LIMIT 50'
+        )
+        assert normalize_query("DELETE note WHERE id IN [1, 2, 3]") == (
+            "DELETE note WHERE id IN [?]"
+        )
+
+    def test_normalize_query_keeps_functions_and_vars(self):
+        """Function paths and $variables are part of the template."""
+        template = normalize_query(
+            "SELECT * FROM fn::vector_search($embed, 10, true, $min_1)"
+        )
+        assert template == "SELECT * FROM fn::vector_search($embed, ?, true, $min_1)"
+
+    def test_record_aggregates_per_template(self):
+        """Calls, errors, rows and payload sizes are aggregated per template."""
+        stats = QueryStats(slow_query_ms=0)
+        stats.record("SELECT * FROM source:a", 2.0, [{"id": "source:a"}])
+        stats.record("SELECT * FROM source:b", 40.0, [{"id": "x"}, {"id": "y"}])
+        stats.record("SELECT * FROM source:c", 700.0, error=True)
+
+        [entry] = stats.snapshot()["templates"]
+        assert entry["template"] == "SELECT * FROM source:?"
+        assert entry["calls"] == 3
+        assert entry["errors"] == 1
+        assert entry["rows"] == 3
+        assert entry["payload_bytes"] > 0
+        assert entry["max_ms"] == 700.0
+        assert entry["p50_ms"] == 50
+        assert sum(entry["histogram"].values()) == 3
+
+    def test_embedding_payloads_are_sized_without_walking(self):
+        """Numeric arrays are estimated from their length."""
+        assert estimate_payload_size([0.5] * 1000) == 2 + 1000 * 9
+
+    def test_slow_queries_are_logged(self):
+        """Round trips over the threshold are logged as warnings."""
+        stats = QueryStats(slow_query_ms=100)
+        with patch("open_notebook.database.query_stats.logger") as mock_logger:
+            stats.record("SELECT * FROM note", 50.0)
+            mock_logger.warning.assert_not_called()
+            stats.record("SELECT * FROM note", 150.0)
+            mock_logger.warning.assert_called_once()
+            assert "SELECT * FROM note" in mock_logger.warning.call_args[0][0]
+
+    def test_template_count_is_bounded(self):
+        """Templates beyond the limit share an overflow entry."""
+        stats = QueryStats(slow_query_ms=0, max_templates=2)
+        for table in ("a", "b", "c", "d"):
+            stats.record(f"SELECT * FROM {table}", 1.0)
+
+        templates = {e["template"]: e for e in stats.snapshot()["templates"]}
+        assert len(templates) == 3
+        assert templates["<other>"]["calls"] == 2
+
+    def test_track_records_errors(self):
+        """A failing round trip is counted and re-raised."""
+        stats = QueryStats(slow_query_ms=0)
+        with pytest.raises(RuntimeError):
+            with stats.track("SELECT * FROM note"):
+                raise RuntimeError("boom")
+        assert stats.snapshot()["templates"][0]["errors"] == 1
+
+    def test_disabled_stats_record_nothing(self):
+        stats = QueryStats(enabled=False)
+        with stats.track("SELECT * FROM note") as timer:
+            timer.set_result([{"id": 1}])
+        assert stats.snapshot()["templates"] == []
+
+    @pytest.mark.asyncio
+    async def test_repo_query_is_instrumented(self):
+        """repo_query reports each round trip with its row count."""
+        stats = QueryStats(slow_query_ms=0)
+        with patch(
+            "open_notebook.database.repository.get_query_stats", return_value=stats
+        ):
+            async with memory_database() as db:
+                await db.query("CREATE note:1 SET n = 1; CREATE note:2 SET n = 2;")
+                await repo_query("SELECT * FROM note WHERE n > $n", {"n": 0})
+                await repo_query("SELECT * FROM note WHERE n > $n", {"n": 1})
+
+        [entry] = stats.snapshot()["templates"]
+        assert entry["template"] == "SELECT * FROM note WHERE n > $n"
+        assert entry["calls"] == 2
+        assert entry["rows"] == 3
+
+    def test_query_stats_endpoint(self):
+        """The API exposes the aggregates and can reset them."""
+        from fastapi.testclient import TestClient
+
+        from api.main import app
+
+        stats = QueryStats(slow_query_ms=0)
+        stats.record("SELECT * FROM source:a", 5.0, [{"id": "source:a"}])
+        stats.record("SELECT * FROM note", 1.0, [])
+        client = TestClient(app)
+        with patch("api.routers.database.get_query_stats", return_value=stats):
+            response = client.get("/api/database/query-stats?sort_by=calls&limit=1")
+            assert response.status_code == 200
+            body = response.json()
+            assert len(body["templates"]) == 1
+            assert body["pool"]["max_size"] >= 1
+
+            assert client.delete("/api/database/query-stats").status_code == 200
+            assert client.get("/api/database/query-stats").json()["templates"] == []
+
+
+# ============================================================================
+# TEST SUITE 7: Record Cache
+# ============================================================================
+
+
+class TestRecordCache:
+    """Test suite for the in-process read-through record cache."""
+
+    def test_returns_copies(self):
+        """Mutating a returned row does not change the cached one."""
+        cache = RecordCache()
+        cache.put("source:1", {"id": "source:1", "topics": ["a"]}, ttl=60)
+        row = cache.get("source:1")
+        row["topics"].append("b")
+        assert cache.get("source:1")["topics"] == ["a"]
+
+    def test_entries_expire(self):
+        cache = RecordCache()
+        cache.put("source:1", {"id": "source:1"}, ttl=60)
+        with patch(
+            "open_notebook.database.record_cache.time.monotonic",
+            return_value=time.monotonic() + 61,
+        ):
+            assert cache.get("source:1") is None
+
+    def test_lru_eviction(self):
+        """The least recently used row is evicted first."""
+        cache = RecordCache(max_entries=2)
+        cache.put("note:1", {"n": 1}, ttl=60)
+        cache.put("note:2", {"n": 2}, ttl=60)
+        cache.get("note:1")
+        cache.put("note:3", {"n": 3}, ttl=60)
+        assert cache.get("note:2") is None
+        assert cache.get("note:1") == {"n": 1}
+
+    def test_large_fields_are_budgeted_separately(self):
+        """Large strings count against a byte budget, not the row limit."""
+        cache = RecordCache(large_field_bytes=10, large_max_bytes=25)
+        cache.put("source:1", {"title": "t", "full_text": "x" * 20}, ttl=60)
+        assert cache.get("source:1")["full_text"] == "x" * 20
+        assert cache.stats()["large_bytes"] == 20
+
+        # Evicts source:1's full_text, which turns source:1 into a miss
+        cache.put("source:2", {"title": "t", "full_text": "y" * 20}, ttl=60)
+        assert cache.stats()["large_bytes"] == 20
+        assert cache.get("source:1") is None
+        assert cache.get("source:2")["full_text"] == "y" * 20
+
+    def test_large_fields_measured_in_bytes(self):
+        """Multi-byte text counts its encoded size against the budgets."""
+        cache = RecordCache(large_field_bytes=10, large_max_bytes=40)
+        cache.put("source:1", {"full_text": "é" * 8}, ttl=60)
+        assert cache.stats()["large_bytes"] == 16
+
+    def test_oversized_row_stores_none_of_its_fields(self):
+        """A row over the budget leaves no large fields behind."""
+        cache = RecordCache(large_field_bytes=10, large_max_bytes=25)
+        cache.put("source:1", {"summary": "x" * 20, "full_text": "y" * 20}, ttl=60)
+        assert cache.get("source:1") is None
+        assert cache.stats()["large_bytes"] == 0
+        assert cache.stats()["large_fields"] == 0
+
+    def test_invalidation_rejects_racing_reads(self):
+        """A read that started before a write does not repopulate the cache."""
+        cache = RecordCache()
+        version = cache.version("source:1")
+        cache.invalidate("source:1")
+        cache.put("source:1", {"title": "stale"}, ttl=60, version=version)
+        assert cache.get("source:1") is None
+
+    @pytest.mark.asyncio
+    async def test_get_is_served_from_cache_until_update(self):
+        """ObjectModel.get hits the cache; repo_update invalidates it."""
+        from open_notebook.domain.notebook import Notebook
+
+        async with memory_database() as db:
+            await db.query("CREATE notebook:a SET name = 'One', description = ''")
+            stats = QueryStats(slow_query_ms=0)
+            with patch(
+                "open_notebook.database.repository.get_query_stats",
+                return_value=stats,
+            ):
+                first = await Notebook.get("notebook:a")
+                second = await Notebook.get("notebook:a")
+                assert first.name == second.name == "One"
+                assert stats.snapshot()["templates"][0]["calls"] == 1
+
+                second.name = "Two"
+                await second.save()
+                third = await Notebook.get("notebook:a")
+
+        assert third.name == "Two"
+
+
+# ============================================================================
+# TEST SUITE 8: Batched Record Loading
+# ============================================================================
+
+
+class TestRecordLoader:
+    """Test suite for request-scoped batching of ObjectModel.get()."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_gets_share_one_query(self):
+        """Lookups made in the same tick are fetched with one deduplicated query."""
+        from open_notebook.domain.notebook import Note
+
+        async with memory_database() as db:
+            await db.query(
+                "FOR $i IN $ids { CREATE type::thing('note', $i) SET content = 'c' };",
+                {"ids": ["a", "b", "c"]},
+            )
+            stats = QueryStats(slow_query_ms=0)
+            with patch(
+                "open_notebook.database.repository.get_query_stats",
+                return_value=stats,
+            ):
+                async with record_loader() as loader:
+                    notes = await asyncio.gather(
+                        *(Note.get(f"note:{i}") for i in ["a", "b", "c", "a"])
+                    )
+
+        assert [note.id for note in notes] == ["note:a", "note:b", "note:c", "note:a"]
+        [entry] = stats.snapshot()["templates"]
+        assert entry["template"] == "SELECT * FROM $ids"
+        assert entry["calls"] == 1
+        assert loader.stats() == {"requested": 4, "batches": 1}
+
+    @pytest.mark.asyncio
+    async def test_get_many_keeps_order_and_skips_missing(self):
+        from open_notebook.domain.notebook import Note
+
+        async with memory_database() as db:
+            await db.query(
+                "CREATE note:a SET content = 'a'; CREATE note:b SET content = 'b';"
+            )
+            notes = await Note.get_many(["note:b", "note:missing", "note:a"])
+
+        assert [note.id for note in notes] == ["note:b", "note:a"]
+
+    @pytest.mark.asyncio
+    async def test_without_scope_get_queries_directly(self):
+        from open_notebook.domain.notebook import Note
+
+        async with memory_database() as db:
+            await db.query("CREATE note:a SET content = 'a'")
+            assert get_current_loader() is None
+            note = await Note.get("note:a")
+
+        assert note.content == "a"
+
+    @pytest.mark.asyncio
+    async def test_linked_model_counts_in_one_query(self):
+        """Credential model counts are grouped in a single query."""
+        from open_notebook.domain.credential import Credential
+
+        async with memory_database() as db:
+            await db.query(
+                """
+                CREATE model:1 SET name = 'a', credential = credential:x;
+                CREATE model:2 SET name = 'b', credential = credential:x;
+                CREATE model:3 SET name = 'c', credential = credential:y;
+                """
+            )
+            counts = await Credential.get_linked_model_counts(
+                ["credential:x", "credential:y", "credential:z"]
+            )
+
+        assert counts == {"credential:x": 2, "credential:y": 1}
+
+
+# ============================================================================
+# TEST SUITE 9: Vector Indexes
+# ============================================================================
+
+
+@asynccontextmanager
+async def vector_database():
+    """In-memory database with migration 16 applied and fresh index state."""
+    vector_index._forget_index_state()
+    vector_index._failed_at.clear()
+    async with memory_database() as db:
+        await db.query(
+            """
+            CREATE source:a SET title = 'Source A';
+            CREATE source_embedding:alpha SET source = source:a, order = 0,
+                content = 'alpha', embedding = [1.0, 0.0, 0.0];
+            CREATE source_embedding:beta SET source = source:a, order = 1,
+                content = 'beta', embedding = [0.0, 1.0, 0.0];
+            CREATE note:x SET title = 'Note X', content = 'x',
+                embedding = [0.9, 0.1, 0.0];
+            CREATE note:y SET title = 'Note Y', content = 'y',
+                embedding = [0.0, 0.0, 1.0];
+            CREATE note:z SET title = 'Note Z', content = 'z', embedding = [];
+            CREATE source_embedding:empty SET source = source:a, order = 2,
+                content = 'empty', embedding = [];
+            """
+        )
+        migration = AsyncMigration.from_file(
+            "open_notebook/database/migrations/16.surrealql"
+        )
+        await db.query(migration.sql)
+        try:
+            yield db
+        finally:
+            # The embedded engine aborts when closed with HNSW indexes defined
+            await vector_index.drop_vector_indexes()
+            vector_index._forget_index_state()
+
+
+async def search(exact=None):
+    with patch(
+        "open_notebook.utils.embedding.generate_query_embedding",
+        return_value=[1.0, 0.0, 0.0],
+    ):
+        return await vector_search("query", 10, minimum_score=0.5, exact=exact)
+
+
+class TestVectorIndexes:
+    """Test suite for HNSW index management and KNN search."""
+
+    @pytest.mark.asyncio
+    async def test_migration_clears_empty_embeddings(self):
+        """Empty placeholder vectors would make HNSW definitions fail."""
+        async with vector_database() as db:
+            rows = await db.query("SELECT VALUE embedding FROM note:z")
+            chunks = await db.query(
+                "SELECT content, embedding FROM source_embedding:empty"
+            )
+        assert rows == [None]
+        # Chunks without a vector are kept for full-text search
+        assert chunks == [{"content": "empty", "embedding": None}]
+
+    @pytest.mark.asyncio
+    async def test_indexes_follow_stored_dimension(self):
+        async with vector_database():
+            assert await vector_index.get_vector_index_dimension() is None
+            await vector_index.sync_vector_indexes()
+            assert await vector_index.wait_for_vector_indexes(3, interval=0.01)
+            assert await vector_index.get_vector_index_dimension() == 3
+
+    @pytest.mark.asyncio
+    async def test_knn_search_matches_exact_search(self):
+        """The HNSW path returns the same results as the exact fallback."""
+        async with vector_database():
+            exact = await search()
+            assert await vector_index.wait_for_vector_indexes(3, interval=0.01)
+            with patch(
+                "open_notebook.domain.notebook.repo_query",
+                wraps=notebook_repo_query,
+            ) as spy:
+                knn = await search()
+                assert "<|10," in spy.call_args[0][0]
+
+        assert [r["id"] for r in knn] == [r["id"] for r in exact]
+        assert [r["id"] for r in knn] == ["source:a", "note:x"]
+        assert knn[0]["similarity"] == pytest.approx(1.0)
+
+    @pytest.mark.asyncio
+    async def test_exact_search_can_be_forced(self):
+        async with vector_database():
+            await vector_index.wait_for_vector_indexes(3, interval=0.01)
+            with patch(
+                "open_notebook.domain.notebook.repo_query",
+                wraps=notebook_repo_query,
+            ) as spy:
+                await search(exact=True)
+                assert "fn::vector_search" in spy.call_args[0][0]
+
+    @pytest.mark.asyncio
+    async def test_batch_search_matches_single_searches(self):
+        """All queries are searched in one round trip, with the same results."""
+        queries = {"first": [1.0, 0.0, 0.0], "second": [0.0, 0.0, 1.0]}
+        async with vector_database():
+            await vector_index.wait_for_vector_indexes(3, interval=0.01)
+            single = []
+            for embedding in queries.values():
+                with patch(
+                    "open_notebook.utils.embedding.generate_query_embedding",
+                    return_value=embedding,
+                ):
+                    single.append(await vector_search("query", 10, minimum_score=0.5))
+            with (
+                patch(
+                    "open_notebook.utils.embedding.generate_query_embeddings",
+                    return_value=list(queries.values()),
+                ),
+                patch(
+                    "open_notebook.domain.notebook.repo_batch",
+                    wraps=notebook_repo_batch,
+                ) as spy,
+            ):
+                batch = await batch_vector_search(
+                    list(queries), 10, minimum_score=0.5
+                )
+                assert spy.call_count == 1
+
+        assert batch == single
+        assert [r["id"] for r in batch[1]] == ["note:y"]
+
+    @pytest.mark.asyncio
+    async def test_new_dimension_drops_indexes(self):
+        """Switching models drops old indexes so new vectors can be written."""
+        async with vector_database() as db:
+            await vector_index.wait_for_vector_indexes(3, interval=0.01)
+
+            # Old 3-dimension vectors remain, so 2-dimension indexes cannot be built
+            assert not await vector_index.wait_for_vector_indexes(2, interval=0.01)
+            await db.query("UPDATE note:x SET embedding = [1.0, 0.0]")
+            dimensions = await vector_index.get_index_dimensions(refresh=True)
+
+        assert set(dimensions.values()) == {None}
+
+    @pytest.mark.asyncio
+    async def test_indexes_build_in_background(self):
+        """Defining the indexes does not wait for the build."""
+        async with vector_database():
+            with patch(
+                "open_notebook.database.vector_index.repo_query",
+                wraps=vector_index.repo_query,
+            ) as spy:
+                await vector_index.ensure_vector_indexes(3)
+            defines = [
+                c[0][0] for c in spy.call_args_list if c[0][0].startswith("DEFINE")
+            ]
+            assert len(defines) == len(vector_index.VECTOR_INDEX_TABLES)
+            assert all(d.endswith("CONCURRENTLY") for d in defines)
+            assert await vector_index.wait_for_vector_indexes(3, interval=0.01)
+
+
+# ============================================================================
+# TEST SUITE 10: NumPy Vector Index
+# ============================================================================
+
+
+class TestNumpyVectorIndex:
+    """Test suite for the memory-mapped NumPy search backend."""
+
+    def test_search_ranks_rows_per_table(self, tmp_path):
+        index = NumpyVectorIndex(str(tmp_path))
+        index.replace_group(
+            "source:a",
+            ["source_embedding:1", "source_embedding:2"],
+            [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]],
+        )
+        index.replace_group("note:x", ["note:x"], [[2.0, 0.2, 0.0]])
+
+        hits = index.search([1.0, 0.0, 0.0], k=1)
+        assert [record_id for record_id, _ in hits] == [
+            "source_embedding:1",
+            "note:x",
+        ]
+        assert hits[0][1] == pytest.approx(1.0)
+
+        notes = index.search([1.0, 0.0, 0.0], k=5, tables=["note"])
+        assert [record_id for record_id, _ in notes] == ["note:x"]
+        assert index.search([0.0, 0.0, 1.0], k=5, minimum_score=0.5) == []
+
+    def test_replacing_a_group_is_seen_by_other_processes(self, tmp_path):
+        writer = NumpyVectorIndex(str(tmp_path))
+        reader = NumpyVectorIndex(str(tmp_path))
+        writer.replace_group("note:x", ["note:x"], [[1.0, 0.0]])
+        assert reader.search([1.0, 0.0], k=5)[0][0] == "note:x"
+
+        writer.replace_group("note:x", ["note:x"], [[0.0, 1.0]])
+        assert reader.search([1.0, 0.0], k=5, minimum_score=0.5) == []
+        assert reader.stats()["live_rows"] == 1
+
+        writer.remove_groups(["note:x"])
+        assert reader.search([0.0, 1.0], k=5) == []
+
+    def test_group_can_be_written_in_windows(self, tmp_path):
+        writer = NumpyVectorIndex(str(tmp_path))
+        reader = NumpyVectorIndex(str(tmp_path))
+        writer.replace_group("source:a", ["source_embedding:old"], [[1.0, 0.0]])
+        writer.replace_group(
+            "source:a", ["source_embedding:1"], [[1.0, 0.1]], append=True
+        )
+        writer.replace_group(
+            "source:a", ["source_embedding:1"], [[1.0, 0.2]], append=True
+        )
+        assert reader.stats()["live_rows"] == 2
+
+        writer.remove_rows("source:a", ["source_embedding:old"])
+        hits = reader.search([1.0, 0.0], k=5)
+        assert [record_id for record_id, _ in hits] == ["source_embedding:1"]
+        assert reader.stats()["live_rows"] == 1
+
+    def test_compaction_keeps_live_rows(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(numpy_index, "COMPACT_MIN_DEAD_ROWS", 2)
+        index = NumpyVectorIndex(str(tmp_path))
+        reader = NumpyVectorIndex(str(tmp_path))
+        index.replace_group("note:y", ["note:y"], [[0.0, 1.0]])
+        assert reader.search([0.0, 1.0], k=5)[0][0] == "note:y"
+        for value in (1.0, 2.0, 3.0, 4.0):
+            index.replace_group("note:x", ["note:x"], [[value, 1.0]])
+
+        stats = reader.stats()
+        assert stats["generation"] > 1
+        assert stats["rows"] == stats["live_rows"] == 2
+        hits = reader.search([0.0, 1.0], k=5)
+        assert [record_id for record_id, _ in hits] == ["note:y", "note:x"]
+        assert len(list(tmp_path.glob("vectors-*.f32"))) == 1
+
+    def test_new_dimension_starts_new_generation(self, tmp_path):
+        index = NumpyVectorIndex(str(tmp_path))
+        index.replace_group("note:x", ["note:x"], [[1.0, 0.0]])
+        index.replace_group("note:y", ["note:y"], [[1.0, 0.0, 0.0]])
+
+        stats = index.stats()
+        assert stats["dimension"] == 3
+        assert stats["live_rows"] == 1
+
+    def test_incomplete_log_line_is_ignored(self, tmp_path):
+        index = NumpyVectorIndex(str(tmp_path))
+        index.replace_group("note:x", ["note:x"], [[1.0, 0.0]])
+        log_path = next(tmp_path.glob("log-*.jsonl"))
+        with open(log_path, "ab") as f:
+            f.write(b'{"remove": "note')
+
+        reader = NumpyVectorIndex(str(tmp_path))
+        assert reader.search([1.0, 0.0], k=5)[0][0] == "note:x"
+        index.replace_group("note:y", ["note:y"], [[0.0, 1.0]])
+        assert reader.stats()["live_rows"] == 2
+
+    @pytest.mark.parametrize(
+        "quantization, min_recall", [("int8", 0.95), ("binary", 0.7)]
+    )
+    def test_quantized_search_rescores_candidates(
+        self, tmp_path, quantization, min_recall
+    ):
+        rng = np.random.default_rng(7)
+        centers = rng.normal(size=(20, 64))
+        vectors = centers[rng.integers(0, 20, 2000)] + rng.normal(size=(2000, 64))
+        ids = [f"note:{i}" for i in range(2000)]
+        exact = NumpyVectorIndex(str(tmp_path / "exact"))
+        quantized = NumpyVectorIndex(str(tmp_path / "codes"), quantization)
+        for index in (exact, quantized):
+            index.replace_groups([(i, [i], [v]) for i, v in zip(ids, vectors)])
+        assert quantized.stats()["quantization"] == quantization
+
+        found = 0
+        # Queries resemble stored content, as search queries do
+        queries = vectors[rng.integers(0, 2000, 20)] + rng.normal(size=(20, 64))
+        for query in queries:
+            expected = dict(exact.search(query, k=10))
+            hits = quantized.search(query, k=10, rescore=8)
+            found += len(expected.keys() & {record_id for record_id, _ in hits})
+            # Candidates are rescored from the float rows
+            for record_id, score in hits:
+                if record_id in expected:
+                    assert score == pytest.approx(expected[record_id])
+        assert found / 200 >= min_recall
+
+    def test_quantized_compaction_keeps_codes(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(numpy_index, "COMPACT_MIN_DEAD_ROWS", 2)
+        index = NumpyVectorIndex(str(tmp_path), "int8")
+        reader = NumpyVectorIndex(str(tmp_path))
+        index.replace_group("note:y", ["note:y"], [[0.0, 1.0]])
+        for value in (1.0, 2.0, 3.0, 4.0):
+            index.replace_group("note:x", ["note:x"], [[value, 1.0]])
+
+        assert reader.stats()["quantization"] == "int8"
+        assert reader.stats()["generation"] > 1
+        hits = reader.search([0.0, 1.0], k=1, rescore=1)
+        assert hits == [("note:y", pytest.approx(1.0))]
+        assert len(list(tmp_path.glob("codes-*.int8"))) == 1
+
+    @pytest.mark.asyncio
+    async def test_numpy_backend_matches_database_search(self, tmp_path, monkeypatch):
+        index = NumpyVectorIndex(str(tmp_path))
+        monkeypatch.setattr(numpy_index, "_numpy_index", index)
+        async with vector_database():
+            exact = await search(exact=True)
+            assert await numpy_index.sync_numpy_index() == 4
+            # Already in step with the database: no rebuild
+            generation = numpy_index.get_numpy_index().generation
+            assert await numpy_index.sync_numpy_index() == 4
+            assert numpy_index.get_numpy_index().generation == generation
+
+            monkeypatch.setenv("VECTOR_SEARCH_BACKEND", "numpy")
+            with patch(
+                "open_notebook.domain.notebook.repo_query",
+                wraps=notebook_repo_query,
+            ) as spy:
+                results = await search()
+                assert "fn::vector_search" not in spy.call_args[0][0]
+
+        # float32 scores; otherwise the same results
+        assert [r["similarity"] for r in results] == pytest.approx(
+            [r["similarity"] for r in exact]
+        )
+        for result in results + exact:
+            result.pop("similarity")
+        assert results == exact
+
+
+# ============================================================================
+# TEST SUITE 11: Scoped Search
+# ============================================================================
+
+
+@asynccontextmanager
+async def scoped_database():
+    """
+    Two users' sources and notes, split over two notebooks.
+
+    source:b is referenced by both notebooks; every record matches "apple".
+    """
+    async with memory_database() as db:
+        for version in (1, 15):
+            migration = AsyncMigration.from_file(
+                f"open_notebook/database/migrations/{version}.surrealql"
+            )
+            await db.query(migration.sql)
+        await db.query(
+            """
+            CREATE user:ann; CREATE user:bob;
+            CREATE notebook:one SET name = 'One', description = '';
+            CREATE notebook:two SET name = 'Two', description = '';
+            CREATE source:a SET title = 'Apple harvest',
+                full_text = 'apple orchards', user_id = user:ann;
+            CREATE source:b SET title = 'Apple pie',
+                full_text = 'apple baking', user_id = user:bob;
+            CREATE source_embedding:a0 SET source = source:a, order = 0,
+                content = 'apple orchards', embedding = [1.0, 0.0, 0.0];
+            CREATE source_embedding:b0 SET source = source:b, order = 0,
+                content = 'apple baking', embedding = [0.9, 0.1, 0.0];
+            CREATE note:x SET title = 'Apple note', content = 'apple',
+                embedding = [1.0, 0.0, 0.0], user_id = user:ann;
+            CREATE note:y SET title = 'Apple list', content = 'apple',
+                embedding = [0.8, 0.2, 0.0], user_id = user:bob;
+            RELATE source:a->reference->notebook:one;
+            RELATE source:b->reference->notebook:one;
+            RELATE source:b->reference->notebook:two;
+            RELATE note:x->artifact->notebook:one;
+            RELATE note:y->artifact->notebook:two;
+            """
+        )
+        yield db
+
+
+async def scoped_search(**scope):
+    with patch(
+        "open_notebook.utils.embedding.generate_query_embedding",
+        return_value=[1.0, 0.0, 0.0],
+    ):
+        vector = await vector_search("apple", 10, minimum_score=0.5, **scope)
+    text = await text_search("apple", 10, **scope)
+    return sorted(r["id"] for r in vector), sorted(r["id"] for r in text)
+
+
+class TestScopedSearch:
+    """Test suite for notebook- and user-scoped text and vector search."""
+
+    @pytest.mark.asyncio
+    async def test_notebook_scope(self):
+        async with scoped_database():
+            vector, text = await scoped_search(notebook_id="notebook:one")
+            assert vector == text == ["note:x", "source:a", "source:b"]
+
+            vector, text = await scoped_search(notebook_id="notebook:two")
+            assert vector == text == ["note:y", "source:b"]
+
+    @pytest.mark.asyncio
+    async def test_user_scope(self):
+        async with scoped_database():
+            vector, text = await scoped_search(user_id="user:bob")
+        assert vector == text == ["note:y", "source:b"]
+
+    @pytest.mark.asyncio
+    async def test_notebook_and_user_scope(self):
+        async with scoped_database():
+            vector, text = await scoped_search(
+                notebook_id="notebook:one", user_id="user:bob"
+            )
+        assert vector == text == ["source:b"]
+
+    @pytest.mark.asyncio
+    async def test_scope_respects_content_types(self):
+        async with scoped_database():
+            with patch(
+                "open_notebook.utils.embedding.generate_query_embedding",
+                return_value=[1.0, 0.0, 0.0],
+            ):
+                results = await vector_search(
+                    "apple",
+                    10,
+                    note=False,
+                    minimum_score=0.5,
+                    notebook_id="notebook:one",
+                )
+        assert [r["id"] for r in results] == ["source:a", "source:b"]
+        assert results[0]["similarity"] == pytest.approx(1.0)
+
+    @pytest.mark.asyncio
+    async def test_unknown_notebook_finds_nothing(self):
+        async with scoped_database():
+            assert await scoped_search(notebook_id="notebook:missing") == ([], [])
@@ -0,0 +1,54 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client():
+    """Create test client after environment variables have been cleared by conftest."""
+    from api.main import app
+
+    return TestClient(app)
+
+
+class TestSearchUserScope:
+    """Test suite for scoping searches to the signed-in user."""
+
+    @patch("api.routers.search.text_search", new_callable=AsyncMock)
+    def test_user_comes_from_the_token(self, mock_text_search, client):
+        from open_notebook.utils.auth_utils import create_access_token
+
+        mock_text_search.return_value = []
+        token = create_access_token({"sub": "user:alice"})
+
+        response = client.post(
+            "/api/search",
+            json={"query": "q", "type": "text", "owned_only": True},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+        assert response.status_code == 200
+        assert mock_text_search.call_args.kwargs["user_id"] == "user:alice"
+
+    @patch("api.routers.search.text_search", new_callable=AsyncMock)
+    def test_body_cannot_pick_the_user(self, mock_text_search, client):
+        mock_text_search.return_value = []
+
+        response = client.post(
+            "/api/search",
+            json={"query": "q", "type": "text", "user_id": "user:bob"},
+        )
+
+        assert response.status_code == 200
+        assert mock_text_search.call_args.kwargs["user_id"] is None
+
+    @patch("api.routers.search.text_search", new_callable=AsyncMock)
+    def test_owned_only_requires_sign_in(self, mock_text_search, client):
+        response = client.post(
+            "/api/search",
+            json={"query": "q", "type": "text", "owned_only": True},
+        )
+
+        assert response.status_code == 401
+        mock_text_search.assert_not_called()
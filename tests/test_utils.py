@@ -9,7 +9,9 @@ import pytest
 
 from open_notebook.utils import (
     clean_thinking_content,
+    collapse_results,
     compare_versions,
+    extract_snippet,
     get_installed_version,
     parse_thinking_content,
     remove_non_ascii,
@@ -258,5 +260,89 @@ class TestContextBuilder:
         assert builder.include_insights is False
 
 
+# ============================================================================
+# TEST SUITE 5: Search Result Collapsing and Snippets
+# ============================================================================
+
+
+FILLER = "lorem ipsum dolor sit amet " * 20
+
+
+class TestSearchResults:
+    """Test server-side collapsing of search results and snippet extraction."""
+
+    def test_snippet_centers_best_window(self):
+        """The snippet covers the window with the most distinct query terms."""
+        text = FILLER + "vector search " + FILLER + "vector index search " + FILLER
+        snippet, highlights, score = extract_snippet(
+            text, ["vector", "index", "search"], 100
+        )
+
+        assert len(snippet) <= 102
+        assert snippet.startswith("…") and snippet.endswith("…")
+        assert score == (3, 3)
+        assert [snippet[start:end] for start, end in highlights] == [
+            "vector",
+            "index",
+            "search",
+        ]
+
+    def test_snippet_without_terms_keeps_start(self):
+        """Without any matching term the start of the chunk is returned."""
+        snippet, highlights, score = extract_snippet(FILLER, ["vector"], 50)
+
+        assert snippet.startswith("lorem ipsum") and snippet.endswith("…")
+        assert highlights == []
+        assert score == (0, 0)
+
+    def test_snippet_matches_inflections(self):
+        """Whole words match, allowing simple inflections."""
+        snippet, highlights, _ = extract_snippet(
+            "Embeddings embeds; disembedding", ["embedding", "embed"], 0
+        )
+
+        assert snippet == "Embeddings embeds; disembedding"
+        assert [snippet[start:end] for start, end in highlights] == [
+            "Embeddings",
+            "embeds",
+        ]
+
+    def test_collapse_limits_chunks_per_parent(self):
+        """A parent keeps at most N chunks across its results, best matches first."""
+        results = [
+            {
+                "id": "source:a",
+                "parent_id": "source:a",
+                "matches": ["unrelated", "about vectors", "more vectors here"],
+            },
+            {
+                "id": "source_insight:i",
+                "parent_id": "source:a",
+                "matches": ["vector insight"],
+            },
+            {"id": "note:b", "parent_id": "note:b", "matches": ["vector note"]},
+        ]
+
+        collapsed = collapse_results(results, "the vector", 2, 0)
+
+        assert [r["id"] for r in collapsed] == ["source:a", "note:b"]
+        assert collapsed[0]["matches"] == ["about vectors", "more vectors here"]
+        assert collapsed[0]["highlights"] == [[[6, 13]], [[5, 12]]]
+        assert results[0]["matches"][0] == "unrelated"
+
+    def test_collapse_zero_keeps_everything(self):
+        """Zero disables both collapsing and snippets."""
+        results = [
+            {"id": "source:a", "parent_id": "source:a", "matches": [FILLER]},
+            {"id": "source_insight:i", "parent_id": "source:a", "matches": None},
+        ]
+
+        collapsed = collapse_results(results, "ipsum", 0, 0)
+
+        assert [r["id"] for r in collapsed] == ["source:a", "source_insight:i"]
+        assert collapsed[0]["matches"] == [FILLER]
+        assert len(collapsed[0]["highlights"][0]) == 20
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])